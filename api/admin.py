@@ -3,6 +3,17 @@ from .models import *
 # Register your models here.
 admin.site.register(JobApplicationStatus)
 admin.site.register(JobListing)
-admin.site.register(JobApplication)
 admin.site.register(Employer)
 admin.site.register(Employee)
+admin.site.register(EmailNotification)
+admin.site.register(ResumeText)
+admin.site.register(ApiTokenState)
+admin.site.register(JobListingCounters)
+admin.site.register(JobListingFacet)
+
+
+@admin.register(JobApplication)
+class JobApplicationAdmin(admin.ModelAdmin):
+    # __str__ reads applicant and job_listing, so join them into the changelist query
+    list_display = ('__str__', 'status', 'applied_at')
+    list_select_related = ('applicant', 'job_listing', 'status')
@@ -0,0 +1,144 @@
+"""
+Async versions of the read endpoints, for deployments served over ASGI.
+
+Each view runs DRF's request checks in a single hop to a worker thread
+(authentication and throttle stores are sync code), then reads with the
+async ORM and renders the same response as its counterpart in api.views.
+urls.py routes to them when API_ASYNC_READ_VIEWS is set.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseBase
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import views
+from .caching import acache_listing_response
+from .facets import facet_counts
+from .filters import JobListingFilter
+from .middleware import view_returned
+from .models import JobApplication, JobListing
+from .pagination import JobApplicationPagination, JobListingPagination
+from .permissions import IsEmployer
+from .routers import replica_reads
+from .serializers import JOB_APPLICATION_PROJECTION, JOB_LISTING_PROJECTION
+from .statuses import aget_status
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView with an async dispatch for the read views. Authentication,
+    permissions, throttling, content negotiation, exception handling and
+    rendering are APIView's own, run in a worker thread; only ``handler``,
+    which returns response data or an HttpResponse, runs on the event loop.
+    Like APIView, ``as_view(**initkwargs)`` overrides class attributes,
+    which is how api.throttling.rate_limit adds throttles.
+    """
+    handler = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        for key in initkwargs:
+            if not hasattr(cls, key):
+                raise TypeError(f'{cls.__name__}() received an invalid keyword {key!r}')
+
+        async def view(request, *args, **kwargs):
+            return await cls(**initkwargs).dispatch(request, *args, **kwargs)
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method not in ('GET', 'HEAD'):
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await self.handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = exc
+        return await sync_to_async(self.finish)(request, response, *args, **kwargs)
+
+    def finish(self, request, response, *args, **kwargs):
+        if isinstance(response, Exception):
+            response = self.handle_exception(response)
+        elif not isinstance(response, HttpResponseBase):
+            response = Response(response)
+        response = self.finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response):
+            view_returned(response)
+            response.render()
+        return response
+
+
+def async_api_view(permission_classes=None):
+    """Turn ``async def handler(request, ...)`` into a GET-only async view."""
+    def decorator(handler):
+        attrs = {'handler': staticmethod(handler), '__doc__': handler.__doc__}
+        if permission_classes is not None:
+            attrs['permission_classes'] = permission_classes
+        view = type(handler.__name__, (AsyncAPIView,), attrs).as_view()
+        return wraps(handler)(view)
+    return decorator
+
+
+# Review list of applications by employer for a job posting
+@async_api_view(permission_classes=[IsEmployer])
+async def applications_for_job_listing(request, job_listing_id):
+    if request.GET.get('stream'):
+        # Streaming responses iterate synchronously in Django's handler anyway
+        return await sync_to_async(views.applications_for_job_listing)(request._request, job_listing_id)
+    try:
+        job_listing = await JobListing.objects.aget(pk=job_listing_id)
+    except JobListing.DoesNotExist:
+        return Response({"error": "Job listing does not exist."}, status=status.HTTP_404_NOT_FOUND)
+    if job_listing.company_id != request.user.employer.id:
+        return Response({"error": "You do not have permission to view applications for this job listing."},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    applications = JOB_APPLICATION_PROJECTION.values(
+        JobApplication.objects.filter(job_listing=job_listing).exclude(status=await aget_status('RE')))
+    paginator = JobApplicationPagination()
+    page = paginator.paginate_rows([row async for row in paginator.page_queryset(applications, request)])
+    return paginator.get_paginated_data(JOB_APPLICATION_PROJECTION.data(page))
+
+
+# Employee to see all job postings with filtering options. Cached responses
+# are filled from the primary (see api.caching), so no replica_reads
+@async_api_view()
+@acache_listing_response
+async def job_listings_with_filters(request):
+    filterset = JobListingFilter(request.GET, queryset=JobListing.objects.all())
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+    queryset = JOB_LISTING_PROJECTION.values(filterset.qs, 'created_at')
+    paginator = JobListingPagination()
+    paginator.ordering = paginator.orderings[filterset.page_ordering]
+    page = paginator.paginate_rows([row async for row in paginator.page_queryset(queryset, request)])
+    data = paginator.get_paginated_data(JOB_LISTING_PROJECTION.data(page))
+    if filterset.with_facets:
+        data['facets'] = await sync_to_async(facet_counts)(filterset)
+    return data
+
+
+# Employee to see all the applications they made
+@async_api_view()
+@replica_reads
+async def employee_applications(request):
+    try:
+        # Already loaded for token users; session users may need a query
+        employee = await sync_to_async(lambda: request.user.employee)()
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    applications = JOB_APPLICATION_PROJECTION.values(JobApplication.objects.filter(applicant=employee))
+    paginator = JobApplicationPagination()
+    page = paginator.paginate_rows([row async for row in paginator.page_queryset(applications, request)])
+    return paginator.get_paginated_data(JOB_APPLICATION_PROJECTION.data(page))
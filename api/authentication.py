@@ -0,0 +1,186 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import ApiTokenState
+
+TOKEN_SALT = 'api.authentication.token'
+KEYWORD = b'bearer'
+
+
+def _token_ttl():
+    return getattr(settings, 'API_TOKEN_TTL', 12 * 60 * 60)
+
+
+def _shared_cache():
+    return caches[getattr(settings, 'API_AUTH_CACHE', 'default')]
+
+
+def _version_key(user_id):
+    return f'api:auth:version:{user_id}'
+
+
+def _cache_key(user_id, version):
+    return f'api:auth:user:{user_id}:{version}'
+
+
+def _user_version(shared, user_id):
+    # A fresh version is a timestamp, not 0, so an evicted version key never
+    # makes an older bundle reachable again
+    version = shared.get(_version_key(user_id))
+    if version is None:
+        shared.add(_version_key(user_id), time.time_ns(), None)
+        version = shared.get(_version_key(user_id))
+    return version
+
+
+class _LocalUserCache:
+    """
+    Small per-process LRU of pickled user bundles. Entries live for a few
+    seconds only, which bounds how long a revoked token keeps working in
+    another worker process.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, bundle):
+        ttl = getattr(settings, 'API_AUTH_LOCAL_CACHE_SECONDS', 5)
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + ttl, bundle)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = _LocalUserCache()
+
+
+def _load_bundle(user_id):
+    # One query resolves the user together with both roles and the token
+    # generation; missing reverse relations are cached as absent, so later
+    # hasattr(user, 'employer') checks do not query either.
+    user = (User.objects.select_related('employer', 'employee', 'api_token_state')
+            .filter(pk=user_id, is_active=True).first())
+    if user is None:
+        return None
+    state = getattr(user, 'api_token_state', None)
+    generation = state.generation if state is not None else 0
+    return generation, pickle.dumps(user, pickle.HIGHEST_PROTOCOL)
+
+
+def resolve_user(user_id):
+    """
+    Return ``(generation, user)`` for an API token, trying the process-local
+    cache, then the shared cache, then the database. Every call gets its own
+    copy of the user, so views may mutate it freely.
+
+    Shared bundles are keyed on a per-user version that forget_user()
+    moves. The version is read before the database, so a bundle loaded
+    while the user changed is stored under the old version and never read.
+    """
+    bundle = local_cache.get(user_id)
+    if bundle is None:
+        shared = _shared_cache()
+        key = _cache_key(user_id, _user_version(shared, user_id))
+        bundle = shared.get(key)
+        if bundle is None:
+            bundle = _load_bundle(user_id)
+            if bundle is None:
+                return None
+            shared.set(key, bundle, getattr(settings, 'API_AUTH_CACHE_SECONDS', 300))
+        local_cache.set(user_id, bundle)
+    generation, pickled = bundle
+    return generation, pickle.loads(pickled)
+
+
+def _forget(user_id):
+    local_cache.delete(user_id)
+    _shared_cache().set(_version_key(user_id), time.time_ns(), None)
+
+
+def forget_user(user_id):
+    """
+    Orphan the cached bundles of ``user_id``, now and again once the current
+    transaction commits: a request that reads the old rows before the commit
+    would otherwise cache them under the new version.
+    """
+    _forget(user_id)
+    transaction.on_commit(lambda: _forget(user_id))
+
+
+def issue_token(user):
+    state = getattr(user, 'api_token_state', None)
+    if state is None:
+        state, _ = ApiTokenState.objects.get_or_create(user=user)
+    return signing.dumps({'u': user.pk, 'g': state.generation}, salt=TOKEN_SALT)
+
+
+def revoke_tokens(user):
+    """Invalidate every token issued to ``user`` so far."""
+    state, created = ApiTokenState.objects.get_or_create(user=user, defaults={'generation': 1})
+    if not created:
+        ApiTokenState.objects.filter(pk=state.pk).update(generation=F('generation') + 1)
+    forget_user(user.pk)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Stateless bearer tokens: a signed, timestamped ``{user id, generation}``
+    payload that expires after API_TOKEN_TTL seconds.
+
+        Authorization: Bearer <token>
+    """
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != KEYWORD:
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        try:
+            payload = signing.loads(auth[1].decode(), salt=TOKEN_SALT, max_age=_token_ttl())
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        except (signing.BadSignature, UnicodeDecodeError):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        resolved = resolve_user(payload.get('u'))
+        if resolved is None or resolved[0] != payload.get('g'):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return resolved[1], payload
+
+    def authenticate_header(self, request):
+        return 'Bearer'
@@ -0,0 +1,145 @@
+import codecs
+import csv
+import json
+
+from django.db import transaction
+from rest_framework import serializers
+
+from . import caching, counters, events, facets, search
+from .models import JobListing
+from .streaming import STREAM_CHUNK_SIZE
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class JobListingImportSerializer(serializers.ModelSerializer):
+    # No company field: imported rows always belong to the uploading
+    # employer, which also saves a foreign key lookup per row.
+    class Meta:
+        model = JobListing
+        fields = ['title', 'description', 'location', 'salary']
+
+
+def upload_format(upload):
+    name = (upload.name or '').lower()
+    if name.endswith('.csv') or upload.content_type == 'text/csv':
+        return 'csv'
+    return 'ndjson'
+
+
+# Yielded in place of a row whose bytes are not UTF-8
+UNDECODABLE = object()
+
+
+def _lines(upload, undecodable):
+    """
+    Decode the upload line by line. A line that is not UTF-8 is replaced
+    and its number added to ``undecodable``, so one bad byte costs one row
+    rather than the whole import.
+    """
+    for number, raw in enumerate(upload.file, start=1):
+        if number == 1:
+            raw = raw.removeprefix(codecs.BOM_UTF8)
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            undecodable.add(number)
+            yield raw.decode('utf-8', errors='replace')
+
+
+def read_rows(upload):
+    """
+    Yield ``(row_number, row)`` from a CSV or JSON-lines upload, one line at
+    a time. ``row`` is UNDECODABLE when its bytes are not UTF-8.
+    """
+    undecodable = set()
+    lines = _lines(upload, undecodable)
+    if upload_format(upload) == 'csv':
+        reader = csv.DictReader(lines)
+        # Physical lines read so far; a quoted field may span several
+        last_line = 0
+        for number, row in enumerate(reader, start=1):
+            # An undecodable header leaves no row matched to its columns
+            if 1 in undecodable or any(last_line < line <= reader.line_num for line in undecodable):
+                row = UNDECODABLE
+            last_line = reader.line_num
+            yield number, row
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if number in undecodable:
+            yield number, UNDECODABLE
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_listings(employer, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate and insert ``(row_number, row)`` pairs in chunks, one
+    transaction and one bulk INSERT per chunk. Invalid rows are skipped and
+    reported; they do not abort the rest of the import.
+    """
+    validator = JobListingImportSerializer()
+    created = 0
+    error_count = 0
+    errors = []
+
+    for chunk in _chunks(rows, chunk_size):
+        listings = []
+        for number, row in chunk:
+            try:
+                if row is UNDECODABLE:
+                    raise serializers.ValidationError({'non_field_errors': ['Row is not valid UTF-8.']})
+                if row is None:
+                    raise serializers.ValidationError({'non_field_errors': ['Row is not a JSON object.']})
+                validated = validator.run_validation(row)
+            except serializers.ValidationError as exc:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'row': number, 'errors': exc.detail})
+                continue
+            listings.append(JobListing(company=employer, **validated))
+
+        if listings:
+            # bulk_create skips model signals, so keep the search index, the
+            # facet and application counts and the event log in step inside
+            # the same transaction
+            with transaction.atomic():
+                JobListing.objects.bulk_create(listings)
+                search.get_backend().index_listings(listings)
+                facets.count_listings(listings)
+                counters.listings_created(listings)
+                events.listings_created(listings)
+            created += len(listings)
+
+    if created:
+        transaction.on_commit(caching.bump_listing_version)
+    return {'created': created, 'error_count': error_count, 'errors': errors}
+
+
+EXPORT_FIELDS = ['id', 'title', 'description', 'location', 'salary', 'created_at', 'updated_at']
+
+
+def export_rows(employer):
+    """Yield the employer's listings as dicts without loading them all at once."""
+    queryset = JobListing.objects.filter(company=employer).order_by('id').values(*EXPORT_FIELDS)
+    for row in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        row['salary'] = '{:f}'.format(row['salary'])
+        yield row
@@ -0,0 +1,163 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .routers import primary_reads
+
+VERSION_KEY = 'api:listings:version'
+HITS_KEY = 'api:listings:hits'
+MISSES_KEY = 'api:listings:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_RESPONSE_CACHE', 'default')]
+
+
+def listing_version():
+    """
+    Current version of the JobListing table as seen by the response cache.
+    The version is the time of the last write in nanoseconds, which also
+    gives the Last-Modified value for free.
+    """
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_listing_version():
+    # Every cached listing response embeds the version in its key, so
+    # moving the version orphans all of them at once.
+    get_cache().set(VERSION_KEY, time.time_ns(), None)
+
+
+def _count(key):
+    cache = get_cache()
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); one lost sample is fine
+        pass
+
+
+def cache_stats():
+    values = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = values.get(HITS_KEY, 0), values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else None,
+        'version': listing_version(),
+    }
+
+
+def response_cache_key(request, version):
+    # Parameter order and empty values do not change the result set, so
+    # they must not change the key either.
+    params = sorted((key, values) for key, values in request.GET.lists() if any(values))
+    query = '&'.join(f'{key}={value}' for key, values in params for value in values if value)
+    raw = f'{request.get_host()}{request.path}?{query}'
+    return f'api:listings:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _validators(request):
+    version = listing_version()
+    key = response_cache_key(request, version)
+    etag = '"%x-%s"' % (version, key.rsplit(':', 1)[-1])
+    # Second resolution only; If-None-Match is what clients should rely on
+    last_modified = version // 1_000_000_000
+    return key, etag, last_modified
+
+
+def _finish(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cache_listing_response(view):
+    """
+    Cache the data of a public JobListing read, keyed on the normalized query
+    string and the listing version, and answer conditional requests with 304.
+    Goes below @api_view so the view receives the DRF request. A miss always
+    reads the primary: a page read from a lagging replica would be stored
+    under the new version and outlive the replication delay, so cached views
+    gain nothing from @replica_reads.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        key, etag, last_modified = _validators(request)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            _count(HITS_KEY)
+            return not_modified
+
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+        else:
+            _count(MISSES_KEY)
+            # A lagging replica would store a stale page under the new version
+            # for the whole cache timeout, so misses read the primary
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set(key, response.data, getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 300))
+            response['X-Cache'] = 'MISS'
+        return _finish(response, etag, last_modified)
+    return wrapped
+
+
+def _cached_response_data(request):
+    key, etag, last_modified = _validators(request)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    data = None if not_modified is not None else get_cache().get(key)
+    _count(HITS_KEY if not_modified is not None or data is not None else MISSES_KEY)
+    return key, etag, last_modified, not_modified, data
+
+
+def acache_listing_response(handler):
+    """
+    cache_listing_response for the async views in api.async_views, whose
+    handlers return the response data. Shares keys and cached data with the
+    sync views; the cache is read in one thread hop and written in another.
+    """
+    @wraps(handler)
+    async def wrapped(request, *args, **kwargs):
+        key, etag, last_modified, not_modified, data = await sync_to_async(_cached_response_data)(request)
+        if not_modified is not None:
+            return not_modified
+
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+        else:
+            with primary_reads():
+                data = await handler(request, *args, **kwargs)
+            if isinstance(data, HttpResponseBase):
+                return data
+            await get_cache().aset(key, data, getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 300))
+            response = Response(data)
+            response['X-Cache'] = 'MISS'
+        return _finish(response, etag, last_modified)
+    return wrapped
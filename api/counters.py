@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import JobApplication, JobApplicationStatus, JobListingCounters
+from .statuses import get_status_by_id
+
+# JobListingCounters column for each status code
+STATUS_FIELDS = {
+    'AP': 'applied',
+    'PR': 'in_progress',
+    'RE': 'rejected',
+    'AC': 'accepted',
+}
+COUNTER_FIELDS = ('total', *STATUS_FIELDS.values())
+
+
+def _status_field(status_id):
+    if status_id is None:
+        return None
+    try:
+        return STATUS_FIELDS.get(get_status_by_id(status_id).name)
+    except JobApplicationStatus.DoesNotExist:
+        return None
+
+
+def _update(listing_id, changes):
+    changes = {field: delta for field, delta in changes.items() if field and delta}
+    if not changes:
+        return 1
+    return JobListingCounters.objects.filter(job_listing_id=listing_id).update(
+        **{field: F(field) + delta for field, delta in changes.items()})
+
+
+def listings_created(listings):
+    """
+    Give new listings their zeroed row, so the first application increments
+    an existing row instead of creating one.
+    """
+    JobListingCounters.objects.bulk_create(
+        [JobListingCounters(job_listing_id=listing.pk) for listing in listings], ignore_conflicts=True)
+
+
+def application_saved(application, created):
+    """
+    Count a new application, or move it to the column of its new status.
+    Runs from post_save, inside the transaction of the write.
+    """
+    known = hasattr(application, '_counted_status_id')
+    old_status_id = getattr(application, '_counted_status_id', None)
+    application._counted_status_id = application.status_id
+    if created:
+        changes = {'total': 1, _status_field(application.status_id): 1}
+    elif not known:
+        # Saved without being loaded first, so the counted status is unknown
+        recount([application.job_listing_id])
+        return
+    elif old_status_id != application.status_id:
+        old_field, new_field = _status_field(old_status_id), _status_field(application.status_id)
+        changes = {old_field: -1, new_field: 1} if old_field != new_field else {}
+    else:
+        return
+    if not _update(application.job_listing_id, changes):
+        # No row: the listing was bulk-created without listings_created.
+        # Count it from scratch, which includes this write already
+        recount([application.job_listing_id])
+
+
+def application_deleted(application):
+    # A missing row has nothing to take back; recount_applications fills it in
+    status_id = getattr(application, '_counted_status_id', application.status_id)
+    _update(application.job_listing_id, {'total': -1, _status_field(status_id): -1})
+
+
+def recount(listing_ids):
+    """Rebuild the counters of ``listing_ids`` from their applications."""
+    with transaction.atomic():
+        # Writers that add an application now wait for us, then apply their
+        # increment on top of the rebuilt row
+        list(JobListingCounters.objects.select_for_update().filter(job_listing_id__in=listing_ids))
+        rows = {listing_id: JobListingCounters(job_listing_id=listing_id) for listing_id in listing_ids}
+        grouped = JobApplication.objects.filter(job_listing_id__in=listing_ids) \
+            .values_list('job_listing_id', 'status_id').annotate(n=Count('id')).order_by()
+        for listing_id, status_id, n in grouped:
+            row = rows[listing_id]
+            row.total += n
+            field = _status_field(status_id)
+            if field:
+                setattr(row, field, getattr(row, field) + n)
+        JobListingCounters.objects.bulk_create(
+            rows.values(), update_conflicts=True, unique_fields=['job_listing'], update_fields=COUNTER_FIELDS)
+    return len(rows)
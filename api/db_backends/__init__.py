@@ -0,0 +1,9 @@
+"""
+Database backends tuned for running the API under several worker processes.
+Select one with DB_ENGINE (see DATABASES in settings):
+
+- ``api.db_backends.sqlite3``: SQLite in WAL mode, with a busy timeout,
+  tuned pragmas, and write transactions that take the lock up front.
+- ``api.db_backends.postgresql``: PostgreSQL with a per-process pool of
+  open connections.
+"""
@@ -0,0 +1,100 @@
+import threading
+from collections import deque
+
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+# Idle connections per database alias, shared by the threads of a process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self.idle = deque()
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            return self.idle.pop() if self.idle else None
+
+    def put(self, connection):
+        with self.lock:
+            if len(self.idle) >= self.max_idle:
+                return False
+            self.idle.append(connection)
+            return True
+
+    def clear(self):
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for connection in idle:
+            connection.close()
+
+
+def get_pool(alias, max_idle):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(max_idle)
+        return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL with a per-process pool of open connections.
+
+    Closing a connection, which Django does at the end of every request when
+    CONN_MAX_AGE is 0, hands it back to the pool after resetting its session
+    state. The next request reuses it, so it skips the connect and
+    authentication round trips. Connections that are broken, in a
+    transaction, or beyond OPTIONS["pool"]["max_idle"] (default 10) are
+    really closed. Pooled connections are checked before reuse when
+    CONN_HEALTH_CHECKS is on.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pool = get_pool(self.alias, params.pop('pool', {}).get('max_idle', 10))
+        return params
+
+    def get_new_connection(self, conn_params):
+        while True:
+            connection = self.pool.get()
+            if connection is None:
+                return super().get_new_connection(conn_params)
+            if not connection.closed and (not self.settings_dict['CONN_HEALTH_CHECKS']
+                                          or self._pooled_connection_is_usable(connection)):
+                # reset() dropped the session settings the base class applies
+                self.isolation_level = self.settings_dict['OPTIONS'].get(
+                    'isolation_level', connection.isolation_level)
+                if self.isolation_level != connection.isolation_level:
+                    connection.set_session(isolation_level=self.isolation_level)
+                return connection
+            connection.close()
+
+    @staticmethod
+    def _pooled_connection_is_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        connection = self.connection
+        if connection is None:
+            return
+        if not connection.closed and connection.get_transaction_status() == TRANSACTION_STATUS_IDLE:
+            try:
+                # RESET ALL and friends, so SET commands do not leak into the next request
+                connection.reset()
+                if self.pool.put(connection):
+                    return
+            except base.Database.Error:
+                pass
+        with self.wrap_database_errors:
+            return connection.close()
@@ -0,0 +1,142 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import JobApplicationStatus, JobListing, LifecycleEvent
+from .statuses import get_status_by_id
+
+
+def _status_code(status_id):
+    if status_id is None:
+        return None
+    try:
+        return get_status_by_id(status_id).name
+    except JobApplicationStatus.DoesNotExist:
+        return None
+
+
+def _listing_event(kind, listing):
+    data = {} if kind == 'listing.deleted' else {
+        'title': listing.title,
+        'location': listing.location,
+        'salary': str(Decimal(listing.salary).quantize(Decimal('0.01'))),
+    }
+    return LifecycleEvent(kind=kind, company_id=listing.company_id, job_listing_id=listing.pk, data=data)
+
+
+def _application_event(kind, application, company_id, **data):
+    return LifecycleEvent(kind=kind, company_id=company_id, job_listing_id=application.job_listing_id,
+                          application_id=application.pk, applicant_id=application.applicant_id, data=data)
+
+
+def _company_ids(applications):
+    """Employer of each application's listing, by listing id, in at most one query."""
+    companies = {}
+    missing = set()
+    for application in applications:
+        listing = application._state.fields_cache.get('job_listing')
+        if listing is not None:
+            companies[listing.pk] = listing.company_id
+        else:
+            missing.add(application.job_listing_id)
+    missing -= set(companies)
+    if missing:
+        companies.update(JobListing.objects.filter(pk__in=missing).values_list('pk', 'company_id'))
+    return companies
+
+
+def listing_saved(listing, created):
+    """Record a created or updated listing. Runs from post_save."""
+    _listing_event('listing.created' if created else 'listing.updated', listing).save()
+
+
+def listing_deleted(listing):
+    _listing_event('listing.deleted', listing).save()
+
+
+def application_saved(application, created):
+    """
+    Record a new application or a change of its status. Runs from
+    post_save, before api.counters moves ``_counted_status_id`` on.
+    """
+    if created:
+        kind, data = 'application.created', {'status': _status_code(application.status_id)}
+    elif not hasattr(application, '_counted_status_id'):
+        # Saved without being loaded first: the previous status is unknown
+        kind, data = 'application.status_changed', {'status': _status_code(application.status_id)}
+    elif application._counted_status_id != application.status_id:
+        kind, data = 'application.status_changed', {
+            'status': _status_code(application.status_id),
+            'previous_status': _status_code(application._counted_status_id),
+        }
+    else:
+        return
+    _application_event(kind, application, _company_ids([application])[application.job_listing_id], **data).save()
+
+
+def application_deleted(application):
+    companies = _company_ids([application])
+    if application.job_listing_id in companies:
+        _application_event('application.deleted', application, companies[application.job_listing_id]).save()
+
+
+def listings_created(listings):
+    """Record listings inserted with bulk_create, which skips the signals."""
+    LifecycleEvent.objects.bulk_create([_listing_event('listing.created', listing) for listing in listings])
+
+
+def applications_created(applications, companies=None):
+    """
+    Record applications inserted with bulk_create. ``companies`` maps
+    listing ids to employer ids when the caller has them at hand.
+    """
+    companies = companies if companies is not None else _company_ids(applications)
+    LifecycleEvent.objects.bulk_create([
+        _application_event('application.created', application, companies[application.job_listing_id],
+                           status=_status_code(application.status_id))
+        for application in applications
+    ])
+
+
+def status_changes(applications):
+    """
+    Record status changes made with a queryset update(). ``applications``
+    were loaded before the update and carry their new status.
+    """
+    companies = _company_ids(applications)
+    LifecycleEvent.objects.bulk_create([
+        _application_event('application.status_changed', application, companies[application.job_listing_id],
+                           status=_status_code(application.status_id),
+                           previous_status=_status_code(getattr(application, '_counted_status_id', None)))
+        for application in applications
+    ])
+
+
+def commits_in_id_order(connection):
+    """
+    Whether rows become visible in the order of their ids. SQLite allows one
+    writer at a time and a transaction holds the write lock from its first
+    write to its commit, so an id is never committed after a higher one.
+    """
+    return connection.vendor == 'sqlite'
+
+
+def feed(events, after, limit):
+    """
+    Up to ``limit`` of ``events`` with a sequence number above ``after``,
+    oldest first, and whether more follow.
+
+    Where transactions can commit out of id order, a consumer that moved
+    past an id could skip a lower one committed later. There events younger
+    than API_EVENT_FEED_LAG_SECONDS are held back, which is best effort: a
+    transaction open for longer than the lag can still be skipped.
+    """
+    events = events.filter(id__gt=after)
+    lag = getattr(settings, 'API_EVENT_FEED_LAG_SECONDS', 2)
+    if lag and not commits_in_id_order(connections[events.db]):
+        events = events.filter(created_at__lte=timezone.now() - timedelta(seconds=lag))
+    rows = list(events.order_by('id')[:limit + 1])
+    return rows[:limit], len(rows) > limit
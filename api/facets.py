@@ -0,0 +1,172 @@
+import bisect
+import hashlib
+import logging
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from . import caching
+from .filters import FACET_FILTERS, prefix_lookups
+from .models import Employer, JobListing, JobListingFacet
+from .routers import primary_reads
+
+logger = logging.getLogger(__name__)
+
+
+def salary_bands():
+    """Lower bounds of the salary bands, ascending; the first is 0."""
+    return getattr(settings, 'API_SALARY_BANDS', [0, 30000, 50000, 75000, 100000, 150000, 200000])
+
+
+def salary_band(salary):
+    return max(bisect.bisect_right(salary_bands(), salary) - 1, 0)
+
+
+def salary_band_expression():
+    bands = salary_bands()
+    return Case(*[When(salary__gte=low, then=Value(band)) for band, low in reversed(list(enumerate(bands)))],
+                default=Value(0), output_field=IntegerField())
+
+
+def _cell(location, company_id, salary):
+    return location, company_id, salary_band(salary)
+
+
+def _apply(changes):
+    """Add ``{(location, company_id, band): delta}`` to the facet table."""
+    changes = {cell: delta for cell, delta in changes.items() if delta}
+    if not changes:
+        return
+    with transaction.atomic():
+        # Cells are never deleted, so creating the missing ones first lets
+        # every change be a plain increment
+        JobListingFacet.objects.bulk_create(
+            [JobListingFacet(location=location, company_id=company_id, salary_band=band)
+             for (location, company_id, band), delta in changes.items() if delta > 0],
+            ignore_conflicts=True)
+        for (location, company_id, band), delta in changes.items():
+            JobListingFacet.objects.filter(location=location, company_id=company_id, salary_band=band) \
+                .update(count=F('count') + delta)
+
+
+def listing_saving(listing):
+    """
+    Read the stored cell of a listing about to be saved that was not loaded
+    in full, so post_save can move it. Runs from pre_save.
+    """
+    old = getattr(listing, '_facet_values', None)
+    if listing.pk is not None and (old is None or None in old):
+        listing._facet_values = JobListing.objects.filter(pk=listing.pk) \
+            .values_list('location', 'company_id', 'salary').first()
+
+
+def listing_saved(listing, created):
+    """Move a saved listing to its facet cell. Runs from post_save."""
+    old = getattr(listing, '_facet_values', None)
+    values = listing._facet_values = (listing.location, listing.company_id, listing.salary)
+    if created:
+        _apply({_cell(*values): 1})
+    elif old is None:
+        # Updated with a pk that had no row; the rebuild_facets command fixes the count
+        logger.warning("Facet cell of listing %s is unknown; counts drift until rebuild_facets", listing.pk)
+        _apply({_cell(*values): 1})
+    elif _cell(*old) != _cell(*values):
+        _apply({_cell(*old): -1, _cell(*values): 1})
+
+
+def listing_deleted(listing):
+    values = getattr(listing, '_facet_values', None)
+    if values is None or None in values:
+        values = (listing.location, listing.company_id, listing.salary)
+    _apply({_cell(*values): -1})
+
+
+def count_listings(listings):
+    """Count listings inserted with bulk_create, which skips the signals."""
+    _apply(Counter(_cell(listing.location, listing.company_id, listing.salary) for listing in listings))
+
+
+def rebuild():
+    """Recompute the whole facet table from JobListing."""
+    cells = JobListing.objects.annotate(band=salary_band_expression()) \
+        .values_list('location', 'company_id', 'band').annotate(n=Count('id')).order_by()
+    with transaction.atomic():
+        JobListingFacet.objects.all().delete()
+        JobListingFacet.objects.bulk_create(
+            [JobListingFacet(location=location, company_id=company_id, salary_band=band, count=n)
+             for location, company_id, band, n in cells], batch_size=1000)
+    # Cached ?facets=1 responses carry the old counts
+    transaction.on_commit(caching.bump_listing_version)
+
+
+def facet_key(filters, version):
+    params = '&'.join(f'{name}={filters[name]}' for name in sorted(filters))
+    return f'api:facets:{version}:{hashlib.md5(params.encode()).hexdigest()}'
+
+
+def facet_counts(filterset):
+    """
+    Listing counts per location, company and salary band for the listings
+    matching ``filterset``. JobListingFilter only allows ?facets=1 with the
+    filters the facet table can answer; salary filters are answered per
+    band, so the counts are ``exact`` only when the bounds fall on band
+    limits.
+
+    The counts are cached per listing version and filter values, so every
+    page, ordering and cursor of one result set shares them. The first
+    request after a write sums the matching cells, whose number depends on
+    the distinct locations, companies and bands rather than the listings;
+    ``bench_facets`` measures both paths.
+    """
+    filters = {name: value for name, value in filterset.filters_used.items() if name in FACET_FILTERS}
+    cache = caching.get_cache()
+    key = facet_key(filters, caching.listing_version())
+    facets = cache.get(key)
+    if facets is None:
+        # Like the response cache, never store counts read from a lagging replica
+        with primary_reads():
+            facets = compute_facets(filters)
+        cache.set(key, facets, getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 300))
+    return facets
+
+
+def compute_facets(filters):
+    """Sum the facet table cells matching ``filters``."""
+    cells = JobListingFacet.objects.filter(count__gt=0)
+    if 'company' in filters:
+        cells = cells.filter(company_id=filters['company'])
+    if 'location' in filters:
+        cells = cells.filter(location=filters['location'])
+    if 'location_prefix' in filters:
+        cells = cells.filter(**prefix_lookups('location', filters['location_prefix']))
+    limits = salary_bands()
+    exact = True
+    if 'salary_min' in filters:
+        band = salary_band(filters['salary_min'])
+        cells = cells.filter(salary_band__gte=band)
+        exact &= filters['salary_min'] == limits[band] or filters['salary_min'] <= 0
+    if 'salary_max' in filters:
+        band = salary_band(filters['salary_max'])
+        cells = cells.filter(salary_band__lte=band)
+        # salary_max is inclusive and salaries have cents: 49999.99 ends the band below 50000
+        exact &= band + 1 < len(limits) and filters['salary_max'] + Decimal('0.01') >= limits[band + 1]
+
+    # One pass over the matching cells instead of a GROUP BY per facet
+    locations, companies, bands = Counter(), Counter(), Counter()
+    for location, company_id, band, n in cells.values_list('location', 'company_id', 'salary_band', 'count'):
+        locations[location] += n
+        companies[company_id] += n
+        bands[band] += n
+
+    names = dict(Employer.objects.filter(pk__in=companies).values_list('pk', 'company_name'))
+    return {
+        'exact': exact,
+        'location': [{'value': location, 'count': n} for location, n in locations.most_common()],
+        'company': [{'id': company_id, 'name': names.get(company_id), 'count': n}
+                    for company_id, n in companies.most_common()],
+        'salary': [{'min': limits[band], 'max': limits[band + 1] if band + 1 < len(limits) else None, 'count': n}
+                   for band, n in sorted(bands.items())],
+    }
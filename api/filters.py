@@ -0,0 +1,129 @@
+import django_filters
+from django import forms
+from rest_framework.settings import api_settings
+
+from .models import JobListing
+from .pagination import JobListingPagination
+
+# Query parameters read by the pagination or by DRF's content negotiation
+# (?format=) rather than the filter set
+CONTROL_PARAMS = frozenset({'cursor', 'page_size', api_settings.URL_FORMAT_OVERRIDE} - {None})
+# Filters on a range of one column. An index range scan on the column also
+# returns the rows in its order, so these need the ordering on the same
+# column; without an explicit ?ordering= they get the ascending one.
+RANGE_FILTERS = {
+    'salary_min': 'salary',
+    'salary_max': 'salary',
+    'created_after': 'created_at',
+    'created_before': 'created_at',
+    'location_prefix': 'location',
+}
+# Equality filters an index serves together with each ordering column:
+# (company|location, created_at, id) and (location, id)
+EQUALITY_FILTERS = {
+    'created_at': {'company', 'location'},
+    'salary': set(),
+    'location': {'location'},
+}
+DEFAULT_ORDERING = '-created_at'
+# Filters the facet table can answer ?facets=1 for (see api.facets)
+FACET_FILTERS = frozenset({'company', 'location', 'location_prefix', 'salary_min', 'salary_max'})
+
+
+def prefix_lookups(field, value):
+    """
+    ``field`` starts with ``value``, as a half-open range on the column so an
+    index applies on every backend; startswith keeps the exact semantics
+    under any collation. Without a next code point (U+10FFFF, or U+D7FF
+    whose successor is a surrogate) the range has no upper bound.
+    """
+    last = ord(value[-1])
+    if last in (0xD7FF, 0x10FFFF):
+        return {f'{field}__gte': value, f'{field}__startswith': value}
+    upper = value[:-1] + chr(last + 1)
+    return {f'{field}__gte': value, f'{field}__lt': upper, f'{field}__startswith': value}
+
+
+class IdFilter(django_filters.Filter):
+    # A plain id: ModelChoiceFilter would look the object up first
+    field_class = forms.IntegerField
+
+
+class JobListingFilter(django_filters.FilterSet):
+    """
+    Filters for the public listing endpoint, each backed by an index of
+    JobListing. Unknown parameters and combinations no single index serves
+    in the cursor order are rejected instead of ignored; after is_valid(),
+    ``page_ordering`` is the ordering the page must use and ``with_facets``
+    whether the response carries facet counts.
+    """
+    company = IdFilter(field_name='company_id')
+    location = django_filters.CharFilter(field_name='location')
+    location_prefix = django_filters.CharFilter(method='filter_location_prefix')
+    salary_min = django_filters.NumberFilter(field_name='salary', lookup_expr='gte')
+    salary_max = django_filters.NumberFilter(field_name='salary', lookup_expr='lte')
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    # Applied by JobListingPagination, which seeks on the chosen ordering
+    ordering = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in JobListingPagination.orderings], method='filter_ordering')
+    # Read by the view, which adds the counts of api.facets; 1/0 or true/false
+    facets = django_filters.BooleanFilter(method='filter_facets', widget=django_filters.widgets.BooleanWidget())
+
+    class Meta:
+        model = JobListing
+        fields = []
+
+    def filter_location_prefix(self, queryset, name, value):
+        return queryset.filter(**prefix_lookups('location', value))
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset
+
+    def filter_facets(self, queryset, name, value):
+        return queryset
+
+    def is_valid(self):
+        if not super().is_valid():
+            return False
+        unknown = sorted(set(self.data) - set(self.filters) - CONTROL_PARAMS)
+        if unknown:
+            allowed = ', '.join(sorted(set(self.filters) | CONTROL_PARAMS))
+            self.form.add_error(None, f"Unsupported parameters: {', '.join(unknown)}. Allowed: {allowed}.")
+            return False
+
+        # Only combinations one index range scan can answer in cursor order
+        used = self.filters_used
+        self.with_facets = bool(self.form.cleaned_data.get('facets'))
+        if self.with_facets and set(used) - FACET_FILTERS:
+            self.form.add_error(None, "Facets can only be combined with these filters: "
+                                      f"{', '.join(sorted(FACET_FILTERS))}.")
+            return False
+        ranges = {RANGE_FILTERS[name] for name in used if name in RANGE_FILTERS}
+        ordering = self.form.cleaned_data.get('ordering')
+        if len(ranges) > 1:
+            self.form.add_error(None, "Range filters can only be used on one of salary, created_at "
+                                      "and location_prefix at a time.")
+            return False
+        if ranges:
+            column = ranges.pop()
+            if ordering and ordering.lstrip('-') != column:
+                self.form.add_error(None, f"Range filters on {column} need ordering={column} or -{column}.")
+                return False
+            self.page_ordering = ordering or column
+        else:
+            self.page_ordering = ordering or DEFAULT_ORDERING
+            column = self.page_ordering.lstrip('-')
+        equalities = {name for name in used if name not in RANGE_FILTERS}
+        if len(equalities) > 1 or equalities - EQUALITY_FILTERS[column]:
+            allowed = ', '.join(sorted(EQUALITY_FILTERS[column])) or 'none'
+            self.form.add_error(None, f"With ordering on {column} at most one of these filters can be "
+                                      f"used: {allowed}.")
+            return False
+        return True
+
+    @property
+    def filters_used(self):
+        """The filters of this request that have a value, by name."""
+        return {name: value for name, value in self.form.cleaned_data.items()
+                if name in self.filters and name not in ('ordering', 'facets') and value not in (None, '')}
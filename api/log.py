@@ -0,0 +1,21 @@
+import json
+import logging
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger and message, plus the
+    ``metrics`` dict that api.middleware attaches to its records.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'metrics', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
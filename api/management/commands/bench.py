@@ -0,0 +1,392 @@
+import json
+import logging
+import random
+import statistics
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework.test import APIClient
+
+from api import search
+from api.authentication import issue_token
+from api.models import Employee, Employer, JobApplication, JobListing
+from api.seed import LOCATIONS, SKILLS, scratch_database, seed_dataset
+
+BENCH_PASSWORD = 'bench-password'
+
+
+class Fixtures:
+    """Users and row ids the request builders pick from."""
+
+    def __init__(self, sample_size=50):
+        self.employers = list(Employer.objects.filter(joblisting__isnull=False).distinct()
+                              .select_related('user').order_by('pk')[:sample_size])
+        self.employees = list(Employee.objects.filter(jobapplication__isnull=False).distinct()
+                              .select_related('user').order_by('pk')[:sample_size])
+        if not self.employers or not self.employees:
+            raise CommandError('The database has no listings or applications to benchmark against.')
+        self.listings = {employer.pk: list(JobListing.objects.filter(company=employer)
+                                           .values_list('pk', flat=True)[:100])
+                         for employer in self.employers}
+        self.all_listings = [pk for pks in self.listings.values() for pk in pks]
+        self.received = {employer.pk: list(JobApplication.objects.filter(job_listing__company=employer)
+                                           .values_list('pk', flat=True)[:100])
+                         for employer in self.employers}
+        self.submitted = {employee.pk: list(JobApplication.objects.filter(applicant=employee)
+                                            .values_list('pk', flat=True)[:100])
+                          for employee in self.employees}
+        self.admin, _ = User.objects.get_or_create(username='bench-admin', defaults={
+            'is_staff': True, 'is_superuser': True})
+        self.login, created = User.objects.get_or_create(username='bench-login')
+        if created or not self.login.check_password(BENCH_PASSWORD):
+            self.login.set_password(BENCH_PASSWORD)
+            self.login.save()
+        self.revokers = 0
+        self.tokens = {}
+
+    def revoker(self):
+        # A user of its own per revocation, since it invalidates their tokens
+        self.revokers += 1
+        return User.objects.get_or_create(username=f'bench-revoker-{self.revokers}')[0]
+
+    def token(self, user):
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = issue_token(user)
+        return self.tokens[user.pk]
+
+
+class NoFixture(Exception):
+    """Raised by a request builder whose route has nothing left to request."""
+
+
+# Each builder returns (method, path, user, data) for one request. Users are
+# drawn from a pool so that per-user rate limits see realistic traffic.
+def _employer(fx, rng):
+    return rng.choice(fx.employers)
+
+
+def _employee(fx, rng):
+    return rng.choice(fx.employees)
+
+
+def _own_listing(fx, rng):
+    employer = _employer(fx, rng)
+    return employer, rng.choice(fx.listings[employer.pk])
+
+
+def _with_received(fx, rng):
+    employers = [e for e in fx.employers if fx.received[e.pk]]
+    if not employers:
+        raise NoFixture
+    return rng.choice(employers)
+
+
+def _received_application(fx, rng):
+    employer = _with_received(fx, rng)
+    return employer, rng.choice(fx.received[employer.pk])
+
+
+def _withdraw(fx, rng):
+    # Withdrawn applications are deleted, so each id is used once
+    employees = [e for e in fx.employees if fx.submitted[e.pk]]
+    if not employees:
+        raise NoFixture
+    employee = rng.choice(employees)
+    application_id = fx.submitted[employee.pk].pop()
+    return 'POST', reverse('withdraw_application', args=[application_id]), employee.user, None
+
+
+def _status(fx, rng):
+    employer, application_id = _received_application(fx, rng)
+    return ('PUT', reverse('update_application_status', args=[application_id]), employer.user,
+            {'status': rng.choice(['PR', 'AC', 'RE'])})
+
+
+def _batch_status(fx, rng):
+    employer = _with_received(fx, rng)
+    ids = rng.sample(fx.received[employer.pk], min(50, len(fx.received[employer.pk])))
+    return ('POST', reverse('batch_update_application_status'), employer.user,
+            {'ids': ids, 'status': rng.choice(['PR', 'AC', 'RE'])})
+
+
+def _applications(name):
+    def build(fx, rng):
+        employer, listing_id = _own_listing(fx, rng)
+        return 'GET', reverse(name, args=[listing_id]), employer.user, None
+    return build
+
+
+def _resume(fx, rng):
+    employer, application_id = _received_application(fx, rng)
+    employee_id = JobApplication.objects.values_list('applicant_id', flat=True).get(pk=application_id)
+    return 'GET', reverse('employee_resume', args=[employee_id]), employer.user, None
+
+
+def _update_listing(fx, rng):
+    employer, listing_id = _own_listing(fx, rng)
+    return ('PATCH', reverse('update_job_listing', args=[listing_id]), employer.user,
+            {'salary': rng.randrange(30000, 200000, 500)})
+
+
+ROUTES = {
+    # name: (default weight, builder)
+    'job_listings_with_filters': (30, lambda fx, rng: (
+        'GET', reverse('job_listings_with_filters') + '?' + urlencode({'location': rng.choice(LOCATIONS)}),
+        _employee(fx, rng).user, None)),
+    'search_job_listings': (15, lambda fx, rng: (
+        'GET', reverse('search_job_listings') + '?' + urlencode({'q': ' '.join(rng.sample(SKILLS, 2))}),
+        _employee(fx, rng).user, None)),
+    'recommended_job_listings': (5, lambda fx, rng: (
+        'GET', reverse('recommended_job_listings'), _employee(fx, rng).user, None)),
+    'employee_applications': (10, lambda fx, rng: (
+        'GET', reverse('employee_applications'), _employee(fx, rng).user, None)),
+    'job_listings': (8, lambda fx, rng: ('GET', reverse('job_listings'), _employer(fx, rng).user, None)),
+    'employer_dashboard': (3, lambda fx, rng: ('GET', reverse('employer_dashboard'), _employer(fx, rng).user, None)),
+    'lifecycle_events': (2, lambda fx, rng: (
+        'GET', reverse('lifecycle_events') + '?' + urlencode({'after': rng.randrange(0, 1000)}),
+        _employer(fx, rng).user, None)),
+    'applications_for_job_listing': (8, _applications('applications_for_job_listing')),
+    'add_job_application': (5, lambda fx, rng: (
+        'POST', reverse('add_job_application', args=[rng.choice(fx.all_listings)]),
+        _employee(fx, rng).user, None)),
+    'update_application_status': (3, _status),
+    'batch_update_application_status': (1, _batch_status),
+    'ranked_applications_for_job_listing': (2, _applications('ranked_applications_for_job_listing')),
+    'update_job_listing': (2, _update_listing),
+    'withdraw_application': (1, _withdraw),
+    'update_employee_profile': (1, lambda fx, rng: (
+        'PUT', reverse('update_employee_profile'), _employee(fx, rng).user,
+        {'years_of_experience': rng.randint(0, 25)})),
+    'update_employer_profile': (1, lambda fx, rng: (
+        'PUT', reverse('update_employer_profile'), _employer(fx, rng).user,
+        {'company_description': f'Benchmarked at {time.time():.0f}'})),
+    'employee_resume': (1, _resume),
+    'bulk_job_listings': (1, lambda fx, rng: (
+        'GET', reverse('bulk_job_listings'), _employer(fx, rng).user, None)),
+    'api_token_auth': (1, lambda fx, rng: (
+        'POST', reverse('api_token_auth'), None, {'username': 'bench-login', 'password': BENCH_PASSWORD})),
+    'revoke_token': (1, lambda fx, rng: ('POST', reverse('revoke_token'), fx.revoker(), None)),
+    'listing_cache_stats': (1, lambda fx, rng: ('GET', reverse('listing_cache_stats'), fx.admin, None)),
+}
+
+
+def load_mix(path):
+    """
+    A mix file has one JSON object per line, ``{"route": <url name>,
+    "weight": <int>}``; only the routes it lists are replayed.
+    """
+    mix = {}
+    with open(path) as fh:
+        for line_number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('route') not in ROUTES:
+                raise CommandError(f'{path}:{line_number}: unknown route {entry.get("route")!r}')
+            mix[entry['route']] = int(entry.get('weight', ROUTES[entry['route']][0]))
+    return mix
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample['seconds'] for sample in samples)
+    if len(latencies) > 1:
+        quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    else:
+        quantiles = latencies * 99
+    queries = [sample['queries'] for sample in samples if sample['queries'] is not None]
+    return {
+        'requests': len(samples),
+        'rps': len(samples) / elapsed if elapsed else None,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'queries_per_request': statistics.mean(queries) if queries else None,
+        'statuses': dict(sorted(Counter(str(sample['status']) for sample in samples).items())),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset in a scratch database and replay a weighted "
+        "mix of requests over every route in api.urls through the test client, "
+        "or against a live server with --live. Reports latency percentiles, "
+        "requests per second and queries per request, optionally as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employers', type=int, default=50)
+        parser.add_argument('--employees', type=int, default=2_000)
+        parser.add_argument('--listings', type=int, default=5_000)
+        parser.add_argument('--applications', type=int, default=50_000)
+        parser.add_argument('--requests', type=int, default=2_000)
+        parser.add_argument('--warmup', type=int, default=50, help='Requests sent before measuring')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--mix', help='JSON lines file of {"route", "weight"} replacing the default mix')
+        parser.add_argument('--live', metavar='URL',
+                            help='Send the requests to a running server (e.g. gunicorn) instead of the '
+                                 'test client. It must use the configured database, seeded with --seed-only.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel clients with --live')
+        parser.add_argument('--seed-only', action='store_true',
+                            help='Seed the configured database (not a scratch one) and exit')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse a previously seeded scratch database')
+
+    def handle(self, *args, **options):
+        missing = {pattern.name for pattern in get_resolver('api.urls').url_patterns} - set(ROUTES)
+        if missing:
+            self.stderr.write(f'No request builder for: {", ".join(sorted(missing))}')
+        mix = load_mix(options['mix']) if options['mix'] else {name: weight for name, (weight, _) in ROUTES.items()}
+
+        if options['verbosity'] < 2:
+            # 404/500 responses are part of the mix and counted in the report
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        if options['seed_only']:
+            self._seed(options)
+            return
+        if options['live']:
+            dataset = {'employers': Employer.objects.count(), 'listings': JobListing.objects.count(),
+                       'applications': JobApplication.objects.count()}
+            results = self._replay(mix, options, dataset)
+        else:
+            with scratch_database(keepdb=options['keepdb']):
+                if not JobApplication.objects.exists():
+                    self._seed(options)
+                dataset = {'employers': Employer.objects.count(), 'listings': JobListing.objects.count(),
+                           'applications': JobApplication.objects.count()}
+                results = self._replay(mix, options, dataset)
+
+        self._report(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def _seed(self, options):
+        seed_dataset(employers=options['employers'], employees=options['employees'],
+                     listings=options['listings'], applications=options['applications'],
+                     seed=options['seed'], log=lambda message: self.stdout.write(f'  seeded {message}'))
+        # bulk_create skips the signals that keep the search index current
+        search.get_backend().rebuild()
+
+    def _replay(self, mix, options, dataset):
+        rng = random.Random(options['seed'])
+        fixtures = Fixtures()
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        plan = rng.choices(names, weights, k=options['warmup'] + options['requests'])
+        requests, skipped = [], Counter()
+        for name in plan:
+            try:
+                requests.append((name, ROUTES[name][1](fixtures, rng)))
+            except NoFixture:
+                skipped[name] += 1
+        # Tokens are issued up front so that issuing them is not measured
+        headers = [self._headers(fixtures, request[2]) for _, request in requests]
+        send = self._live_sender(options['live']) if options['live'] else self._client_sender()
+
+        warmup, measured = min(options['warmup'], len(requests)), []
+        for i in range(warmup):
+            send(requests[i][1], headers[i])
+
+        start = time.perf_counter()
+        indexes = range(warmup, len(requests))
+        if options['live']:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                samples = list(pool.map(lambda i: send(requests[i][1], headers[i]), indexes))
+        else:
+            samples = [send(requests[i][1], headers[i]) for i in indexes]
+        elapsed = time.perf_counter() - start
+        for i, sample in zip(indexes, samples):
+            sample['route'] = requests[i][0]
+            measured.append(sample)
+
+        by_route = {}
+        for sample in measured:
+            by_route.setdefault(sample['route'], []).append(sample)
+        return {
+            'commit': self._commit(),
+            'target': options['live'] or 'test-client',
+            'dataset': dataset,
+            'mix': mix,
+            # Draws of routes that had run out of rows to request
+            'skipped': dict(sorted(skipped.items())),
+            'total': summarize(measured, elapsed),
+            # Per-route rps is the share of the total, not a throughput of its own
+            'routes': {name: summarize(samples, elapsed) for name, samples in sorted(by_route.items())},
+        }
+
+    @staticmethod
+    def _headers(fixtures, user):
+        if user is None:
+            return {}
+        return {'Authorization': f'Bearer {fixtures.token(user)}'}
+
+    @staticmethod
+    def _client_sender():
+        # Server errors are counted like any other status, not raised
+        client = APIClient(raise_request_exception=False)
+
+        def send(request, headers):
+            method, path, _, data = request
+            extra = {f'HTTP_{key.upper()}': value for key, value in headers.items()}
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, method.lower())(path, data, format='json', **extra)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                seconds = time.perf_counter() - start
+            return {'status': response.status_code, 'seconds': seconds, 'queries': len(queries)}
+        return send
+
+    @staticmethod
+    def _live_sender(base_url):
+        base_url = base_url.rstrip('/')
+
+        def send(request, headers):
+            method, path, _, data = request
+            body = json.dumps(data).encode() if data is not None else None
+            http_request = urllib.request.Request(base_url + path, data=body, method=method, headers={
+                'Content-Type': 'application/json', **headers})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(http_request) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as exc:
+                exc.read()
+                status = exc.code
+            return {'status': status, 'seconds': time.perf_counter() - start, 'queries': None}
+        return send
+
+    @staticmethod
+    def _commit():
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _report(self, results):
+        rows = [('TOTAL', results['total'])] + list(results['routes'].items())
+        self.stdout.write(f"{'route':40} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}  statuses")
+        for name, row in rows:
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f"{name:40} {row['requests']:>6} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                f"{row['p99_ms']:>8.2f} {queries if queries is None else round(queries, 1)!s:>6}  "
+                f"{' '.join(f'{k}:{v}' for k, v in row['statuses'].items())}")
+        if results['skipped']:
+            self.stdout.write('skipped, no rows left: ' + ' '.join(
+                f'{name}:{count}' for name, count in results['skipped'].items()))
+        self.stdout.write(f"{results['total']['rps']:.1f} requests/s against {results['target']} "
+                          f"at {results['commit'] or 'unknown commit'}")
@@ -0,0 +1,86 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from api.caching import bump_listing_version
+from api.facets import facet_counts
+from api.filters import JobListingFilter
+from api.models import JobListing
+from api.pagination import JobListingPagination
+from api.seed import LOCATIONS, scratch_database, seed_dataset
+from api.serializers import JOB_LISTING_PROJECTION
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and compare, per filter accepted with "
+        "?facets=1, the time of the facet counts, cached and right after a "
+        "listing write, with that of the listing page."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100_000)
+        parser.add_argument('--employers', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+
+    def handle(self, *args, **options):
+        cases = {
+            'none': {},
+            'location': {'location': LOCATIONS[0]},
+            'company': {'company': 1},
+            'location_prefix': {'location_prefix': LOCATIONS[0][:2]},
+            'salary_min': {'salary_min': 75000},
+            'salary_range': {'salary_min': 52000, 'salary_max': 98000},
+        }
+        results = {}
+        with scratch_database(keepdb=options['keepdb']):
+            if not JobListing.objects.exists():
+                seed_dataset(employers=options['employers'], employees=10, listings=options['listings'],
+                             applications=0)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            for name, params in cases.items():
+                request = RequestFactory().get('/', {**params, 'facets': 1})
+                filterset = JobListingFilter(request.GET, queryset=JobListing.objects.all())
+                if not filterset.is_valid():
+                    self.stderr.write(f'{name}: {filterset.errors}')
+                    continue
+
+                def page():
+                    paginator = JobListingPagination()
+                    paginator.ordering = paginator.orderings[filterset.page_ordering]
+                    rows = paginator.paginate_queryset(JOB_LISTING_PROJECTION.values(filterset.qs, 'created_at'),
+                                                       request)
+                    return JOB_LISTING_PROJECTION.data(rows)
+
+                results[name] = {
+                    'page_ms': self._median(page, options['repeat']),
+                    'facets_ms': self._median(lambda: facet_counts(filterset), options['repeat']),
+                    'facets_after_write_ms': self._median(lambda: facet_counts(filterset), options['repeat'],
+                                                          setup=bump_listing_version),
+                }
+
+        for name, result in results.items():
+            flag = '' if result['facets_ms'] <= result['page_ms'] else '  (facets slower)'
+            self.stdout.write(f"{name:16} page {result['page_ms']:.2f} ms, facets {result['facets_ms']:.2f} ms, "
+                              f"after a write {result['facets_after_write_ms']:.2f} ms{flag}")
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    @staticmethod
+    def _median(fn, repeat, setup=None):
+        times = []
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return statistics.median(times) * 1000
@@ -0,0 +1,69 @@
+import json
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from api.recommendations import RecommendationIndex
+from api.seed import DEGREES, LOCATIONS, SKILLS, TITLES, random_description
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a recommendation index over synthetic listings in memory and "
+        "time top-k retrieval for random employee profiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=200_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--terms', type=int, default=24, help='Terms kept per listing')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        index = RecommendationIndex(options['terms'])
+
+        start = time.perf_counter()
+        batch = []
+        for listing_id in range(1, options['listings'] + 1):
+            batch.append((listing_id, rng.choice(TITLES), random_description(rng), rng.choice(LOCATIONS),
+                          rng.randrange(30000, 200000, 500)))
+            if len(batch) >= 10_000:
+                index.upsert(batch)
+                batch = []
+        index.upsert(batch)
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(options['queries']):
+            terms = Counter({skill: rng.randint(1, 5) for skill in rng.sample(SKILLS, 8)})
+            terms.update(rng.choice(DEGREES).lower().split())
+            start = time.perf_counter()
+            index.top(terms, options['limit'], location=rng.choice(LOCATIONS),
+                      years_of_experience=rng.randint(0, 25))
+            latencies.append(time.perf_counter() - start)
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        matrix_bytes = sum(getattr(index, name).nbytes for name in (
+            'listing_ids', 'term_ids', 'weights', 'location_codes', 'salaries', 'active'))
+        results = {
+            'listings': len(index),
+            'vocabulary': len(index.vocabulary),
+            'matrix_mb': matrix_bytes / 2**20,
+            'build_seconds': build_seconds,
+            'p50_ms': quantiles[49] * 1000,
+            'p95_ms': quantiles[94] * 1000,
+            'p99_ms': quantiles[98] * 1000,
+        }
+        self.stdout.write(f"{results['listings']} listings, {results['vocabulary']} terms, "
+                          f"{results['matrix_mb']:.1f} MB, built in {build_seconds:.1f} s")
+        self.stdout.write(f"top-{options['limit']}: p50 {results['p50_ms']:.1f} ms, "
+                          f"p95 {results['p95_ms']:.1f} ms, p99 {results['p99_ms']:.1f} ms")
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
@@ -0,0 +1,85 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.models import JobApplication, JobListing
+from api.renderers import FastJSONRenderer
+from api.seed import scratch_database, seed_dataset
+from api.serializers import (JobApplicationSerializer, JobListingSerializer, JOB_APPLICATION_PROJECTION,
+                             JOB_LISTING_PROJECTION)
+
+
+def _best(fn, repeat):
+    """Fastest of ``repeat`` runs of ``fn()`` in seconds, and its result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times), result
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and compare, per page of rows, the list "
+        "serializers on model instances with the values() projections, and "
+        "JSONRenderer with FastJSONRenderer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with scratch_database(keepdb=options['keepdb']):
+            if not JobApplication.objects.exists():
+                seed_dataset(employers=20, employees=max(rows, 100), listings=max(rows, 1000),
+                             applications=max(rows, 1000) * 2)
+            cases = {
+                'listings': (JobListingSerializer, JOB_LISTING_PROJECTION,
+                             JobListing.objects.order_by('-created_at', '-id')[:rows],
+                             JOB_LISTING_PROJECTION.values(JobListing.objects.order_by('-created_at', '-id'))[:rows]),
+                'applications': (JobApplicationSerializer, JOB_APPLICATION_PROJECTION,
+                                 JobApplication.objects.select_related('applicant', 'status')
+                                 .order_by('-applied_at', '-id')[:rows],
+                                 JOB_APPLICATION_PROJECTION.values(JobApplication.objects.order_by('-applied_at', '-id'))
+                                 [:rows]),
+            }
+            results = {}
+            for name, (serializer_class, projection, queryset, values) in cases.items():
+                # Query and serialize together, the way a view builds a page
+                serializer_best, serializer_median, expected = _best(
+                    lambda: serializer_class(list(queryset.all()), many=True).data, repeat)
+                projection_best, projection_median, data = _best(lambda: projection.data(list(values.all())), repeat)
+                json_best, json_median, body = _best(lambda: JSONRenderer().render(data), repeat)
+                fast_best, fast_median, fast_body = _best(lambda: FastJSONRenderer().render(data), repeat)
+                if JSONRenderer().render(expected) != body or fast_body != body:
+                    self.stderr.write(f"{name}: the projection or renderer output differs from the serializer's")
+                results[name] = {
+                    'rows': len(data),
+                    'serializer_ms': serializer_median * 1000,
+                    'projection_ms': projection_median * 1000,
+                    'json_renderer_ms': json_median * 1000,
+                    'fast_renderer_ms': fast_median * 1000,
+                    'serializer_rows_per_s': len(data) / serializer_best,
+                    'projection_rows_per_s': len(data) / projection_best,
+                    'json_renderer_rows_per_s': len(data) / json_best,
+                    'fast_renderer_rows_per_s': len(data) / fast_best,
+                }
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name} ({result['rows']} rows): serializer {result['serializer_ms']:.2f} ms, "
+                f"projection {result['projection_ms']:.2f} ms "
+                f"({result['serializer_ms'] / result['projection_ms']:.1f}x); "
+                f"JSONRenderer {result['json_renderer_ms']:.2f} ms, FastJSONRenderer "
+                f"{result['fast_renderer_ms']:.2f} ms ({result['json_renderer_ms'] / result['fast_renderer_ms']:.1f}x)")
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
@@ -0,0 +1,163 @@
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connections, transaction
+
+from api.models import Employee, JobApplication, JobListing
+from api.notifications import queue_application_submitted
+from api.seed import scratch_database, seed_dataset
+from api.statuses import get_status, invalidate
+
+SQLITE_MODES = {
+    # Stock backend: rollback journal, deferred transactions, 5 s default timeout
+    'sqlite-stock': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    'sqlite-tuned': {'ENGINE': 'api.db_backends.sqlite3', 'OPTIONS': {'timeout': 20}},
+}
+
+# Run against the configured PostgreSQL server. Connections are closed after
+# every write, as at the end of a request with CONN_MAX_AGE = 0: the stock
+# backend reconnects each time, the pooled one reuses an idle connection.
+SERVER_MODES = {
+    'postgresql-stock': {'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'postgresql-pooled': {'ENGINE': 'api.db_backends.postgresql', 'CONN_MAX_AGE': 0,
+                          'OPTIONS': {'pool': {'max_idle': 10}}},
+}
+
+
+def _use_database(settings_dict):
+    """Point the default alias at ``settings_dict`` for this process."""
+    connections.close_all()
+    try:
+        del connections[DEFAULT_DB_ALIAS]
+    except AttributeError:
+        # Never opened in this thread
+        pass
+    connections.settings[DEFAULT_DB_ALIAS] = connections.configure_settings(
+        {DEFAULT_DB_ALIAS: settings_dict})[DEFAULT_DB_ALIAS]
+    invalidate()
+
+
+def _worker(worker, workers, duration, pairs, results):
+    # Each worker applies with its own slice of (listing, employee) pairs, the
+    # way add_job_application does: insert plus outbox row in one transaction.
+    connections.close_all()
+    status = get_status('AP')
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    for listing_id, employee_id in pairs[worker::workers]:
+        if time.perf_counter() >= deadline:
+            break
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                application, created = JobApplication.objects.select_related(
+                    'job_listing__company', 'applicant').get_or_create(
+                    job_listing_id=listing_id, applicant_id=employee_id, defaults={'status': status})
+                if created:
+                    queue_application_submitted(application)
+        except OperationalError:
+            errors += 1
+            continue
+        finally:
+            # What request_finished does: close connections past CONN_MAX_AGE
+            close_old_connections()
+        latencies.append(time.perf_counter() - start)
+    connections.close_all()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure job application write throughput with N concurrent worker "
+        "processes, for stock SQLite, the tuned SQLite backend, the configured "
+        "database and, against a configured PostgreSQL server, the stock and "
+        "pooled PostgreSQL backends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per run')
+        parser.add_argument('--modes', nargs='+', default=[*SQLITE_MODES, 'configured', *SERVER_MODES],
+                            choices=[*SQLITE_MODES, 'configured', *SERVER_MODES])
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+
+    def handle(self, *args, **options):
+        configured = settings.DATABASES[DEFAULT_DB_ALIAS]
+        results = {}
+        try:
+            for mode in options['modes']:
+                if mode == 'configured' and 'sqlite3' in configured['ENGINE']:
+                    # A scratch copy of SQLite would be in memory; the tuned mode covers it
+                    self.stdout.write('configured: SQLite, see sqlite-tuned')
+                    continue
+                if mode in SERVER_MODES and 'postgresql' not in configured['ENGINE']:
+                    self.stdout.write(f'{mode}: skipped, DB_ENGINE is not a PostgreSQL backend')
+                    continue
+                results[mode] = {}
+                for workers in options['workers']:
+                    results[mode][workers] = self._run(mode, configured, workers, options['duration'])
+                    row = results[mode][workers]
+                    self.stdout.write(f"{mode:14} {workers:>3} workers: {row['writes_per_second']:8.1f} writes/s, "
+                                      f"p95 {row['p95_ms']:7.1f} ms, {row['errors']} lock errors")
+        finally:
+            _use_database(configured)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def _run(self, mode, configured, workers, duration):
+        if mode in SERVER_MODES:
+            _use_database({**configured, **SERVER_MODES[mode]})
+        if mode == 'configured' or mode in SERVER_MODES:
+            with scratch_database():
+                pairs = self._prepare()
+                return self._measure(workers, duration, pairs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            _use_database({**configured, **SQLITE_MODES[mode], 'NAME': os.path.join(directory, 'bench.sqlite3')})
+            call_command('migrate', verbosity=0)
+            pairs = self._prepare()
+            return self._measure(workers, duration, pairs)
+
+    def _prepare(self):
+        seed_dataset(employers=20, employees=5_000, listings=200, applications=0)
+        listings = list(JobListing.objects.values_list('pk', flat=True))
+        employees = list(Employee.objects.values_list('pk', flat=True))
+        # Every pair at most once, so each attempt is a real insert
+        return [(listing, employee) for employee in employees for listing in listings[:20]]
+
+    def _measure(self, workers, duration, pairs):
+        connections.close_all()
+        pool = getattr(connections[DEFAULT_DB_ALIAS], 'pool', None)
+        if pool is not None:
+            # Forked workers must not share the parent's pooled sockets
+            pool.clear()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        processes = [context.Process(target=_worker, args=(i, workers, duration, pairs, queue))
+                     for i in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for worker_latencies, _ in outcomes for latency in worker_latencies)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        return {
+            'writes': len(latencies),
+            'errors': sum(errors for _, errors in outcomes),
+            'writes_per_second': len(latencies) / elapsed,
+            'p50_ms': quantiles[49] * 1000,
+            'p95_ms': quantiles[94] * 1000,
+        }
@@ -0,0 +1,119 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from api.models import JobApplication, JobListing
+from api.seed import scratch_database, seed_dataset
+from api.statuses import get_status
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and compare query plans and latency of the "
+        "listing/application access patterns with and without the api indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--applications', type=int, default=1_000_000)
+        parser.add_argument('--listings', type=int, default=50_000)
+        parser.add_argument('--employees', type=int, default=20_000)
+        parser.add_argument('--employers', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse a previously seeded scratch database')
+
+    def handle(self, *args, **options):
+        with scratch_database(keepdb=options['keepdb']):
+            if not JobApplication.objects.exists():
+                counts = seed_dataset(
+                    employers=options['employers'], employees=options['employees'],
+                    listings=options['listings'], applications=options['applications'],
+                    log=lambda message: self.stdout.write(f'  seeded {message}'))
+            else:
+                counts = {'applications': JobApplication.objects.count()}
+            self._analyze()
+
+            self._drop_indexes()
+            self._analyze()
+            before = self._run_patterns(options['repeat'])
+            self._create_indexes()
+            self._analyze()
+            after = self._run_patterns(options['repeat'])
+
+        results = {'dataset': counts, 'vendor': connection.vendor, 'patterns': []}
+        for name in before:
+            results['patterns'].append({'name': name, 'before': before[name], 'after': after[name]})
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  before: {before[name]['median_ms']:.2f} ms median, "
+                              f"{before[name]['p95_ms']:.2f} ms p95")
+            self.stdout.write('    ' + before[name]['plan'].replace('\n', '\n    '))
+            self.stdout.write(f"  after:  {after[name]['median_ms']:.2f} ms median, "
+                              f"{after[name]['p95_ms']:.2f} ms p95")
+            self.stdout.write('    ' + after[name]['plan'].replace('\n', '\n    '))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def _patterns(self):
+        listing = JobListing.objects.order_by('pk')[JobListing.objects.count() // 2]
+        application = JobApplication.objects.filter(job_listing=listing).first()
+        newest = JobListing.objects.order_by('-created_at', '-id')[:1000]
+        deep = list(newest.values_list('created_at', 'id'))[-1]
+        page = ('-created_at', '-id')
+        return {
+            'listings: first page': JobListing.objects.order_by(*page)[:21],
+            'listings: deep cursor page': JobListing.objects.filter(
+                Q(created_at__lte=deep[0]) & ~Q(created_at=deep[0], id__gte=deep[1])).order_by(*page)[:21],
+            'listings: filter location': JobListing.objects.filter(location=listing.location).order_by(*page)[:21],
+            'listings: salary range by salary': JobListing.objects.filter(salary__gte=listing.salary)
+                .order_by('salary', 'id')[:21],
+            'listings: filter company': JobListing.objects.filter(company_id=listing.company_id).order_by(*page)[:21],
+            'applications for listing': JobApplication.objects.filter(job_listing=listing)
+                .exclude(status=get_status('RE')).order_by('-applied_at', '-id')[:21],
+            'applications of employee': JobApplication.objects.filter(applicant_id=application.applicant_id)
+                .order_by('-applied_at', '-id')[:21],
+            'duplicate application check': JobApplication.objects.filter(
+                job_listing=listing, applicant_id=application.applicant_id),
+        }
+
+    def _run_patterns(self, repeat):
+        results = {}
+        for name, queryset in self._patterns().items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                'median_ms': statistics.median(timings),
+                'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                'plan': queryset.explain(),
+            }
+        return results
+
+    def _indexed_models(self):
+        return [JobListing, JobApplication]
+
+    def _drop_indexes(self):
+        # The unique constraint stays: it is needed for correctness, and
+        # SQLite would rebuild it with the table anyway
+        with connection.schema_editor() as editor:
+            for model in self._indexed_models():
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+
+    def _create_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in self._indexed_models():
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
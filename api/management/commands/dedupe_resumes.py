@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Employee
+from api.storage import content_digest
+
+
+class Command(BaseCommand):
+    help = (
+        "Move resumes stored under their upload names into the content-addressed "
+        "layout, so duplicate files are kept once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = Employee._meta.get_field('resume').storage
+        legacy_names = set()
+        moved = 0
+        for employee in Employee.objects.exclude(resume='').iterator():
+            name = employee.resume.name
+            if content_digest(name) or not storage.exists(name):
+                continue
+            legacy_names.add(name)
+            if options['dry_run']:
+                self.stdout.write(f'would move {name}')
+                continue
+            with storage.open(name, 'rb') as fh:
+                new_name = storage.save(name, fh)
+            with transaction.atomic():
+                Employee.objects.filter(resume=name).update(resume=new_name)
+            moved += 1
+
+        if not options['dry_run']:
+            for name in legacy_names:
+                if not Employee.objects.filter(resume=name).exists():
+                    storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} resumes into content-addressed storage'))
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from api.models import Employee
+from api.resumes import extract_text_from_path, store_resume_text
+
+
+class Command(BaseCommand):
+    help = "Extract text from new or changed resumes in a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--all', action='store_true', help='Re-extract every resume, not just stale ones')
+
+    def handle(self, *args, **options):
+        employees = Employee.objects.exclude(resume='')
+        if not options['all']:
+            employees = employees.filter(Q(resume_text__isnull=True) | ~Q(resume_text__resume_name=F('resume')))
+        storage = Employee._meta.get_field('resume').storage
+
+        self.done = self.failed = 0
+        batch = []
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for employee in employees.order_by('pk').iterator():
+                if storage.exists(employee.resume.name):
+                    batch.append(employee)
+                if len(batch) >= options['batch_size']:
+                    self._extract(pool, storage, batch)
+                    batch = []
+            if batch:
+                self._extract(pool, storage, batch)
+        self.stdout.write(self.style.SUCCESS(f'Extracted {self.done} resumes, {self.failed} failed'))
+
+    def _extract(self, pool, storage, employees):
+        # One future per file, so an unreadable resume fails alone
+        futures = [(employee, pool.submit(extract_text_from_path, storage.path(employee.resume.name)))
+                   for employee in employees]
+        for employee, future in futures:
+            try:
+                text = future.result()
+            except Exception as exc:
+                self.failed += 1
+                self.stderr.write(f'{employee.resume.name}: {type(exc).__name__}: {exc}')
+                continue
+            store_resume_text(employee, employee.resume.name, text)
+            self.done += 1
@@ -0,0 +1,192 @@
+import asyncio
+import io
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import path
+
+from api import async_views, views
+from api.authentication import issue_token
+from api.caching import bump_listing_version
+from api.models import Employee, JobApplication, JobListing
+from api.seed import scratch_database, seed_dataset
+
+
+def _urlconf(module):
+    # The read routes only, without the rate limits of api.urls
+    class URLConf:
+        urlpatterns = [
+            path('job-listings/<int:job_listing_id>/applications/', module.applications_for_job_listing),
+            path('job-listings/apply', module.job_listings_with_filters),
+            path('employee/applications/', module.employee_applications),
+        ]
+    return URLConf
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and load-test the read endpoints through the "
+        "sync views on a WSGI thread pool and the async views on the ASGI "
+        "handler, with an optional simulated database round-trip time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64, help='Clients sending requests back to back')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per run')
+        parser.add_argument('--wsgi-threads', type=int, default=8,
+                            help='Worker threads serving the WSGI run, like gunicorn --threads')
+        parser.add_argument('--db-latency', type=float, default=5.0,
+                            help='Milliseconds added to every query to mimic a remote database')
+        parser.add_argument('--listings', type=int, default=5_000)
+        parser.add_argument('--applications', type=int, default=50_000)
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse a previously seeded scratch database')
+
+    def handle(self, *args, **options):
+        with scratch_database(keepdb=options['keepdb']):
+            if not JobApplication.objects.exists():
+                seed_dataset(employers=50, employees=2_000, listings=options['listings'],
+                             applications=options['applications'],
+                             log=lambda message: self.stdout.write(f'  seeded {message}'))
+            requests = self._requests(options['requests'])
+
+            latency = options['db_latency'] / 1000
+
+            def slow_query(execute, sql, params, many, context):
+                time.sleep(latency)
+                return execute(sql, params, many, context)
+
+            def add_latency(sender, connection, **kwargs):
+                if slow_query not in connection.execute_wrappers:
+                    connection.execute_wrappers.append(slow_query)
+
+            if latency:
+                connection_created.connect(add_latency)
+            try:
+                results = {}
+                with override_settings(ROOT_URLCONF=_urlconf(views)):
+                    results['wsgi'] = self._run_wsgi(requests, options)
+                bump_listing_version()
+                with override_settings(ROOT_URLCONF=_urlconf(async_views)):
+                    results['asgi'] = self._run_asgi(requests, options)
+            finally:
+                connection_created.disconnect(add_latency)
+
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  {result['rps']:.0f} req/s, p50 {result['p50_ms']:.1f} ms, "
+                              f"p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+                              f"{result['errors']} errors")
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump({'options': {k: options[k] for k in (
+                    'concurrency', 'requests', 'wsgi_threads', 'db_latency')}, 'results': results}, fh, indent=2)
+
+    def _requests(self, count):
+        """
+        ``count`` (path, query string, token) tuples over the three read views.
+        Listing reads use distinct query strings, so they miss the response
+        cache like the long tail of real filter combinations does.
+        """
+        listing = (JobListing.objects.annotate(n=Count('jobapplication')).order_by('-n')
+                   .select_related('company__user').first())
+        employee = (Employee.objects.annotate(n=Count('jobapplication')).order_by('-n')
+                    .select_related('user').first())
+        employer_token = issue_token(listing.company.user).encode()
+        employee_token = issue_token(employee.user).encode()
+        locations = list(JobListing.objects.values_list('location', flat=True).distinct())
+        requests = []
+        for i in range(count):
+            if i % 3 == 0:
+                query = f'location={locations[i % len(locations)]}&page_size={i // len(locations) % 100 + 1}'
+                requests.append(('/job-listings/apply', query, employee_token))
+            elif i % 3 == 1:
+                requests.append(('/employee/applications/', '', employee_token))
+            else:
+                requests.append((f'/job-listings/{listing.pk}/applications/', '', employer_token))
+        return requests
+
+    def _run_wsgi(self, requests, options):
+        application = get_wsgi_application()
+        pool = ThreadPoolExecutor(max_workers=options['wsgi_threads'])
+
+        def call(path, query, token):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'HTTP_AUTHORIZATION': 'Bearer ' + token.decode(),
+                'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+            }
+            statuses = []
+            body = application(environ, lambda status, headers: statuses.append(status))
+            b''.join(body)
+            body.close()
+            return int(statuses[0].split()[0])
+
+        async def send(request):
+            return await asyncio.get_running_loop().run_in_executor(pool, call, *request)
+
+        try:
+            return asyncio.run(self._drive(send, requests, options))
+        finally:
+            pool.shutdown()
+
+    def _run_asgi(self, requests, options):
+        application = get_asgi_application()
+
+        async def send(request):
+            path, query, token = request
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'query_string': query.encode(),
+                'headers': [(b'host', b'localhost'), (b'authorization', b'Bearer ' + token)],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+            }
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def collect(message):
+                messages.append(message)
+
+            await application(scope, receive, collect)
+            return messages[0]['status']
+
+        return asyncio.run(self._drive(send, requests, options))
+
+    async def _drive(self, send, requests, options):
+        # Closed loop: each client waits for its response before the next request
+        latencies, errors = [], 0
+        remaining = iter(range(options['requests']))
+
+        async def client():
+            nonlocal errors
+            for i in remaining:
+                start = time.perf_counter()
+                status = await send(requests[i])
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(options['concurrency'])])
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        quantiles = statistics.quantiles(latencies, n=100)
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / elapsed,
+            'p50_ms': quantiles[49] * 1000,
+            'p95_ms': quantiles[94] * 1000,
+            'p99_ms': quantiles[98] * 1000,
+        }
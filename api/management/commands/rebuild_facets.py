@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.facets import rebuild
+from api.models import JobListingFacet
+
+
+class Command(BaseCommand):
+    help = "Recompute the listing facet counts from the JobListing table."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {JobListingFacet.objects.count()} facet cells'))
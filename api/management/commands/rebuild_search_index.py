@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the job listing full-text index from the JobListing table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['database'])
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index with {type(backend).__name__}'))
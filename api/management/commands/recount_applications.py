@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import recount
+from api.models import JobListing
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-listing application counters from the JobApplication "
+        "table, one batch of listings per transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--listings', type=int, nargs='+', help='Only these listing ids')
+
+    def handle(self, *args, **options):
+        listings = JobListing.objects.order_by('pk')
+        if options['listings']:
+            listings = listings.filter(pk__in=options['listings'])
+        # Ids only, so holding them all is cheap and no cursor stays open across batches
+        listing_ids = list(listings.values_list('pk', flat=True))
+
+        done = 0
+        for start in range(0, len(listing_ids), options['batch_size']):
+            done += recount(listing_ids[start:start + options['batch_size']])
+        self.stdout.write(self.style.SUCCESS(f'Recounted applications of {done} listings'))
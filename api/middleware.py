@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('api.metrics')
+
+# Metrics of the request being served. A context variable rather than a
+# per-connection wrapper, so queries that async views run in worker threads
+# are counted too.
+_current = ContextVar('api_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('start', 'queries', 'db_time', 'view_end', 'render_end')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_end = None
+        self.render_end = None
+
+    def rendered(self, response):
+        # Post-render callback, see view_returned
+        self.render_end = time.perf_counter()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def view_returned(response):
+    """
+    Mark the end of the view: from here until ``response`` is rendered counts
+    as serialization. The middleware calls this for views that leave
+    rendering to Django; views that render their response themselves call it
+    first.
+    """
+    metrics = _current.get()
+    if metrics is not None and not response.is_rendered:
+        metrics.view_end = time.perf_counter()
+        response.add_post_render_callback(metrics.rendered)
+
+
+def _install(sender=None, connection=None, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures sampled requests: query count, SQL time, time in the view
+    (queries and serializers included), time spent serializing the response
+    data to its body (the renderer), and the rest of the way out through the
+    middleware below this one. Each measured request logs one
+    ``api.metrics`` record; the same timings go out as a Server-Timing header
+    to staff users, or to everyone when DEBUG is on, since they tell other
+    clients how the server spends its time. Requests whose query count
+    exceeds their API_QUERY_BUDGETS entry are logged as warnings.
+
+    Removes itself from the middleware chain when API_METRICS_ENABLED is off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'API_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'API_METRICS_SAMPLE_RATE', 1.0)
+        self.server_timing = getattr(settings, 'API_METRICS_SERVER_TIMING', True)
+        self.budgets = getattr(settings, 'API_QUERY_BUDGETS', {})
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+        connection_created.connect(_install)
+        for connection in connections.all(initialized_only=True):
+            _install(connection=connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        # Called between the view returning and the response being rendered
+        view_returned(response)
+        return response
+
+    def finish(self, request, response, metrics):
+        end = time.perf_counter()
+        view_end = metrics.view_end or end
+        render_end = metrics.render_end or view_end
+        timings = {
+            'db': metrics.db_time * 1000,
+            'view': (view_end - metrics.start) * 1000,
+            'serialize': (render_end - view_end) * 1000,
+            'response': (end - render_end) * 1000,
+            'total': (end - metrics.start) * 1000,
+        }
+        if self.server_timing and (settings.DEBUG or getattr(getattr(request, 'user', None), 'is_staff', False)):
+            response['Server-Timing'] = ', '.join(
+                f'db;dur={timings["db"]:.2f};desc="{metrics.queries} queries"' if name == 'db'
+                else f'{name};dur={duration:.2f}'
+                for name, duration in timings.items())
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else None
+        budget = self.budgets.get(route, self.budgets.get('default'))
+        over_budget = budget is not None and metrics.queries > budget
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'query_budget': budget,
+            'over_budget': over_budget,
+            **{f'{name}_ms': round(duration, 2) for name, duration in timings.items()},
+        }
+        logger.log(logging.WARNING if over_budget else logging.INFO,
+                   '%s %s %s %d queries in %.1f ms%s', request.method, request.path, response.status_code,
+                   metrics.queries, timings['total'], ' (over query budget)' if over_budget else '',
+                   extra={'metrics': fields})
+        return response
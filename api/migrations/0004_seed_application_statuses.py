@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+STATUS_CODES = ['AP', 'PR', 'RE', 'AC']
+
+
+def seed_statuses(apps, schema_editor):
+    JobApplicationStatus = apps.get_model('api', 'JobApplicationStatus')
+    existing = set(JobApplicationStatus.objects.values_list('name', flat=True))
+    JobApplicationStatus.objects.bulk_create([
+        JobApplicationStatus(name=code) for code in STATUS_CODES if code not in existing
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_alter_joblisting_company"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.1.4 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+def remove_duplicate_applications(apps, schema_editor):
+    # Keep the earliest application for each (job_listing, applicant) pair so
+    # the unique constraint below can be created on existing data.
+    JobApplication = apps.get_model("api", "JobApplication")
+    duplicates = (
+        JobApplication.objects.values("job_listing", "applicant")
+        .annotate(first_id=models.Min("id"), count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for row in duplicates:
+        JobApplication.objects.filter(
+            job_listing=row["job_listing"], applicant=row["applicant"]
+        ).exclude(id=row["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_seed_application_statuses"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_applications, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["job_listing", "applied_at", "id"], name="jobapp_listing_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["applicant", "applied_at", "id"], name="jobapp_applicant_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="joblisting",
+            index=models.Index(fields=["created_at", "id"], name="joblisting_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="joblisting",
+            index=models.Index(
+                fields=["company", "created_at", "id"], name="joblisting_company_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="joblisting",
+            index=models.Index(
+                fields=["location", "created_at", "id"], name="joblisting_location_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="joblisting",
+            index=models.Index(
+                fields=["salary", "created_at", "id"], name="joblisting_salary_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="jobapplication",
+            constraint=models.UniqueConstraint(
+                fields=("job_listing", "applicant"), name="unique_application_per_listing"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS api_joblisting_fts "
+            "USING fts5(title, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO api_joblisting_fts (rowid, title, description) "
+            "SELECT id, title, description FROM api_joblisting"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS joblisting_search_idx ON api_joblisting USING GIN (("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS api_joblisting_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS joblisting_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_joblisting_indexes_and_unique_application"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
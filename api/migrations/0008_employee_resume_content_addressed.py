@@ -0,0 +1,21 @@
+# Generated by Django 4.1.4 on 2026-10-18 15:49
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_emailnotification"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="employee",
+            name="resume",
+            field=models.FileField(
+                storage=api.storage.get_resume_storage, upload_to="resumes/"
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.1.4 on 2026-10-18 15:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_employee_resume_content_addressed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumeText",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("resume_name", models.CharField(max_length=255)),
+                ("text", models.TextField(blank=True)),
+                ("terms", models.JSONField(default=dict)),
+                ("extracted_at", models.DateTimeField(auto_now=True)),
+                (
+                    "employee",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resume_text",
+                        to="api.employee",
+                    ),
+                ),
+            ],
+        ),
+    ]
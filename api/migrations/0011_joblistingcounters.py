@@ -0,0 +1,59 @@
+# Generated by Django 4.1.4 on 2026-10-18 16:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+STATUS_FIELDS = {
+    "AP": "applied",
+    "PR": "in_progress",
+    "RE": "rejected",
+    "AC": "accepted",
+}
+
+
+def count_applications(apps, schema_editor):
+    JobApplication = apps.get_model("api", "JobApplication")
+    JobListingCounters = apps.get_model("api", "JobListingCounters")
+    rows = {}
+    grouped = (
+        JobApplication.objects.values_list("job_listing_id", "status__name")
+        .annotate(n=models.Count("id"))
+        .order_by()
+    )
+    for listing_id, code, n in grouped:
+        row = rows.setdefault(listing_id, JobListingCounters(job_listing_id=listing_id))
+        row.total += n
+        if code in STATUS_FIELDS:
+            setattr(row, STATUS_FIELDS[code], getattr(row, STATUS_FIELDS[code]) + n)
+    JobListingCounters.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_apitokenstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobListingCounters",
+            fields=[
+                (
+                    "job_listing",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="counters",
+                        serialize=False,
+                        to="api.joblisting",
+                    ),
+                ),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("applied", models.PositiveIntegerField(default=0)),
+                ("in_progress", models.PositiveIntegerField(default=0)),
+                ("rejected", models.PositiveIntegerField(default=0)),
+                ("accepted", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_applications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2026-10-18 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_joblistingcounters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="joblisting",
+            index=models.Index(fields=["updated_at"], name="joblisting_updated_idx"),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.1.4 on 2026-10-18 16:17
+
+import bisect
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+DEFAULT_SALARY_BANDS = [0, 30000, 50000, 75000, 100000, 150000, 200000]
+
+
+def count_listings(apps, schema_editor):
+    JobListing = apps.get_model("api", "JobListing")
+    JobListingFacet = apps.get_model("api", "JobListingFacet")
+    bands = getattr(settings, "API_SALARY_BANDS", DEFAULT_SALARY_BANDS)
+    cells = Counter(
+        (location, company_id, max(bisect.bisect_right(bands, salary) - 1, 0))
+        for location, company_id, salary in JobListing.objects.values_list(
+            "location", "company_id", "salary"
+        ).iterator()
+    )
+    JobListingFacet.objects.bulk_create(
+        [
+            JobListingFacet(
+                location=location, company_id=company_id, salary_band=band, count=n
+            )
+            for (location, company_id, band), n in cells.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_joblisting_updated_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobListingFacet",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("location", models.CharField(max_length=100)),
+                ("salary_band", models.PositiveSmallIntegerField()),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="api.employer"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="joblistingfacet",
+            constraint=models.UniqueConstraint(
+                fields=("location", "company", "salary_band"), name="unique_facet_cell"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="joblistingfacet",
+            index=models.Index(fields=["location", "count"], name="facet_location_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="joblistingfacet",
+            index=models.Index(fields=["company", "count"], name="facet_company_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="joblistingfacet",
+            index=models.Index(
+                fields=["salary_band", "count"], name="facet_salary_idx"
+            ),
+        ),
+        migrations.RunPython(count_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.4 on 2026-10-18 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_joblistingfacet"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="joblisting",
+            name="joblisting_salary_idx",
+        ),
+        migrations.AddIndex(
+            model_name="joblisting",
+            index=models.Index(
+                fields=["salary", "id"], name="joblisting_salary_id_idx"
+            ),
+        ),
+    ]
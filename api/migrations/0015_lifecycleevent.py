@@ -0,0 +1,112 @@
+# Generated by Django 4.1.4 on 2026-10-18 16:30
+
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def record_existing_rows(apps, schema_editor):
+    # Start the feed with a created event for every listing and application,
+    # so a consumer reading from 0 sees the current state
+    JobListing = apps.get_model("api", "JobListing")
+    JobApplication = apps.get_model("api", "JobApplication")
+    JobApplicationStatus = apps.get_model("api", "JobApplicationStatus")
+    LifecycleEvent = apps.get_model("api", "LifecycleEvent")
+    companies = {}
+    events = []
+
+    def flush(limit):
+        if len(events) >= limit:
+            LifecycleEvent.objects.bulk_create(events)
+            events.clear()
+
+    for listing in JobListing.objects.order_by("created_at", "id").iterator():
+        companies[listing.pk] = listing.company_id
+        events.append(
+            LifecycleEvent(
+                kind="listing.created",
+                company_id=listing.company_id,
+                job_listing_id=listing.pk,
+                data={
+                    "title": listing.title,
+                    "location": listing.location,
+                    "salary": str(Decimal(listing.salary).quantize(Decimal("0.01"))),
+                },
+                created_at=listing.created_at,
+            )
+        )
+        flush(1000)
+    codes = dict(JobApplicationStatus.objects.values_list("pk", "name"))
+    for application in JobApplication.objects.order_by("applied_at", "id").iterator():
+        events.append(
+            LifecycleEvent(
+                kind="application.created",
+                company_id=companies[application.job_listing_id],
+                job_listing_id=application.job_listing_id,
+                application_id=application.pk,
+                applicant_id=application.applicant_id,
+                data={"status": codes.get(application.status_id)},
+                created_at=application.applied_at,
+            )
+        )
+        flush(1000)
+    flush(1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_joblisting_salary_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LifecycleEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("listing.created", "Listing created"),
+                            ("listing.updated", "Listing updated"),
+                            ("listing.deleted", "Listing deleted"),
+                            ("application.created", "Application created"),
+                            (
+                                "application.status_changed",
+                                "Application status changed",
+                            ),
+                            ("application.deleted", "Application deleted"),
+                        ],
+                        max_length=40,
+                    ),
+                ),
+                ("company_id", models.BigIntegerField()),
+                ("job_listing_id", models.BigIntegerField()),
+                ("application_id", models.BigIntegerField(blank=True, null=True)),
+                ("applicant_id", models.BigIntegerField(blank=True, null=True)),
+                ("data", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="lifecycleevent",
+            index=models.Index(fields=["company_id", "id"], name="event_company_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="lifecycleevent",
+            index=models.Index(
+                fields=["applicant_id", "id"], name="event_applicant_idx"
+            ),
+        ),
+        migrations.RunPython(record_existing_rows, migrations.RunPython.noop),
+    ]
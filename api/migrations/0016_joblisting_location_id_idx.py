@@ -0,0 +1,19 @@
+# Generated by Django 4.1.4 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0015_lifecycleevent"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="joblisting",
+            index=models.Index(
+                fields=["location", "id"], name="joblisting_location_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:05
+
+from django.db import migrations
+
+
+def create_missing_counters(apps, schema_editor):
+    # 0011 only created rows for listings that had applications; new
+    # listings now get theirs when they are created
+    JobListing = apps.get_model("api", "JobListing")
+    JobListingCounters = apps.get_model("api", "JobListingCounters")
+    missing = JobListing.objects.filter(counters__isnull=True).values_list("pk", flat=True)
+    JobListingCounters.objects.bulk_create(
+        [JobListingCounters(job_listing_id=pk) for pk in missing], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_joblisting_location_id_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_counters, migrations.RunPython.noop),
+    ]
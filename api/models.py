@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .storage import get_resume_storage
 
 
 
@@ -23,7 +26,7 @@ class Employee(models.Model):
     years_of_experience = models.IntegerField()
     university = models.CharField(max_length=100)
     degree = models.CharField(max_length=100)
-    resume = models.FileField(upload_to='resumes/')
+    resume = models.FileField(upload_to='resumes/', storage=get_resume_storage)
     email = models.EmailField()
 
     def __str__(self):
@@ -47,13 +50,173 @@ class JobListing(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     company = models.ForeignKey(Employer, on_delete=models.CASCADE)
 
+    class Meta:
+        # Match the listing filters and the (created_at, id), (salary, id) and (location, id)
+        # cursor orderings
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='joblisting_created_idx'),
+            models.Index(fields=['company', 'created_at', 'id'], name='joblisting_company_idx'),
+            models.Index(fields=['location', 'created_at', 'id'], name='joblisting_location_idx'),
+            models.Index(fields=['salary', 'id'], name='joblisting_salary_id_idx'),
+            models.Index(fields=['location', 'id'], name='joblisting_location_id_idx'),
+            # Incremental sync of the recommendation index
+            models.Index(fields=['updated_at'], name='joblisting_updated_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The values the facet table counts this listing under; see api.facets
+        instance._facet_values = tuple(instance.__dict__.get(name) for name in ('location', 'company_id', 'salary'))
+        return instance
 class JobApplication(models.Model):
     job_listing = models.ForeignKey(JobListing, on_delete=models.CASCADE)
     applicant = models.ForeignKey(Employee, on_delete=models.CASCADE)
     applied_at = models.DateTimeField(auto_now_add=True)
     status = models.ForeignKey(JobApplicationStatus, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job_listing', 'applicant'], name='unique_application_per_listing'),
+        ]
+        # Match the (applied_at, id) cursor ordering of both application lists
+        indexes = [
+            models.Index(fields=['job_listing', 'applied_at', 'id'], name='jobapp_listing_idx'),
+            models.Index(fields=['applicant', 'applied_at', 'id'], name='jobapp_applicant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.applicant.name} applied for {self.job_listing.title}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The status the listing counters hold this application under; see api.counters
+        instance._counted_status_id = instance.__dict__.get('status_id')
+        return instance
+
+class EmailNotification(models.Model):
+    # Outbox row written in the same transaction as the change it reports;
+    # the send_notifications command delivers it later.
+    state_choices = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    state = models.CharField(max_length=10, choices=state_choices, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'next_attempt_at'], name='notification_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.state})"
+
+
+class ResumeText(models.Model):
+    # Text pulled out of Employee.resume by api.resumes. Resume names are
+    # content-addressed, so an unchanged resume_name means unchanged content.
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, related_name='resume_text')
+    resume_name = models.CharField(max_length=255)
+    text = models.TextField(blank=True)
+    terms = models.JSONField(default=dict)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Resume text of {self.employee}"
+
+
+class ApiTokenState(models.Model):
+    # Tokens embed the generation they were issued under; bumping it revokes
+    # every outstanding token of the user at once.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='api_token_state')
+    generation = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} (generation {self.generation})"
+
+
+class JobListingCounters(models.Model):
+    # Application counts of a listing, kept current by api.counters as
+    # applications are added, withdrawn or change status. The
+    # recount_applications command rebuilds them from JobApplication.
+    job_listing = models.OneToOneField(JobListing, on_delete=models.CASCADE, primary_key=True,
+                                       related_name='counters')
+    total = models.PositiveIntegerField(default=0)
+    applied = models.PositiveIntegerField(default=0)
+    in_progress = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.total} applications for {self.job_listing_id}"
+
+
+class JobListingFacet(models.Model):
+    # Number of listings per (location, company, salary band) cell, kept
+    # current by api.facets from the JobListing signals. Facet counts sum
+    # these cells instead of grouping the listings themselves.
+    location = models.CharField(max_length=100)
+    company = models.ForeignKey(Employer, on_delete=models.CASCADE)
+    salary_band = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'company', 'salary_band'], name='unique_facet_cell'),
+        ]
+        # Covering indexes for the GROUP BY of each facet
+        indexes = [
+            models.Index(fields=['location', 'count'], name='facet_location_idx'),
+            models.Index(fields=['company', 'count'], name='facet_company_idx'),
+            models.Index(fields=['salary_band', 'count'], name='facet_salary_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.location} / {self.company_id} / band {self.salary_band}: {self.count}"
+
+
+class LifecycleEvent(models.Model):
+    # Append-only log of listing and application changes, written in the
+    # transaction of the change by api.events. The id is the sequence
+    # number of the change feed. The ids are plain columns, not foreign
+    # keys, so events outlive the rows they describe.
+    kind_choices = (
+        ('listing.created', 'Listing created'),
+        ('listing.updated', 'Listing updated'),
+        ('listing.deleted', 'Listing deleted'),
+        ('application.created', 'Application created'),
+        ('application.status_changed', 'Application status changed'),
+        ('application.deleted', 'Application deleted'),
+    )
+    kind = models.CharField(max_length=40, choices=kind_choices)
+    company_id = models.BigIntegerField()
+    job_listing_id = models.BigIntegerField()
+    application_id = models.BigIntegerField(null=True, blank=True)
+    applicant_id = models.BigIntegerField(null=True, blank=True)
+    # Listing events: title, location and salary; application events: status codes
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # The feed of an employer and of an employee, both read in sequence order
+        indexes = [
+            models.Index(fields=['company_id', 'id'], name='event_company_idx'),
+            models.Index(fields=['applicant_id', 'id'], name='event_applicant_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.applicant.name} applied for {self.job_listing.title}"
\ No newline at end of file
+        return f"#{self.pk} {self.kind} (listing {self.job_listing_id})"
@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailNotification
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(recipient, subject, body):
+    """
+    Add a message to the outbox. Call it inside the transaction that makes
+    the change, so the email exists if and only if the change committed.
+    """
+    return EmailNotification.objects.create(recipient=recipient, subject=subject, body=body)
+
+
+def queue_application_submitted(application):
+    listing = application.job_listing
+    return queue_email(
+        listing.company.email,
+        f"New application for {listing.title}",
+        f"{application.applicant.name} applied for {listing.title}.",
+    )
+
+
+def _status_changed_email(application):
+    listing = application.job_listing
+    return EmailNotification(
+        recipient=application.applicant.email,
+        subject=f"Your application for {listing.title}",
+        body=f"The status of your application for {listing.title} is now: {application.status}.",
+    )
+
+
+def queue_status_changed(application):
+    notification = _status_changed_email(application)
+    notification.save()
+    return notification
+
+
+def queue_status_changes(applications):
+    # One INSERT for a whole batch of status changes
+    return EmailNotification.objects.bulk_create(
+        [_status_changed_email(application) for application in applications])
+
+
+def _retry_delay(attempts):
+    base = getattr(settings, 'API_NOTIFICATION_RETRY_DELAY', 60)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _claim(batch_size):
+    # Claimed rows move to 'sending' with a lease; a worker that dies mid-batch
+    # leaves them to be picked up again once the lease runs out.
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'API_NOTIFICATION_LEASE', 300))
+    with transaction.atomic():
+        batch = list(
+            EmailNotification.objects.select_for_update(skip_locked=True)
+            .filter(Q(state='pending') | Q(state='sending'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        EmailNotification.objects.filter(pk__in=[n.pk for n in batch]).update(
+            state='sending', next_attempt_at=now + lease)
+    return batch
+
+
+def _record_failure(notification, exc, max_attempts):
+    notification.last_error = f'{type(exc).__name__}: {exc}'
+    if notification.attempts >= max_attempts:
+        notification.state = 'failed'
+    else:
+        notification.state = 'pending'
+        notification.next_attempt_at = timezone.now() + _retry_delay(notification.attempts)
+
+
+def deliver_pending(batch_size=100, max_attempts=None, connection=None):
+    """
+    Send one batch of due notifications over a single mail connection and
+    record the outcome of each. Returns ``(sent, failed)`` counts. A mail
+    server that cannot be reached fails the whole batch, which is retried
+    like any other failed send.
+    """
+    max_attempts = max_attempts or getattr(settings, 'API_NOTIFICATION_MAX_ATTEMPTS', 5)
+    batch = _claim(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = failed = 0
+    try:
+        connection.open()
+    except Exception as exc:
+        for notification in batch:
+            notification.attempts += 1
+            _record_failure(notification, exc, max_attempts)
+        failed = len(batch)
+    else:
+        try:
+            for notification in batch:
+                notification.attempts += 1
+                message = EmailMessage(notification.subject, notification.body,
+                                       to=[notification.recipient], connection=connection)
+                try:
+                    message.send()
+                except Exception as exc:
+                    failed += 1
+                    _record_failure(notification, exc, max_attempts)
+                else:
+                    sent += 1
+                    notification.state = 'sent'
+                    notification.sent_at = timezone.now()
+                    notification.last_error = ''
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                # The outcomes are known; a failed QUIT must not lose them
+                logger.warning("Closing the mail connection failed", exc_info=True)
+
+    EmailNotification.objects.bulk_update(
+        batch, ['state', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,222 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class BoundedPageSizeMixin:
+    page_size_query_param = 'page_size'
+
+    def get_default_page_size(self):
+        return getattr(settings, 'API_PAGE_SIZE', 20)
+
+    def get_max_page_size(self):
+        return getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            page_size = 0
+        if page_size <= 0:
+            page_size = self.get_default_page_size()
+        return min(page_size, self.get_max_page_size())
+
+
+class KeysetPagination(BoundedPageSizeMixin, BasePagination):
+    """
+    Opaque cursor pagination that seeks on (ordering field, id) instead of
+    using OFFSET, so the cost of a page does not depend on how deep it is.
+    """
+    ordering = ('-created_at', '-id')
+    # ?ordering= values a client may choose from; each needs an index on (field, id)
+    ordering_query_param = 'ordering'
+    orderings = {}
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view=None):
+        return self.orderings.get(request.GET.get(self.ordering_query_param), self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(list(self.page_queryset(queryset, request, view)))
+
+    def page_queryset(self, queryset, request, view=None):
+        # Builds the sliced queryset for the requested page without
+        # evaluating it, so async callers can iterate it themselves.
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is not None:
+            position, reverse = self.cursor
+            queryset = queryset.filter(self._seek(position, reverse))
+            ordering = self._flip(self.ordering) if reverse else self.ordering
+        else:
+            ordering = self.ordering
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def paginate_rows(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        reverse = self.cursor is not None and self.cursor[1]
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._position(self.page[-1])
+        else:
+            position = self.cursor[0]
+        return self.encode_cursor(position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._position(self.page[0])
+        else:
+            position = self.cursor[0]
+        return self.encode_cursor(position, reverse=True)
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def decode_cursor(self, request):
+        encoded = request.GET.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            field_name = self.ordering[0].lstrip('-')
+            if payload['o'] != self.ordering[0]:
+                raise ValueError
+            field = self.model._meta.get_field(field_name)
+            position = (field.to_python(payload['p'][0]), int(payload['p'][1]))
+            return position, bool(payload['r'])
+        except (TypeError, ValueError, KeyError, IndexError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        value, pk = position
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif value is not None and not isinstance(value, (int, str)):
+            value = str(value)
+        payload = {'o': self.ordering[0], 'p': [value, pk], 'r': int(reverse)}
+        raw = json.dumps(payload, separators=(',', ':')).encode('ascii')
+        encoded = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def _position(self, row):
+        field_name = self.ordering[0].lstrip('-')
+        if isinstance(row, dict):
+            return row[field_name], row['id']
+        return getattr(row, field_name), row.pk
+
+    def _seek(self, position, reverse):
+        # (field, id) > (value, pk) written as a range on the leading field
+        # minus the ties already seen, so the index range scan still applies.
+        value, pk = position
+        field_name = self.ordering[0].lstrip('-')
+        descending = self.ordering[0].startswith('-') != reverse
+        if descending:
+            return Q(**{f'{field_name}__lte': value}) & ~Q(**{field_name: value, 'id__gte': pk})
+        return Q(**{f'{field_name}__gte': value}) & ~Q(**{field_name: value, 'id__lte': pk})
+
+    @staticmethod
+    def _flip(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+
+class JobListingPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+    orderings = {
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+        'salary': ('salary', 'id'),
+        '-salary': ('-salary', '-id'),
+        'location': ('location', 'id'),
+        '-location': ('-location', '-id'),
+    }
+
+
+class JobApplicationPagination(KeysetPagination):
+    ordering = ('-applied_at', '-id')
+
+
+class SearchPagination(BoundedPageSizeMixin, BasePagination):
+    """
+    Offset pagination for relevance-ranked results, which have no stable
+    column to seek on. Fetches one extra row instead of running a COUNT.
+    """
+    page_size_query_param = 'limit'
+    offset_query_param = 'offset'
+
+    def paginate_search(self, search, request):
+        # ``search(limit, offset)`` runs the ranked query for one window
+        self.request = request
+        self.limit = self.get_page_size(request)
+        try:
+            self.offset = max(int(request.GET.get(self.offset_query_param, 0)), 0)
+        except ValueError:
+            self.offset = 0
+        rows = search(self.limit + 1, self.offset)
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_previous_link(self):
+        if self.offset <= 0:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.offset_query_param, max(self.offset - self.limit, 0))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,86 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+class Projection:
+    """
+    Read-only fast path for a ModelSerializer's list output. The serializer's
+    fields are compiled once into the ``.values()`` columns they read and a
+    converter per field, so a page of rows is serialized without model
+    instances or per-object field lookups. The output is the same data, key
+    order included, that ``serializer_class(instances, many=True).data``
+    gives, so it renders to the same JSON bytes.
+
+    Supports plain model fields, primary-key relations, file fields and
+    nested model serializers; anything else (method fields, dotted sources,
+    many=True) raises ImproperlyConfigured when the projection is built.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.columns, self._fields = _compile(serializer_class(), '')
+
+    def values(self, queryset, *extra):
+        """``queryset`` as dict rows with the projected columns plus ``extra``."""
+        return queryset.values(*dict.fromkeys([*self.columns, *extra]))
+
+    def row(self, row):
+        return _build(self._fields, row)
+
+    def data(self, rows):
+        fields = self._fields
+        return [_build(fields, row) for row in rows]
+
+
+def _build(fields, row):
+    data = {}
+    for name, column, convert, nested in fields:
+        value = row[column]
+        if value is None:
+            data[name] = None
+        elif nested is not None:
+            data[name] = _build(nested, row)
+        elif convert is None:
+            data[name] = value
+        else:
+            data[name] = convert(value)
+    return data
+
+
+# Fields whose to_representation() returns database values unchanged
+_IDENTITY_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+                    serializers.PrimaryKeyRelatedField)
+
+
+def _compile(serializer, prefix):
+    model = serializer.Meta.model
+    columns = []
+    fields = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        if source == '*' or '.' in source or isinstance(field, (serializers.ListSerializer,
+                                                                 serializers.SerializerMethodField)):
+            raise ImproperlyConfigured(f"Cannot project {type(serializer).__name__}.{name}")
+        column = prefix + source
+        columns.append(column)
+        if isinstance(field, serializers.ModelSerializer):
+            # The foreign key decides between null and the nested object
+            nested_columns, nested_fields = _compile(field, f'{column}__')
+            columns.extend(nested_columns)
+            fields.append((name, column, None, nested_fields))
+        elif isinstance(field, serializers.FileField) \
+                and getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            # The URL without a request in the serializer context, so relative
+            storage = model._meta.get_field(source).storage
+            fields.append((name, column, lambda value, storage=storage: storage.url(value) if value else None,
+                           None))
+        elif isinstance(field, serializers.FileField):
+            fields.append((name, column, lambda value: value or None, None))
+        elif isinstance(field, _IDENTITY_FIELDS) and not isinstance(field, serializers.ChoiceField):
+            fields.append((name, column, None, None))
+        else:
+            fields.append((name, column, field.to_representation, None))
+    return columns, fields
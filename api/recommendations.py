@@ -0,0 +1,282 @@
+import math
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .caching import listing_version
+from .models import JobApplication, JobListing, ResumeText
+from .text import term_counts, tokenize
+
+# Weights of the structured features next to the text similarity, which is in [0, 1]
+LOCATION_WEIGHT = 0.2
+EXPERIENCE_WEIGHT = 0.1
+# Years of experience at which an employee is matched with the best-paid listings
+SENIOR_YEARS = 20
+
+
+def listing_terms(title, description):
+    # The title counts twice, as in the resume ranking
+    return term_counts(f'{title} {title} {description}')
+
+
+def employee_terms(employee, resume_terms=None):
+    counts = Counter(resume_terms or {})
+    counts.update(tokenize(f'{employee.degree} {employee.university}'))
+    return counts
+
+
+class RecommendationIndex:
+    """
+    TF-IDF vectors of every listing, kept in memory as fixed-width sparse
+    rows: the ``terms_per_listing`` most frequent terms of a listing as
+    vocabulary ids (``term_ids``) with their L2-normalised log-tf weights
+    (``weights``). Both are stored slot-major, shape (terms, listings), so
+    scoring gathers the query weight of one slot for every listing at a time
+    over contiguous memory; a request is a few numpy passes over the matrix.
+
+    Listings are added, replaced and removed in place. Document frequencies
+    are counted over the stored terms and IDF is applied on the query side,
+    so an update never has to touch other rows.
+    """
+
+    def __init__(self, terms_per_listing=24, capacity=1024):
+        self.terms_per_listing = terms_per_listing
+        self.lock = threading.Lock()
+        # Term id 0 pads rows with fewer terms; its query weight is always 0
+        self.vocabulary = {'': 0}
+        self.document_frequency = np.zeros(1024, dtype=np.int32)
+        self.locations = {}
+        self.rows = {}
+        self.free_rows = []
+        self.size = 0
+        self.listing_ids = np.zeros(capacity, dtype=np.int64)
+        self.term_ids = np.zeros((terms_per_listing, capacity), dtype=np.int32)
+        self.weights = np.zeros((terms_per_listing, capacity), dtype=np.float32)
+        self.location_codes = np.full(capacity, -1, dtype=np.int32)
+        self.salaries = np.zeros(capacity, dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+        # Where each salary sits in the range of all salaries, from 0 to 1;
+        # recomputed on the first query after listings change
+        self.salary_positions = None
+        # Newest updated_at seen and the listing version it was synced at
+        self.watermark = None
+        self.version = None
+        self.synced_at = 0.0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _grow(self, rows):
+        capacity = len(self.listing_ids)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        for name in ('listing_ids', 'salaries', 'active'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for name in ('term_ids', 'weights'):
+            old = getattr(self, name)
+            new = np.zeros((self.terms_per_listing, capacity), dtype=old.dtype)
+            new[:, :old.shape[1]] = old
+            setattr(self, name, new)
+        codes = np.full(capacity, -1, dtype=np.int32)
+        codes[:len(self.location_codes)] = self.location_codes
+        self.location_codes = codes
+
+    def _term_id(self, term):
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.vocabulary)
+            if term_id >= len(self.document_frequency):
+                self.document_frequency = np.concatenate(
+                    [self.document_frequency, np.zeros_like(self.document_frequency)])
+        return term_id
+
+    def _clear_row(self, row):
+        ids = self.term_ids[:, row]
+        np.subtract.at(self.document_frequency, ids[ids > 0], 1)
+        self.term_ids[:, row] = 0
+        self.weights[:, row] = 0
+        self.active[row] = False
+
+    def upsert(self, listings):
+        """Add or replace ``(id, title, description, location, salary)`` rows."""
+        with self.lock:
+            for listing_id, title, description, location, salary in listings:
+                row = self.rows.get(listing_id)
+                if row is None:
+                    if self.free_rows:
+                        row = self.free_rows.pop()
+                    else:
+                        row = self.size
+                        self.size += 1
+                        self._grow(self.size)
+                    self.rows[listing_id] = row
+                else:
+                    self._clear_row(row)
+
+                counts = listing_terms(title, description).most_common(self.terms_per_listing)
+                ids = [self._term_id(term) for term, _ in counts]
+                weights = np.array([1 + math.log(n) for _, n in counts], dtype=np.float32)
+                if len(weights):
+                    weights /= np.linalg.norm(weights)
+                self.term_ids[:len(ids), row] = ids
+                self.weights[:len(ids), row] = weights
+                np.add.at(self.document_frequency, np.array(ids, dtype=np.int64), 1)
+
+                self.listing_ids[row] = listing_id
+                self.location_codes[row] = self.locations.setdefault(location.lower(), len(self.locations))
+                self.salaries[row] = salary
+                self.active[row] = True
+            self.salary_positions = None
+
+    def remove(self, listing_ids):
+        with self.lock:
+            for listing_id in listing_ids:
+                row = self.rows.pop(listing_id, None)
+                if row is not None:
+                    self._clear_row(row)
+                    self.free_rows.append(row)
+            self.salary_positions = None
+
+    def query_vector(self, terms):
+        """Unit-length query weights, log-tf times IDF, indexed by term id."""
+        n = max(len(self.rows), 1)
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for term, count in terms.items():
+            term_id = self.vocabulary.get(term)
+            if term_id:
+                idf = math.log((n + 1) / (self.document_frequency[term_id] + 1)) + 1
+                query[term_id] = (1 + math.log(count)) * idf
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def top(self, terms, limit, location=None, min_salary=None, years_of_experience=None, exclude=()):
+        """``(listing_id, score)`` of the ``limit`` best listings, best first."""
+        with self.lock:
+            size = self.size
+            if not self.rows or limit <= 0:
+                return []
+            query = self.query_vector(terms)
+            # Cosine similarity of the unit query and listing vectors, one term slot at a time
+            scores = np.zeros(size, dtype=np.float32)
+            slot = np.empty(size, dtype=np.float32)
+            for term_ids, weights in zip(self.term_ids[:, :size], self.weights[:, :size]):
+                query.take(term_ids, out=slot, mode='clip')
+                slot *= weights
+                scores += slot
+
+            if location:
+                code = self.locations.get(location.lower())
+                if code is not None:
+                    scores += LOCATION_WEIGHT * (self.location_codes[:size] == code)
+            salaries = self.salaries[:size]
+            if years_of_experience is not None:
+                # Experienced employees lean towards the better-paid end of the range
+                target = min(max(years_of_experience, 0), SENIOR_YEARS) / SENIOR_YEARS
+                scores += EXPERIENCE_WEIGHT * (1 - np.abs(self._salary_positions(size) - target))
+
+            eligible = self.active[:size].copy()
+            if min_salary is not None:
+                eligible &= salaries >= min_salary
+            excluded = [self.rows[listing_id] for listing_id in exclude if listing_id in self.rows]
+            eligible[excluded] = False
+            scores = np.where(eligible, scores, -np.inf)
+
+            limit = min(limit, int(eligible.sum()))
+            if not limit:
+                return []
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            # Highest score first, newest listing id on ties
+            best = best[np.lexsort((-self.listing_ids[best], -scores[best]))]
+            return [(int(self.listing_ids[row]), float(scores[row])) for row in best]
+
+    def _salary_positions(self, size):
+        if self.salary_positions is None or len(self.salary_positions) != size:
+            log_salary = np.log1p(np.maximum(self.salaries[:size], 0))
+            low, high = np.percentile(log_salary[self.active[:size]], [5, 95])
+            self.salary_positions = np.clip((log_salary - low) / ((high - low) or 1), 0, 1).astype(np.float32)
+        return self.salary_positions
+
+    def sync(self, force=False):
+        """
+        Catch up with listing writes made since the last sync, including
+        those of other processes. Runs when the listing version moved or
+        API_RECOMMENDATION_SYNC_SECONDS have passed. Deleted listings are
+        noticed when a recommendation comes back missing.
+        """
+        version = listing_version()
+        interval = getattr(settings, 'API_RECOMMENDATION_SYNC_SECONDS', 30)
+        if not force and version == self.version and time.monotonic() - self.synced_at < interval:
+            return
+        listings = JobListing.objects.order_by()
+        if self.watermark is not None:
+            # Overlap by the margin so rows saved by slow transactions are not missed
+            margin = timedelta(seconds=getattr(settings, 'API_RECOMMENDATION_SYNC_MARGIN', 60))
+            listings = listings.filter(updated_at__gte=self.watermark - margin)
+        watermark = self.watermark
+        batch = []
+        for row in listings.values_list('id', 'title', 'description', 'location', 'salary', 'updated_at') \
+                .iterator(chunk_size=5000):
+            batch.append(row[:5])
+            watermark = row[5] if watermark is None else max(watermark, row[5])
+            if len(batch) >= 5000:
+                self.upsert(batch)
+                batch = []
+        self.upsert(batch)
+        self.watermark, self.version, self.synced_at = watermark, version, time.monotonic()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = RecommendationIndex(getattr(settings, 'API_RECOMMENDATION_TERMS', 24))
+                index.sync(force=True)
+                _index = index
+    return _index
+
+
+def listing_saved(listing):
+    # Only this process sees the change here; the others pick it up in sync()
+    if _index is not None:
+        transaction.on_commit(lambda: _index.upsert(
+            [(listing.pk, listing.title, listing.description, listing.location, listing.salary)]))
+
+
+def listing_deleted(listing_id):
+    # A rolled back delete must leave the listing recommendable
+    if _index is not None:
+        transaction.on_commit(lambda: _index.remove([listing_id]))
+
+
+def recommend(employee, limit=20, location=None, min_salary=None):
+    """
+    The listings that best match ``employee``'s resume, degree and
+    university, as ``(listing, score)`` best first. Listings the employee
+    applied to are left out.
+    """
+    index = get_index()
+    index.sync()
+    resume_terms = ResumeText.objects.filter(employee=employee).values_list('terms', flat=True).first()
+    applied = JobApplication.objects.filter(applicant=employee).values_list('job_listing_id', flat=True)
+    # A few spare results stand in for listings deleted since the last sync
+    ranked = index.top(employee_terms(employee, resume_terms), limit + 10, location=location,
+                       min_salary=min_salary, years_of_experience=employee.years_of_experience,
+                       exclude=set(applied))
+    listings = JobListing.objects.in_bulk([listing_id for listing_id, _ in ranked])
+    index.remove([listing_id for listing_id, _ in ranked if listing_id not in listings])
+    return [(listings[listing_id], score) for listing_id, score in ranked if listing_id in listings][:limit]
@@ -0,0 +1,55 @@
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional, FastJSONRenderer falls back to json
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed. Produces the
+    same bytes as JSONRenderer for API data: datetimes, decimals, subclasses
+    of the builtin containers and the other types orjson would format
+    differently go through DRF's encoder, and U+2028/U+2029 are escaped the
+    same way. Floats in exponent notation are written in orjson's shorter
+    form. Pretty-printed (indent) and non-compact output, and data orjson
+    cannot encode, use JSONRenderer.
+    """
+    orjson_options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS
+                      | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def default(self, obj):
+        # orjson would read str, int, dict and list subclasses from their
+        # native storage, but Django's ErrorList keeps its items elsewhere
+        # (UserList.data): convert them through their own iteration
+        for base in (str, int, dict, list):
+            if isinstance(obj, base):
+                return base(obj)
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii \
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.orjson_options)
+        except (TypeError, ValueError):
+            # e.g. integers beyond 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+_json_renderer = FastJSONRenderer()
+
+
+def json_response(data, status=200, headers=None):
+    """
+    Render ``data`` the way a DRF Response with the JSON renderer would, for
+    the plain Django (async) views that cannot use Response.
+    """
+    return HttpResponse(_json_renderer.render(data), status=status, headers=headers,
+                        content_type=_json_renderer.media_type)
@@ -0,0 +1,128 @@
+import io
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from pypdf import PdfReader
+
+from .models import Employee, ResumeText
+from .text import term_counts
+
+logger = logging.getLogger(__name__)
+
+# Most frequent terms kept per resume; enough for ranking, small enough to load in bulk
+MAX_TERMS = 500
+
+
+def extract_text_from_path(path):
+    """Plain text of a resume file, PDF or text."""
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if not data.startswith(b'%PDF'):
+        return data.decode('utf-8', errors='ignore')
+    return '\n'.join(page.extract_text() or '' for page in PdfReader(io.BytesIO(data)).pages)
+
+
+def store_resume_text(employee, resume_name, text):
+    counts = term_counts(text, MAX_TERMS)
+    ResumeText.objects.update_or_create(
+        employee=employee, defaults={'resume_name': resume_name, 'text': text, 'terms': dict(counts)})
+
+
+def extract_resume(employee_id):
+    """
+    Bring the ResumeText of one employee up to date. Does nothing when the
+    stored text already belongs to the current resume file.
+    """
+    employee = Employee.objects.select_related('resume_text').filter(pk=employee_id).first()
+    if employee is None:
+        return
+    resume_name = employee.resume.name
+    existing = getattr(employee, 'resume_text', None)
+    if not resume_name:
+        if existing is not None:
+            existing.delete()
+        return
+    if existing is not None and existing.resume_name == resume_name:
+        return
+    storage = employee.resume.storage
+    if not storage.exists(resume_name):
+        return
+    store_resume_text(employee, resume_name, extract_text_from_path(storage.path(resume_name)))
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.API_RESUME_EXTRACTION_WORKERS,
+                                       thread_name_prefix='resume-extract')
+    return _executor
+
+
+def _run_in_worker(employee_id):
+    try:
+        extract_resume(employee_id)
+    finally:
+        close_old_connections()
+
+
+def _submit(employee_id):
+    # Nobody waits on the future, so its exception would vanish with it
+    def log_failure(future):
+        if future.exception() is not None:
+            logger.error("Extracting the resume of employee %s failed", employee_id,
+                         exc_info=future.exception())
+
+    _get_executor().submit(_run_in_worker, employee_id).add_done_callback(log_failure)
+
+
+def schedule_extraction(employee_id):
+    """
+    Extract the resume text off the request path once the current
+    transaction commits. With API_RESUME_EXTRACTION_WORKERS = 0 the work
+    runs inline, which is what the tests use.
+    """
+    if getattr(settings, 'API_RESUME_EXTRACTION_WORKERS', 0) <= 0:
+        transaction.on_commit(lambda: extract_resume(employee_id))
+    else:
+        transaction.on_commit(lambda: _submit(employee_id))
+
+
+def rank_applications(listing, applications, keyword_limit=30):
+    """
+    Score each application by how well the applicant's resume matches the
+    listing's title (counted twice) and description, BM25-style over the
+    applicants of this listing. Returns ``(application, score, matched_terms)``
+    best first; applicants without extracted text score zero.
+    """
+    keywords = term_counts(f'{listing.title} {listing.title} {listing.description}')
+    keywords = dict(keywords.most_common(keyword_limit))
+
+    applications = list(applications)
+    texts = dict(ResumeText.objects.filter(
+        employee_id__in=[a.applicant_id for a in applications]).values_list('employee_id', 'terms'))
+
+    document_count = len(texts) or 1
+    document_frequency = {term: sum(1 for terms in texts.values() if term in terms) for term in keywords}
+    k1 = 1.2
+    ranked = []
+    for application in applications:
+        terms = texts.get(application.applicant_id, {})
+        score = 0.0
+        matched = []
+        for term, weight in keywords.items():
+            tf = terms.get(term, 0)
+            if not tf:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+            score += weight * idf * tf * (k1 + 1) / (tf + k1)
+            matched.append(term)
+        ranked.append((application, score, matched))
+    ranked.sort(key=lambda row: (-row[1], row[0].pk))
+    return ranked
@@ -0,0 +1,117 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+# Set while a replica_reads view runs; the router sends its reads to a replica
+_use_replica = ContextVar('api_use_replica', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_replicas():
+    return getattr(settings, 'API_DATABASE_REPLICAS', [])
+
+
+def _pin_cache():
+    return caches[getattr(settings, 'API_REPLICA_PIN_CACHE', 'default')]
+
+
+def _pin_key(user_id):
+    return f'api:db:pinned:{user_id}'
+
+
+def pin_to_primary(user):
+    """Send ``user``'s reads to the primary for the next API_REPLICA_PIN_SECONDS."""
+    if get_replicas() and user.is_authenticated:
+        seconds = getattr(settings, 'API_REPLICA_PIN_SECONDS', 5)
+        _pin_cache().set(_pin_key(user.pk), time.time() + seconds, seconds)
+
+
+def is_pinned(user):
+    return user.is_authenticated and _pin_cache().get(_pin_key(user.pk)) is not None
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads of the block to the primary, even inside replica_reads."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_reads(view):
+    """
+    Run the reads of a GET request on a replica, unless the user wrote
+    something in the last API_REPLICA_PIN_SECONDS and must see it. Goes
+    below @api_view (or @async_api_view) so the view receives the DRF request.
+    """
+    def use_replica(request):
+        return request.method in SAFE_METHODS and get_replicas() and not is_pinned(request.user)
+
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            token = _use_replica.set(bool(await sync_to_async(use_replica)(request)))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    else:
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            token = _use_replica.set(bool(use_replica(request)))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    return wrapped
+
+
+def pins_primary(view):
+    """Pin the user to the primary after a successful write request."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS and 200 <= response.status_code < 300:
+            pin_to_primary(request.user)
+        return response
+    return wrapped
+
+
+class ReplicaRouter:
+    """
+    Reads inside replica_reads views go to a random alias of
+    API_DATABASE_REPLICAS; everything else, and all writes, use the primary.
+    The listing response cache outlives the replication delay, so it is only
+    ever filled from the primary (see api.caching).
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if replicas and _use_replica.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # A row read from a replica is saved to the primary, not where it came from
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in get_replicas():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
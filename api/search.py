@@ -0,0 +1,185 @@
+import abc
+import html
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import JobListing
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# The database marks matches with these private-use characters; the text is
+# HTML-escaped before they become the tags, so listing text cannot inject markup
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+SNIPPET_TOKENS = 24
+
+FTS_TABLE = 'api_joblisting_fts'
+# Title matches weigh ten times as much as description matches
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    return _TERM_RE.findall(query.lower())
+
+
+def render_highlight(text):
+    """Escape marked-up ``text`` for HTML and turn the match markers into tags."""
+    return html.escape(text).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_END, HIGHLIGHT_END)
+
+
+def _highlights(title, description):
+    return {'title': render_highlight(title), 'description': render_highlight(description)}
+
+
+class SearchBackend(abc.ABC):
+    """
+    Inverted index over JobListing title and description. ``search`` returns
+    ``(listing_id, rank, highlights)`` tuples, best match first.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def index_listings(self, listings):
+        pass
+
+    def remove_listings(self, listing_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    @abc.abstractmethod
+    def search(self, query, limit, offset=0):
+        """Matches of ``query`` with HTML-safe highlights, best first."""
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """SQLite FTS5 table kept in sync by the JobListing signal handlers."""
+
+    def index_listings(self, listings):
+        rows = [(listing.pk, listing.title, listing.description) for listing in listings]
+        if not rows:
+            return
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)', rows)
+
+    def remove_listings(self, listing_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in listing_ids])
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                f'SELECT id, title, description FROM {JobListing._meta.db_table}')
+
+    def match_expression(self, query):
+        # Quote every term so user input can never be parsed as FTS5 syntax;
+        # the last term is a prefix match to support search-as-you-type.
+        terms = ['"%s"' % term.replace('"', '""') for term in search_terms(query)]
+        if not terms:
+            return None
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, query, limit, offset=0):
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({FTS_TABLE}, %s, %s) AS rank, '
+                f'highlight({FTS_TABLE}, 0, %s, %s), '
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', %s) "
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s',
+                [TITLE_WEIGHT, DESCRIPTION_WEIGHT, MATCH_START, MATCH_END,
+                 MATCH_START, MATCH_END, SNIPPET_TOKENS, expression, limit, offset])
+            # bm25() is lower-is-better; flip it so every backend ranks descending
+            return [(pk, -rank, _highlights(title, description))
+                    for pk, rank, title, description in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    tsvector search served by the GIN expression index from the migration,
+    so there is nothing to keep in sync on writes.
+    """
+
+    def search(self, query, limit, offset=0):
+        if not search_terms(query):
+            return []
+        options = f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords={SNIPPET_TOKENS}'
+        with connections[self.using].cursor() as cursor:
+            # Headlines are only built for the rows of the requested page
+            cursor.execute(
+                'SELECT page.id, page.rank, '
+                "ts_headline('english', page.title, page.query, %s), "
+                "ts_headline('english', page.description, page.query, %s) "
+                'FROM ('
+                f'  SELECT l.id, l.title, l.description, q.query, ts_rank_cd({PG_DOCUMENT}, q.query) AS rank'
+                f'  FROM {JobListing._meta.db_table} l, websearch_to_tsquery(\'english\', %s) AS q(query)'
+                f'  WHERE ({PG_DOCUMENT}) @@ q.query'
+                '   ORDER BY rank DESC, l.id LIMIT %s OFFSET %s'
+                ') page ORDER BY page.rank DESC, page.id',
+                [options + ', HighlightAll=true', options, query, limit, offset])
+            return [(pk, rank, _highlights(title, description))
+                    for pk, rank, title, description in cursor.fetchall()]
+
+
+class FallbackSearchBackend(SearchBackend):
+    """LIKE scan for databases without a full-text engine; not meant for large tables."""
+
+    def search(self, query, limit, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        queryset = JobListing.objects.using(self.using)
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        pattern = re.compile('(%s)' % '|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        results = []
+        for listing in queryset.order_by('-created_at', '-id')[offset:offset + limit]:
+            title_hits = len(pattern.findall(listing.title))
+            description_hits = len(pattern.findall(listing.description))
+            results.append((
+                listing.pk,
+                TITLE_WEIGHT * title_hits + DESCRIPTION_WEIGHT * description_hits,
+                _highlights(pattern.sub(rf'{MATCH_START}\1{MATCH_END}', listing.title),
+                            pattern.sub(rf'{MATCH_START}\1{MATCH_END}', listing.description)),
+            ))
+        return sorted(results, key=lambda row: -row[1])
+
+
+_backends = {}
+
+
+def get_backend(using='default'):
+    backend = _backends.get(using)
+    if backend is None:
+        connection = connections[using]
+        if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            backend = SQLiteFTSBackend(using)
+        elif connection.vendor == 'postgresql':
+            backend = PostgresSearchBackend(using)
+        else:
+            backend = FallbackSearchBackend(using)
+        _backends[using] = backend
+    return backend
+
+
+def search_listings(query, limit, offset=0, using='default'):
+    return get_backend(using).search(query, limit, offset)
@@ -0,0 +1,143 @@
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.contrib.auth.models import User
+from django.db import connection
+
+from .models import JobApplication, JobListing, Employee, Employer
+from . import events, facets
+from .counters import recount
+from .statuses import get_status
+
+LOCATIONS = [
+    'Amsterdam', 'Austin', 'Bangalore', 'Berlin', 'Boston', 'Chicago', 'Delhi', 'Dublin',
+    'Hyderabad', 'Lisbon', 'London', 'Madrid', 'Mumbai', 'Munich', 'New York', 'Paris',
+    'Pune', 'Remote', 'San Francisco', 'Seattle', 'Singapore', 'Stockholm', 'Sydney',
+    'Tokyo', 'Toronto', 'Vienna', 'Warsaw', 'Zurich',
+]
+TITLES = [
+    'Backend Engineer', 'Data Analyst', 'Data Engineer', 'DevOps Engineer', 'Frontend Developer',
+    'Machine Learning Engineer', 'Mobile Developer', 'Product Manager', 'QA Engineer',
+    'Security Engineer', 'Site Reliability Engineer', 'Technical Writer', 'UX Designer',
+]
+SKILLS = [
+    'python', 'django', 'postgres', 'react', 'typescript', 'kubernetes', 'aws', 'terraform',
+    'java', 'spring', 'go', 'rust', 'sql', 'spark', 'airflow', 'pytorch', 'figma', 'linux',
+    'graphql', 'redis', 'kafka', 'docker', 'swift', 'kotlin', 'testing', 'security',
+]
+DEGREES = ['BSc Computer Science', 'BEng Software', 'MSc Data Science', 'MBA', 'BA Design']
+UNIVERSITIES = ['MIT', 'IIT Delhi', 'TU Munich', 'ETH Zurich', 'University of Toronto', 'NUS']
+STATUS_WEIGHTS = [('AP', 60), ('PR', 20), ('RE', 15), ('AC', 5)]
+
+
+@contextmanager
+def scratch_database(keepdb=False, verbosity=0):
+    """
+    Run the block against a freshly migrated test database for the default
+    connection, so seeded benchmark data never lands in the real database.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=keepdb,
+                                       serialize=False)
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
+
+
+def _batches(iterable_size, batch_size):
+    for start in range(0, iterable_size, batch_size):
+        yield start, min(start + batch_size, iterable_size)
+
+
+def _create_users(prefix, count, batch_size):
+    users = []
+    for start, stop in _batches(count, batch_size):
+        users.extend(User.objects.bulk_create([
+            User(username=f'{prefix}-{i}', password=UNUSABLE_PASSWORD_PREFIX)
+            for i in range(start, stop)
+        ]))
+    return users
+
+
+def random_description(rng, words=40):
+    return ' '.join(rng.choice(SKILLS) for _ in range(words))
+
+
+def seed_dataset(employers=50, employees=1000, listings=1000, applications=10000,
+                 batch_size=5000, seed=0, log=None):
+    """
+    Bulk-insert a synthetic dataset. Each (listing, employee) pair is used at
+    most once, so ``applications`` is capped at ``listings * employees``.
+    Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+
+    users = _create_users('seed-employer', employers, batch_size)
+    employer_rows = Employer.objects.bulk_create([
+        Employer(user=user, company_name=f'Company {i}', company_description='Seeded employer',
+                 email=f'jobs{i}@company.test')
+        for i, user in enumerate(users)
+    ], batch_size=batch_size)
+    log(f'{len(employer_rows)} employers')
+
+    employee_ids = []
+    users = _create_users('seed-employee', employees, batch_size)
+    for start, stop in _batches(employees, batch_size):
+        employee_ids.extend(e.pk for e in Employee.objects.bulk_create([
+            Employee(user=users[i], name=f'Employee {i}', years_of_experience=rng.randint(0, 25),
+                     university=rng.choice(UNIVERSITIES), degree=rng.choice(DEGREES),
+                     resume=f'resumes/seed-{i}.pdf', email=f'employee{i}@example.test')
+            for i in range(start, stop)
+        ]))
+    log(f'{len(employee_ids)} employees')
+
+    listing_ids = []
+    listing_companies = {}
+    for start, stop in _batches(listings, batch_size):
+        rows = JobListing.objects.bulk_create([
+            JobListing(title=rng.choice(TITLES), description=random_description(rng),
+                       location=rng.choice(LOCATIONS),
+                       salary=Decimal(rng.randrange(30000, 200000, 500)),
+                       company=rng.choice(employer_rows))
+            for _ in range(start, stop)
+        ])
+        # bulk_create skips the signals that write the event log
+        events.listings_created(rows)
+        listing_ids.extend(l.pk for l in rows)
+        listing_companies.update((l.pk, l.company_id) for l in rows)
+    log(f'{len(listing_ids)} job listings')
+    # ... and those that maintain the facet counts
+    facets.rebuild()
+
+    listing_count, employee_count = len(listing_ids), len(employee_ids)
+    applications = min(applications, listing_count * employee_count)
+    codes = [code for code, weight in STATUS_WEIGHTS for _ in range(weight)]
+    status_ids = {code: get_status(code).pk for code, _ in STATUS_WEIGHTS}
+    for start, stop in _batches(applications, batch_size):
+        rows = []
+        for i in range(start, stop):
+            # Employee i % E walks consecutive listings from a per-employee
+            # offset, which keeps every (listing, employee) pair unique
+            employee = i % employee_count
+            listing = (i // employee_count + employee * 7919) % listing_count
+            rows.append(JobApplication(job_listing_id=listing_ids[listing],
+                                       applicant_id=employee_ids[employee],
+                                       status_id=status_ids[rng.choice(codes)]))
+        JobApplication.objects.bulk_create(rows)
+        events.applications_created(rows, listing_companies)
+        log(f'{stop} job applications')
+
+    # bulk_create skips the signals that maintain the application counters
+    for start, stop in _batches(listing_count, batch_size):
+        recount(listing_ids[start:stop])
+
+    return {
+        'employers': len(employer_rows),
+        'employees': len(employee_ids),
+        'listings': len(listing_ids),
+        'applications': applications,
+    }
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import JobApplication, JobListing, Employee, Employer, JobApplicationStatus
+from .models import JobApplication, JobListing, Employee, Employer, JobApplicationStatus, LifecycleEvent
+from .counters import COUNTER_FIELDS
+from .projections import Projection
 
 class JobApplicationStatusSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,6 +22,17 @@ class JobListingSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobListing
         fields = ['id', 'title', 'description', 'location', 'salary', 'company']
+
+class JobListingDashboardSerializer(JobListingSerializer):
+    # Read from the counters side table; select_related('counters') keeps it one query
+    applications = serializers.SerializerMethodField()
+
+    class Meta(JobListingSerializer.Meta):
+        fields = JobListingSerializer.Meta.fields + ['created_at', 'applications']
+
+    def get_applications(self, listing):
+        counters = getattr(listing, 'counters', None)
+        return {field: getattr(counters, field, 0) for field in COUNTER_FIELDS}
         
 class JobApplicationSerializer(serializers.ModelSerializer):
     applicant = EmployeeSerializer(read_only=True)
@@ -28,3 +41,22 @@ class JobApplicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobApplication
         fields = '__all__'
+
+class LifecycleEventSerializer(serializers.ModelSerializer):
+    # The id is the position of the event in the change feed
+    seq = serializers.IntegerField(source='id', read_only=True)
+    company = serializers.IntegerField(source='company_id', read_only=True)
+    job_listing = serializers.IntegerField(source='job_listing_id', read_only=True)
+    application = serializers.IntegerField(source='application_id', read_only=True)
+    applicant = serializers.IntegerField(source='applicant_id', read_only=True)
+
+    class Meta:
+        model = LifecycleEvent
+        fields = ['seq', 'kind', 'company', 'job_listing', 'application', 'applicant', 'data', 'created_at']
+
+
+# The list endpoints serialize from .values() rows through these; the output
+# is the same as the serializers' own
+JOB_LISTING_PROJECTION = Projection(JobListingSerializer)
+JOB_APPLICATION_PROJECTION = Projection(JobApplicationSerializer)
+LIFECYCLE_EVENT_PROJECTION = Projection(LifecycleEventSerializer)
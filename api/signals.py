@@ -0,0 +1,111 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import authentication, caching, counters, events, facets, recommendations, resumes, search, statuses
+from .models import ApiTokenState, Employee, Employer, JobApplication, JobApplicationStatus, JobListing
+
+
+@receiver([post_save, post_delete], sender=JobApplicationStatus)
+def invalidate_status_registry(sender, **kwargs):
+    statuses.invalidate()
+
+
+@receiver(post_save, sender=JobListing)
+def index_job_listing(sender, instance, using='default', **kwargs):
+    search.get_backend(using).index_listings([instance])
+
+
+@receiver(post_delete, sender=JobListing)
+def unindex_job_listing(sender, instance, using='default', **kwargs):
+    search.get_backend(using).remove_listings([instance.pk])
+
+
+@receiver(pre_save, sender=JobListing)
+def locate_saved_listing(sender, instance, **kwargs):
+    facets.listing_saving(instance)
+
+
+@receiver(post_save, sender=JobListing)
+def count_saved_listing(sender, instance, created, **kwargs):
+    facets.listing_saved(instance, created)
+
+
+@receiver(post_delete, sender=JobListing)
+def count_deleted_listing(sender, instance, **kwargs):
+    facets.listing_deleted(instance)
+
+
+@receiver(post_save, sender=JobListing)
+def create_listing_counters(sender, instance, created, **kwargs):
+    if created:
+        counters.listings_created([instance])
+
+
+@receiver(post_save, sender=JobListing)
+def recommend_job_listing(sender, instance, **kwargs):
+    recommendations.listing_saved(instance)
+
+
+@receiver(post_delete, sender=JobListing)
+def unrecommend_job_listing(sender, instance, **kwargs):
+    recommendations.listing_deleted(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=JobListing)
+def invalidate_listing_responses(sender, using='default', **kwargs):
+    # Bumped before the commit, a miss could cache the old rows under the new version
+    transaction.on_commit(caching.bump_listing_version, using=using)
+
+
+@receiver(post_save, sender=JobListing)
+def record_saved_listing(sender, instance, created, **kwargs):
+    events.listing_saved(instance, created)
+
+
+@receiver(post_delete, sender=JobListing)
+def record_deleted_listing(sender, instance, **kwargs):
+    events.listing_deleted(instance)
+
+
+# Connected before count_saved_application, which moves _counted_status_id
+# on to the new status
+@receiver(post_save, sender=JobApplication)
+def record_saved_application(sender, instance, created, **kwargs):
+    events.application_saved(instance, created)
+
+
+@receiver(post_delete, sender=JobApplication)
+def record_deleted_application(sender, instance, **kwargs):
+    events.application_deleted(instance)
+
+
+@receiver(post_save, sender=JobApplication)
+def count_saved_application(sender, instance, created, **kwargs):
+    counters.application_saved(instance, created)
+
+
+@receiver(post_delete, sender=JobApplication)
+def count_deleted_application(sender, instance, **kwargs):
+    counters.application_deleted(instance)
+
+
+@receiver(post_save, sender=Employee)
+def extract_resume_text(sender, instance, update_fields=None, **kwargs):
+    # Cheap on the request path: the worker skips resumes it already has
+    if update_fields is None or 'resume' in update_fields:
+        resumes.schedule_extraction(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_authenticated_user(sender, instance, **kwargs):
+    authentication.forget_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Employer)
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=ApiTokenState)
+def forget_authenticated_role(sender, instance, **kwargs):
+    # The cached user carries its roles and token generation
+    authentication.forget_user(instance.user_id)
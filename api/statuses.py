@@ -0,0 +1,47 @@
+import threading
+
+from asgiref.sync import sync_to_async
+
+from .models import JobApplicationStatus
+
+# Process-local registry of the JobApplicationStatus lookup rows, keyed by
+# code ('AP', 'PR', 'RE', 'AC'). Loaded on first use and dropped by the
+# signal handlers in api.signals whenever the table changes.
+_statuses = None
+_lock = threading.Lock()
+
+
+def get_status(code):
+    statuses = _statuses if _statuses is not None else _load()
+    try:
+        return statuses[code]
+    except KeyError:
+        raise JobApplicationStatus.DoesNotExist(f"Application status '{code}' does not exist.")
+
+
+def get_status_by_id(pk):
+    statuses = _statuses if _statuses is not None else _load()
+    for status in statuses.values():
+        if status.pk == pk:
+            return status
+    raise JobApplicationStatus.DoesNotExist(f"Application status {pk} does not exist.")
+
+
+async def aget_status(code):
+    if _statuses is None:
+        await sync_to_async(_load)()
+    return get_status(code)
+
+
+def invalidate():
+    global _statuses
+    _statuses = None
+
+
+def _load():
+    global _statuses
+    with _lock:
+        if _statuses is None:
+            # Oldest row wins if a code was ever inserted twice
+            _statuses = {s.name: s for s in JobApplicationStatus.objects.order_by('-pk')}
+        return _statuses
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    TemporaryFileUploadHandler that hashes an upload while spooling it to
+    disk, so ContentAddressedStorage can move the file into place without
+    reading it again.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every file after the SHA-256 of its
+    content (``<dir>/<ab>/<abcdef...>.<ext>``), storing identical content
+    once. Uploads already spooled to disk are moved into place, hashed by
+    HashingTemporaryFileUploadHandler on the way in; anything else is hashed
+    while it is streamed to a temporary file.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed in _save
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        if hasattr(content, 'temporary_file_path'):
+            path = content.temporary_file_path()
+            final_name = os.path.join(directory, self._digest_name(getattr(content, 'sha256', None)
+                                                                   or _file_digest(path), extension))
+            self._store(path, final_name)
+            return final_name.replace('\\', '/')
+
+        staging_dir = self.path(directory)
+        os.makedirs(staging_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, staging_path = tempfile.mkstemp(dir=staging_dir, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as staged:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    staged.write(chunk)
+            final_name = os.path.join(directory, self._digest_name(digest.hexdigest(), extension))
+            self._store(staging_path, final_name)
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+        return final_name.replace('\\', '/')
+
+    @staticmethod
+    def _digest_name(hexdigest, extension):
+        return os.path.join(hexdigest[:2], hexdigest + extension)
+
+    def _store(self, path, name):
+        """Move the file at ``path`` to ``name`` unless that content is stored already."""
+        final_path = self.path(name)
+        if os.path.exists(final_path):
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        # Same content under the same name, so a concurrent writer may win
+        file_move_safe(path, final_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(final_path, self.file_permissions_mode)
+
+
+def content_digest(name):
+    """The SHA-256 embedded in a content-addressed name, or None for legacy names."""
+    stem = os.path.splitext(os.path.basename(name or ''))[0]
+    return stem if _DIGEST_RE.match(stem) else None
+
+
+resume_storage = ContentAddressedStorage()
+
+
+def get_resume_storage():
+    return resume_storage
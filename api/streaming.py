@@ -0,0 +1,159 @@
+import csv
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Employee
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+STREAM_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    # csv.writer wants a file; hand back each formatted line instead
+    def write(self, value):
+        return value
+
+
+def _lookup(row, path):
+    for part in path.split('.'):
+        if row is None:
+            return None
+        row = row.get(part)
+    return row
+
+
+def ndjson_lines(rows):
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_lookup(row, field) for field in fields])
+
+
+def streaming_response(rows, stream_format, fields, filename):
+    """
+    Stream ``rows`` (an iterator of dicts, nested dicts allowed) as NDJSON or
+    CSV. ``fields`` lists the CSV columns, using dots for nested keys.
+    """
+    if stream_format == 'csv':
+        lines = csv_lines(rows, fields)
+    else:
+        lines = ndjson_lines(rows)
+    response = StreamingHttpResponse(lines, content_type=STREAM_FORMATS[stream_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{stream_format}"'
+    return response
+
+
+APPLICATION_EXPORT_FIELDS = [
+    'id', 'applied_at', 'job_listing', 'status.name', 'applicant.id', 'applicant.name',
+    'applicant.email', 'applicant.years_of_experience', 'applicant.university',
+    'applicant.degree', 'applicant.resume',
+]
+_APPLICANT_FIELDS = ['id', 'name', 'years_of_experience', 'university', 'degree', 'resume', 'email', 'user']
+
+
+def application_rows(applications):
+    """
+    Yield JobApplication rows shaped like JobApplicationSerializer output,
+    reading the joined applicant/status columns in chunks.
+    """
+    storage = Employee._meta.get_field('resume').storage
+    queryset = applications.order_by('id').values(
+        'id', 'applied_at', 'job_listing_id', 'status_id', 'status__name',
+        *(f'applicant__{field}' for field in _APPLICANT_FIELDS))
+    for row in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        applicant = {field: row[f'applicant__{field}'] for field in _APPLICANT_FIELDS}
+        applicant['resume'] = storage.url(applicant['resume']) if applicant['resume'] else None
+        yield {
+            'id': row['id'],
+            'applicant': applicant,
+            'status': {'id': row['status_id'], 'name': row['status__name']} if row['status_id'] else None,
+            'applied_at': row['applied_at'],
+            'job_listing': row['job_listing_id'],
+        }
+
+
+FILE_CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _read_range(fh, start, length):
+    fh.seek(start)
+    remaining = length
+    try:
+        while remaining > 0:
+            chunk = fh.read(min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def _parse_range(header, size):
+    # Only single byte ranges are served; anything else gets the full body,
+    # which RFC 9110 allows.
+    match = _RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # "bytes=-0" asks for the last zero bytes, which no range satisfies
+        length = min(int(last), size)
+        if not length:
+            raise ValueError
+        return size - length, size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+def ranged_file_response(request, fh, size, content_type, etag, filename):
+    """
+    Stream an open binary file, honouring If-None-Match, Range and If-Range.
+    ``etag`` must change whenever the content does.
+    """
+    quoted_etag = f'"{etag}"'
+    if quoted_etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        fh.close()
+        response = HttpResponse(status=304)
+        response['ETag'] = quoted_etag
+        return response
+
+    start, end, status = 0, size - 1, 200
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and size and (not if_range or if_range == quoted_etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            fh.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range:
+            (start, end), status = byte_range, 206
+
+    length = end - start + 1 if size else 0
+    response = StreamingHttpResponse(_read_range(fh, start, length), status=status, content_type=content_type)
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = quoted_etag
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
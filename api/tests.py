@@ -1,3 +1,1521 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, connections, transaction
+from django.forms.utils import ErrorDict, ErrorList
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import (JobApplication, JobListing, JobListingCounters, JobListingFacet, Employee, Employer, JobApplicationStatus,
+                     EmailNotification, LifecycleEvent, ResumeText)
+from . import async_views, authentication, recommendations, resumes, throttling
+from .filters import JobListingFilter
+from .middleware import RequestMetricsMiddleware
+from .pagination import JobListingPagination
+from .renderers import FastJSONRenderer
+from .seed import seed_dataset
+from .serializers import (JobApplicationSerializer, JobListingSerializer, JOB_APPLICATION_PROJECTION,
+                          JOB_LISTING_PROJECTION)
+from .authentication import issue_token, local_cache as auth_local_cache, resolve_user, revoke_tokens
+from .bulk import import_listings
+from .db_backends.sqlite3 import base as sqlite_backend
+from .management.commands.bench import ROUTES, NoFixture, load_mix
+from .notifications import deliver_pending, queue_email
+from .routers import is_pinned
+from .resumes import extract_text_from_path
+from .statuses import get_status
+
+try:
+    from .db_backends.postgresql import base as pg_backend
+except ImportError:
+    pg_backend = None
+
+
+class JobPortalTestCase(TestCase):
+    """Shared fixtures: one employer, one employee and helpers to add rows."""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        auth_local_cache.clear()
+        throttling._stores.clear()
+        employer_user = User.objects.create_user('employer')
+        self.employer = Employer.objects.create(
+            user=employer_user, company_name='Acme', company_description='Widgets',
+            email='jobs@acme.test')
+        employee_user = User.objects.create_user('employee')
+        self.employee = Employee.objects.create(
+            user=employee_user, name='Jane', years_of_experience=3, university='MIT',
+            degree='BSc', resume='resumes/resume1.pdf', email='jane@example.test')
+
+    def create_listings(self, count, employer=None, **fields):
+        employer = employer or self.employer
+        listings = JobListing.objects.bulk_create([
+            JobListing(title=f'Job {i}', description='Python developer', location='Berlin',
+                       salary=50000 + i, company=employer, **fields)
+            for i in range(count)
+        ])
+        return listings
+
+    def create_applicants(self, count):
+        employees = []
+        for i in range(Employee.objects.count(), Employee.objects.count() + count):
+            user = User.objects.create_user(f'applicant{i}')
+            employees.append(Employee(
+                user=user, name=f'Applicant {i}', years_of_experience=i, university='TU',
+                degree='MSc', resume='resumes/resume1.pdf', email=f'a{i}@example.test'))
+        return Employee.objects.bulk_create(employees)
+
+    def apply(self, listing, employees, code='AP'):
+        status_instance = get_status(code)
+        return JobApplication.objects.bulk_create([
+            JobApplication(job_listing=listing, applicant=employee, status=status_instance)
+            for employee in employees
+        ])
+
+    def assertConstantQueryCount(self, path, grow):
+        """
+        Request ``path`` before and after ``grow()`` adds rows and check the
+        number of queries did not change with the row count.
+        """
+        with CaptureQueriesContext(connection) as before:
+            first = self.client.get(path)
+        grow()
+        with CaptureQueriesContext(connection) as after:
+            second = self.client.get(path)
+        self.assertEqual(first.status_code, 200)
+        self.assertGreater(len(second.data['results']), len(first.data['results']))
+        self.assertEqual(len(before), len(after), [q['sql'] for q in after.captured_queries])
+
+
+@override_settings(API_MAX_PAGE_SIZE=5)
+class KeysetPaginationTests(JobPortalTestCase):
+
+    def test_pages_cover_every_listing_once(self):
+        listings = self.create_listings(12)
+        # Give half the rows the same timestamp to exercise the id tie-breaker
+        JobListing.objects.filter(pk__in=[l.pk for l in listings[:6]]).update(
+            created_at=timezone.now() - timedelta(days=1))
+        self.client.force_authenticate(self.employee.user)
+
+        seen = []
+        url = reverse('job_listings_with_filters') + '?page_size=50'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 5)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(l.pk for l in listings))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_previous_link_returns_the_earlier_page(self):
+        self.create_listings(8)
+        self.client.force_authenticate(self.employee.user)
+
+        first = self.client.get(reverse('job_listings_with_filters'))
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([r['id'] for r in back.data['results']],
+                         [r['id'] for r in first.data['results']])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.get(reverse('job_listings_with_filters') + '?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryCountTests(JobPortalTestCase):
+
+    def test_applications_for_job_listing_query_count_is_constant(self):
+        listing = self.create_listings(1)[0]
+        self.apply(listing, self.create_applicants(2))
+        self.client.force_authenticate(self.employer.user)
+        path = reverse('applications_for_job_listing', args=[listing.pk]) + '?page_size=100'
+        self.assertConstantQueryCount(path, lambda: self.apply(listing, self.create_applicants(20)))
+
+    def test_employee_applications_query_count_is_constant(self):
+        self.apply(self.create_listings(1)[0], [self.employee])
+        self.client.force_authenticate(self.employee.user)
+        path = reverse('employee_applications') + '?page_size=100'
+        self.assertConstantQueryCount(
+            path, lambda: [self.apply(listing, [self.employee]) for listing in self.create_listings(20)])
+
+
+class StatusRegistryTests(JobPortalTestCase):
+
+    def test_statuses_are_seeded_and_cached(self):
+        get_status('AP')
+        with self.assertNumQueries(0):
+            self.assertEqual([get_status(code).name for code in ('AP', 'PR', 'RE', 'AC')],
+                             ['AP', 'PR', 'RE', 'AC'])
+
+    def test_registry_is_invalidated_when_the_table_changes(self):
+        get_status('AC').delete()
+        with self.assertRaises(JobApplicationStatus.DoesNotExist):
+            get_status('AC')
+        JobApplicationStatus.objects.create(name='AC')
+        self.assertEqual(get_status('AC').name, 'AC')
+
+    def test_add_job_application_does_not_query_statuses(self):
+        listing = self.create_listings(1)[0]
+        get_status('AP')
+        self.client.force_authenticate(self.employee.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('add_job_application', args=[listing.pk]))
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse([q for q in queries if 'api_jobapplicationstatus' in q['sql']])
+
+
+class JobApplicationConstraintTests(JobPortalTestCase):
+
+    def test_second_application_for_the_same_listing_is_rejected(self):
+        listing = self.create_listings(1)[0]
+        self.client.force_authenticate(self.employee.user)
+        url = reverse('add_job_application', args=[listing.pk])
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(JobApplication.objects.filter(job_listing=listing).count(), 1)
+
+    def test_database_rejects_duplicate_applications(self):
+        listing = self.create_listings(1)[0]
+        self.apply(listing, [self.employee])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.apply(listing, [self.employee])
+
+
+class SearchTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.employee.user)
+        JobListing.objects.create(title='Senior Django Developer', description='Build REST APIs',
+                                  location='Berlin', salary=70000, company=self.employer)
+        JobListing.objects.create(title='Data Analyst', description='Reporting with Django admin',
+                                  location='Berlin', salary=50000, company=self.employer)
+        self.unrelated = JobListing.objects.create(title='Barista', description='Coffee',
+                                                   location='Paris', salary=20000, company=self.employer)
+
+    def search(self, query):
+        return self.client.get(reverse('search_job_listings'), {'q': query})
+
+    def test_results_are_ranked_and_highlighted(self):
+        response = self.search('django')
+        self.assertEqual(response.status_code, 200)
+        titles = [row['title'] for row in response.data['results']]
+        self.assertEqual(titles, ['Senior Django Developer', 'Data Analyst'])
+        self.assertIn('<mark>Django</mark>', response.data['results'][0]['highlights']['title'])
+
+    def test_highlights_escape_listing_text(self):
+        JobListing.objects.create(title='<script>alert(1)</script> Django', description='a & b <b>Django</b>',
+                                  location='Berlin', salary=1, company=self.employer)
+        highlights = self.search('script').data['results'][0]['highlights']
+        self.assertEqual(highlights['title'], '&lt;<mark>script</mark>&gt;alert(1)&lt;/<mark>script</mark>&gt; Django')
+        self.assertNotIn('<b>', highlights['description'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.unrelated.title = 'Django Barista'
+        self.unrelated.save()
+        self.assertIn(self.unrelated.pk, [row['id'] for row in self.search('barista').data['results']])
+        self.unrelated.delete()
+        self.assertEqual(self.search('barista').data['results'], [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"django" OR (').status_code, 200)
+        self.assertEqual(self.search('').status_code, 400)
+
+
+class ListingResponseCacheTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.listing = JobListing.objects.create(title='Django Developer', description='APIs',
+                                                 location='Berlin', salary=70000, company=self.employer)
+        self.url = reverse('job_listings_with_filters')
+
+    def test_identical_queries_are_served_from_cache(self):
+        self.client.force_authenticate(self.employee.user)
+        first = self.client.get(self.url, {'location': 'Berlin', 'salary_min': ''})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url + '?location=Berlin')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+
+    def test_writes_invalidate_cached_responses(self):
+        self.client.force_authenticate(self.employee.user)
+        self.client.get(self.url)
+        self.client.force_authenticate(self.employer.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(reverse('update_job_listing', args=[self.listing.pk]),
+                                         {'title': 'Python Developer'})
+        self.assertEqual(response.status_code, 200)
+
+        # Until the write commits, readers keep the cached page
+        self.client.force_authenticate(self.employee.user)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'Python Developer')
+
+    def test_conditional_request_returns_304(self):
+        self.client.force_authenticate(self.employee.user)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class BulkJobListingTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.employer.user)
+        self.url = reverse('bulk_job_listings')
+
+    def upload(self, name, content):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content.encode())},
+                                format='multipart')
+
+    def test_csv_import_reports_invalid_rows(self):
+        response = self.upload('listings.csv', (
+            'title,description,location,salary\n'
+            'Backend Engineer,Django APIs,Berlin,65000\n'
+            'Broken,No salary,Berlin,lots\n'
+            'Frontend Engineer,React,Remote,60000.50\n'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([e['row'] for e in response.data['errors']], [2])
+        self.assertIn('salary', response.data['errors'][0]['errors'])
+        self.assertEqual(JobListing.objects.filter(company=self.employer).count(), 2)
+
+    def test_rows_that_are_not_utf8_are_reported(self):
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('listings.csv', (
+            'title,description,location,salary\n'
+            'Backend Engineer,Django APIs,Berlin,65000\n'.encode() +
+            'Ingénieur,"Django,\nAPIs",Paris,60000\n'.encode('latin-1') +
+            'Frontend Engineer,React,Remote,60000\n'.encode()))}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'],
+                         [{'row': 2, 'errors': {'non_field_errors': ['Row is not valid UTF-8.']}}])
+
+        response = self.client.post(self.url, {'file': SimpleUploadedFile(
+            'listings.jsonl', json.dumps({'title': 'Café', 'description': '', 'location': 'Paris',
+                                          'salary': 1}, ensure_ascii=False).encode('cp1252'))},
+            format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['row'], 1)
+
+    def test_ndjson_import_is_searchable_and_exportable(self):
+        rows = [{'title': f'Role {i}', 'description': 'kubernetes', 'location': 'Remote', 'salary': 1000 + i}
+                for i in range(25)]
+        response = self.upload('listings.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n')
+        self.assertEqual(response.data['created'], 25)
+        self.assertEqual(response.data['errors'][0]['row'], 26)
+
+        self.client.force_authenticate(self.employee.user)
+        found = self.client.get(reverse('search_job_listings'), {'q': 'kubernetes', 'limit': 100})
+        self.assertEqual(len(found.data['results']), 25)
+
+        self.client.force_authenticate(self.employer.user)
+        export = self.client.get(self.url, {'stream': 'csv'})
+        lines = b''.join(export.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,title,description,location,salary,created_at,updated_at')
+        self.assertEqual(len(lines), 26)
+
+
+class ApplicationStreamingTests(JobPortalTestCase):
+
+    def test_ndjson_stream_matches_the_serializer(self):
+        listing = self.create_listings(1)[0]
+        self.apply(listing, self.create_applicants(3))
+        self.client.force_authenticate(self.employer.user)
+        url = reverse('applications_for_job_listing', args=[listing.pk])
+
+        paged = self.client.get(url).json()['results']
+        streamed = self.client.get(url, {'stream': 'ndjson'})
+        self.assertEqual(streamed['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(streamed.streaming_content).splitlines()]
+        self.assertEqual(sorted(rows, key=lambda r: r['id']), sorted(paged, key=lambda r: r['id']))
+
+    def test_other_employers_cannot_read_applications(self):
+        listing = self.create_listings(1)[0]
+        other_user = User.objects.create_user('other-employer')
+        Employer.objects.create(user=other_user, company_name='Other', company_description='', email='o@x.test')
+        self.client.force_authenticate(other_user)
+        url = reverse('applications_for_job_listing', args=[listing.pk])
+        self.assertEqual(self.client.get(url, {'stream': 'csv'}).status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class NotificationOutboxTests(JobPortalTestCase):
+
+    def test_status_change_is_queued_and_delivered_by_the_worker(self):
+        listing = self.create_listings(1)[0]
+        application = self.apply(listing, [self.employee])[0]
+        self.client.force_authenticate(self.employer.user)
+        response = self.client.put(reverse('update_application_status', args=[application.pk]), {'status': 'AC'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('send_notifications', stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['jane@example.test'])
+        self.assertIn('Accepted', mail.outbox[0].body)
+        self.assertEqual(EmailNotification.objects.get().state, 'sent')
+
+    def test_failed_sends_are_retried_with_backoff(self):
+        queue_email('jobs@acme.test', 'Subject', 'Body')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=ConnectionError('smtp down')):
+            self.assertEqual(deliver_pending(max_attempts=2), (0, 1))
+        notification = EmailNotification.objects.get()
+        self.assertEqual((notification.state, notification.attempts), ('pending', 1))
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_pending(), (0, 0))
+
+        EmailNotification.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(max_attempts=2), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_unreachable_mail_server_fails_the_batch_for_a_retry(self):
+        for i in range(2):
+            queue_email('jobs@acme.test', f'Subject {i}', 'Body')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open',
+                        side_effect=ConnectionRefusedError('smtp down')):
+            self.assertEqual(deliver_pending(), (0, 2))
+            # The worker loop keeps going; nothing is due until the retry delay
+            call_command('send_notifications', stdout=io.StringIO())
+        for notification in EmailNotification.objects.all():
+            self.assertEqual((notification.state, notification.attempts), ('pending', 1))
+            self.assertIn('smtp down', notification.last_error)
+            self.assertGreater(notification.next_attempt_at, timezone.now())
+
+
+class ResumeStorageTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = self.settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.media_root = media_root.name
+        self.content = b'%PDF-1.4 resume ' + bytes(range(256)) * 40
+
+    def upload_resume(self, user, filename):
+        self.client.force_authenticate(user)
+        return self.client.put(reverse('update_employee_profile'),
+                               {'resume': SimpleUploadedFile(filename, self.content, 'application/pdf')},
+                               format='multipart')
+
+    def test_identical_uploads_are_stored_once(self):
+        other = self.create_applicants(1)[0]
+        self.assertEqual(self.upload_resume(self.employee.user, 'cv.pdf').status_code, 201)
+        self.assertEqual(self.upload_resume(other.user, 'my resume.pdf').status_code, 201)
+
+        self.employee.refresh_from_db()
+        other.refresh_from_db()
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(self.employee.resume.name, f'resumes/{digest[:2]}/{digest}.pdf')
+        self.assertEqual(other.resume.name, self.employee.resume.name)
+        stored = [name for _, _, names in os.walk(self.media_root) for name in names]
+        self.assertEqual(stored, [f'{digest}.pdf'])
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_spooled_uploads_are_moved_without_rehashing(self):
+        with mock.patch('api.storage._file_digest') as file_digest:
+            self.assertEqual(self.upload_resume(self.employee.user, 'cv.pdf').status_code, 201)
+        file_digest.assert_not_called()
+        self.employee.refresh_from_db()
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(self.employee.resume.name, f'resumes/{digest[:2]}/{digest}.pdf')
+        with self.employee.resume.open('rb') as fh:
+            self.assertEqual(fh.read(), self.content)
+
+    def test_download_supports_ranges_and_revalidation(self):
+        self.upload_resume(self.employee.user, 'cv.pdf')
+        url = reverse('employee_resume', args=[self.employee.pk])
+
+        full = self.client.get(url)
+        self.assertEqual(b''.join(full.streaming_content), self.content)
+        partial = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(b''.join(partial.streaming_content), self.content[10:20])
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=99999-').status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=-0').status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=full['ETag']).status_code, 304)
+
+        self.client.force_authenticate(self.employer.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.apply(self.create_listings(1)[0], [self.employee])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(API_RESUME_EXTRACTION_WORKERS=0)
+class ResumeRankingTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = self.settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def upload_resume(self, employee, text):
+        self.client.force_authenticate(employee.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(reverse('update_employee_profile'),
+                                       {'resume': SimpleUploadedFile('cv.txt', text.encode())},
+                                       format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+    def test_extraction_runs_once_per_resume_content(self):
+        self.upload_resume(self.employee, 'Senior Django developer, PostgreSQL and Celery')
+        resume_text = ResumeText.objects.get(employee=self.employee)
+        self.assertEqual(resume_text.terms['django'], 1)
+
+        extracted_at = resume_text.extracted_at
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.name = 'Jane Doe'
+            self.employee.save()
+        self.assertEqual(ResumeText.objects.get(employee=self.employee).extracted_at, extracted_at)
+
+    def test_applicants_are_ranked_by_resume_match(self):
+        listing = JobListing.objects.create(title='Django Developer', description='Build APIs with Django and Postgres',
+                                            location='Berlin', salary=60000, company=self.employer)
+        weak, strong = self.create_applicants(2)
+        self.upload_resume(weak, 'Barista with excellent coffee skills')
+        self.upload_resume(strong, 'Django and Postgres engineer. Django REST framework APIs.')
+        self.apply(listing, [weak, strong, self.employee])
+
+        self.client.force_authenticate(self.employer.user)
+        response = self.client.get(reverse('ranked_applications_for_job_listing', args=[listing.pk]))
+        self.assertEqual(response.status_code, 200)
+        ranked = response.data['results']
+        self.assertEqual(ranked[0]['applicant']['id'], strong.pk)
+        self.assertIn('django', ranked[0]['matched_terms'])
+        self.assertEqual([row['score'] for row in ranked[1:]], [0, 0])
+
+    def test_pdf_text_extraction(self):
+        text = extract_text_from_path(os.path.join(settings.BASE_DIR, 'resumes', 'resume1.pdf'))
+        self.assertIn('Computer Science', text)
+
+    def test_unreadable_resume_fails_alone(self):
+        broken, readable = self.create_applicants(2)
+        for employee, name, content in [(broken, 'broken.pdf', b'%PDF-1.4 truncated'),
+                                        (readable, 'cv.txt', b'Django developer')]:
+            os.makedirs(os.path.join(settings.MEDIA_ROOT, 'resumes'), exist_ok=True)
+            with open(os.path.join(settings.MEDIA_ROOT, 'resumes', name), 'wb') as fh:
+                fh.write(content)
+            Employee.objects.filter(pk=employee.pk).update(resume=f'resumes/{name}')
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('extract_resumes', workers=1, stdout=stdout, stderr=stderr)
+        self.assertIn('Extracted 1 resumes, 1 failed', stdout.getvalue())
+        self.assertIn('broken.pdf', stderr.getvalue())
+        self.assertEqual(list(ResumeText.objects.values_list('employee_id', flat=True)), [readable.pk])
+
+    @override_settings(API_RESUME_EXTRACTION_WORKERS=1)
+    def test_background_extraction_failures_are_logged(self):
+        def shut_down():
+            resumes._get_executor().shutdown()
+            resumes._executor = None
+
+        resumes._executor = None
+        self.addCleanup(shut_down)
+        with mock.patch('api.resumes.extract_resume', side_effect=OSError('disk gone')), \
+                self.assertLogs('api.resumes', 'ERROR') as logs:
+            resumes._submit(self.employee.pk)
+            # The single worker runs the done-callback before the next task
+            resumes._get_executor().submit(lambda: None).result()
+        self.assertIn(f'employee {self.employee.pk}', logs.output[0])
+        self.assertIn('disk gone', logs.output[0])
+
+
+class TokenAuthenticationTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.employer.user.set_password('secret')
+        self.employer.user.save()
+
+    def obtain_token(self, password='secret'):
+        return self.client.post(reverse('api_token_auth'),
+                                {'username': 'employer', 'password': password}, format='json')
+
+    def test_obtain_token_rejects_bad_credentials(self):
+        self.assertEqual(self.obtain_token('wrong').status_code, 400)
+
+    def test_repeat_requests_resolve_user_and_roles_without_queries(self):
+        token = self.obtain_token().data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        listing = self.create_listings(1)[0]
+        path = reverse('applications_for_job_listing', args=[listing.pk])
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('"auth_user"', sql)
+        self.assertNotIn('"api_employer"', sql)
+
+    def test_revoked_and_expired_tokens_are_rejected(self):
+        token = self.obtain_token().data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get(reverse('job_listings')).status_code, 200)
+        with override_settings(API_TOKEN_TTL=-1):
+            self.assertEqual(self.client.get(reverse('job_listings')).status_code, 401)
+
+        self.assertEqual(self.client.post(reverse('revoke_token')).status_code, 204)
+        self.assertEqual(self.client.get(reverse('job_listings')).status_code, 401)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.obtain_token().data["token"]}')
+        self.assertEqual(self.client.get(reverse('job_listings')).status_code, 200)
+
+    def test_bundle_loaded_during_a_revoke_is_not_served(self):
+        user = self.employer.user
+        token = issue_token(user)
+        load_bundle = authentication._load_bundle
+
+        def load_then_revoke(user_id):
+            # The revoke commits after this request read the user's rows
+            bundle = load_bundle(user_id)
+            revoke_tokens(user)
+            return bundle
+
+        with mock.patch('api.authentication._load_bundle', side_effect=load_then_revoke):
+            self.assertEqual(resolve_user(user.pk)[0], 0)
+        auth_local_cache.clear()  # as in another worker process
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get(reverse('job_listings')).status_code, 401)
+
+
+class RateLimitTests(JobPortalTestCase):
+
+    def test_burst_is_allowed_then_throttled_with_headers(self):
+        self.client.force_authenticate(self.employee.user)
+        path = reverse('job_listings_with_filters')
+        for remaining in range(59, -1, -1):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['RateLimit-Limit'], '60')
+            self.assertEqual(response['RateLimit-Remaining'], str(remaining))
+
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response['RateLimit-Remaining'], '0')
+
+        # Buckets are per user
+        self.client.force_authenticate(self.employer.user)
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+    @override_settings(API_RATE_LIMIT_STORE='api.throttling.CacheBucketStore')
+    def test_cache_store_refills_over_time(self):
+        stores = [throttling.CacheBucketStore(), throttling.CacheBucketStore()]
+        results = [stores[i % 2].consume('scope:u1', 2, 1.0, 100.0)[0] for i in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertTrue(stores[0].consume('scope:u1', 2, 1.0, 101.0)[0])
+
+    def test_cache_store_does_not_overspend_under_concurrency(self):
+        store = throttling.CacheBucketStore()
+        store.LOCK_WAIT = 5
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.consume('scope:u2', 5, 0.001, 100.0)[0]))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 5)
+
+    def test_ip_key_ignores_forwarded_for_without_proxies(self):
+        path = reverse('api_token_auth')
+        statuses = [self.client.post(path, {'username': 'x', 'password': 'y'},
+                                     HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code for i in range(12)]
+        self.assertIn(429, statuses)
+
+    def test_local_store_overhead(self):
+        store = throttling.LocalBucketStore()
+        start = time.perf_counter()
+        for i in range(10000):
+            store.consume(f'scope:u{i % 100}', 10, 1.0, time.time())
+        self.assertLess((time.perf_counter() - start) / 10000, 0.001)
+
+
+class AsyncReadViewTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.listing = self.create_listings(3)[0]
+        self.apply(self.listing, [self.employee] + self.create_applicants(2))
+        self.factory = AsyncRequestFactory()
+
+    async def call(self, view, user, path, *args):
+        token = await sync_to_async(issue_token)(user)
+        request = self.factory.get(path, AUTHORIZATION=f'Bearer {token}')
+        return await view(request, *args)
+
+    async def assertSameAsSync(self, view, user, path, *args):
+        await sync_to_async(self.client.force_authenticate)(user)
+        expected = await sync_to_async(self.client.get)(path)
+        response = await self.call(view, user, path, *args)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+
+    async def test_async_views_render_the_same_pages_as_sync_views(self):
+        await self.assertSameAsSync(
+            async_views.applications_for_job_listing, self.employer.user,
+            reverse('applications_for_job_listing', args=[self.listing.pk]) + '?page_size=2',
+            self.listing.pk)
+        await self.assertSameAsSync(
+            async_views.employee_applications, self.employee.user, reverse('employee_applications'))
+        await self.assertSameAsSync(
+            async_views.job_listings_with_filters, self.employee.user,
+            reverse('job_listings_with_filters') + '?page_size=2&location=Berlin')
+
+    async def test_async_views_check_permissions_and_throttles(self):
+        path = reverse('applications_for_job_listing', args=[self.listing.pk])
+        response = await self.call(async_views.applications_for_job_listing, self.employee.user, path, self.listing.pk)
+        self.assertEqual(response.status_code, 403)
+        response = await async_views.employee_applications(self.factory.get(reverse('employee_applications')))
+        self.assertEqual(response.status_code, 401)
+
+        limited = throttling.rate_limit(async_views.employee_applications, '1/m')
+        first = await self.call(limited, self.employee.user, reverse('employee_applications'))
+        second = await self.call(limited, self.employee.user, reverse('employee_applications'))
+        self.assertEqual((first.status_code, second.status_code), (200, 429))
+        self.assertEqual(second['RateLimit-Remaining'], '0')
+        self.assertEqual(second['Retry-After'], '60')
+
+    async def test_async_views_negotiate_and_handle_errors_like_apiview(self):
+        path = reverse('employee_applications')
+        token = await sync_to_async(issue_token)(self.employee.user)
+        for request, expected in [
+            (self.factory.get(path, AUTHORIZATION=f'Bearer {token}', ACCEPT='application/xml'), 406),
+            (self.factory.post(path, AUTHORIZATION=f'Bearer {token}'), 405),
+            (self.factory.get(path, AUTHORIZATION='Bearer bogus'), 401),
+        ]:
+            response = await async_views.employee_applications(request)
+            self.assertEqual(response.status_code, expected)
+            self.assertIn('detail', json.loads(response.content))
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+        response = await async_views.employee_applications(
+            self.factory.get(path, AUTHORIZATION=f'Bearer {token}', ACCEPT='text/html'))
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+
+class BenchCommandTests(TestCase):
+
+    def test_every_route_has_a_request_builder(self):
+        names = {pattern.name for pattern in get_resolver('api.urls').url_patterns}
+        self.assertEqual(names - set(ROUTES), set())
+
+    def test_routes_without_rows_left_are_skipped(self):
+        employee = Employee(pk=1, user=User(pk=1))
+        fixtures = SimpleNamespace(employees=[employee], submitted={1: [7]}, employers=[Employer(pk=1)],
+                                   received={1: []})
+        rng = random.Random(0)
+        withdraw = ROUTES['withdraw_application'][1]
+        self.assertEqual(withdraw(fixtures, rng)[1], reverse('withdraw_application', args=[7]))
+        for route in ('withdraw_application', 'update_application_status', 'batch_update_application_status',
+                      'employee_resume'):
+            with self.assertRaises(NoFixture):
+                ROUTES[route][1](fixtures, rng)
+
+    def test_mix_file_selects_and_weights_routes(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as fh:
+            fh.write('{"route": "search_job_listings", "weight": 3}\n\n{"route": "job_listings"}\n')
+        self.addCleanup(os.remove, fh.name)
+        self.assertEqual(load_mix(fh.name), {'search_job_listings': 3, 'job_listings': 8})
+
+        with open(fh.name, 'a') as extra:
+            extra.write('{"route": "nope"}\n')
+        with self.assertRaisesMessage(CommandError, "unknown route 'nope'"):
+            load_mix(fh.name)
+
+
+@override_settings(API_METRICS_ENABLED=True, API_QUERY_BUDGETS={'default': 50, 'job_listings': 0})
+class RequestMetricsTests(JobPortalTestCase):
+
+    def test_server_timing_and_log_record(self):
+        self.employer.user.is_staff = True
+        self.employer.user.save()
+        self.client.force_authenticate(self.employer.user)
+        self.create_listings(2)
+        with self.assertLogs('api.metrics', 'INFO') as logs:
+            response = self.client.get(reverse('job_listings_with_filters'))
+        self.assertEqual(response.status_code, 200)
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'view', 'serialize', 'response', 'total'})
+        self.assertIn('desc="1 queries"', timing['db'])
+
+        metrics = logs.records[0].metrics
+        self.assertEqual((metrics['route'], metrics['queries'], metrics['over_budget']),
+                         ('job_listings_with_filters', 1, False))
+
+    def test_rendering_is_timed_as_serialization(self):
+        self.client.force_authenticate(self.employer.user)
+        render = FastJSONRenderer.render
+
+        def slow_render(renderer, *args, **kwargs):
+            time.sleep(0.05)
+            return render(renderer, *args, **kwargs)
+
+        with override_settings(DEBUG=True), self.assertLogs('api.metrics', 'INFO') as logs, \
+                mock.patch.object(FastJSONRenderer, 'render', slow_render):
+            response = self.client.get(reverse('job_listings_with_filters'))
+        self.assertEqual(response.status_code, 200)
+        metrics = logs.records[0].metrics
+        self.assertGreaterEqual(metrics['serialize_ms'], 50)
+        self.assertLess(metrics['view_ms'], 50)
+        self.assertLess(metrics['response_ms'], 50)
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+
+    async def test_async_views_time_their_own_rendering_as_serialization(self):
+        middleware = RequestMetricsMiddleware(async_views.job_listings_with_filters)
+        token = await sync_to_async(issue_token)(self.employee.user)
+        request = AsyncRequestFactory().get(reverse('job_listings_with_filters'), AUTHORIZATION=f'Bearer {token}')
+        render = FastJSONRenderer.render
+
+        def slow_render(renderer, *args, **kwargs):
+            time.sleep(0.05)
+            return render(renderer, *args, **kwargs)
+
+        with self.assertLogs('api.metrics', 'INFO') as logs, \
+                mock.patch.object(FastJSONRenderer, 'render', slow_render):
+            response = await middleware(request)
+        self.assertEqual(response.status_code, 200)
+        metrics = logs.records[0].metrics
+        self.assertGreaterEqual(metrics['serialize_ms'], 50)
+        self.assertLess(metrics['view_ms'], 50)
+
+    def test_query_budget_overrun_is_a_warning(self):
+        self.client.force_authenticate(self.employer.user)
+        with self.assertLogs('api.metrics', 'WARNING') as logs:
+            self.client.get(reverse('job_listings'))
+        self.assertTrue(logs.records[0].metrics['over_budget'])
+
+    def test_server_timing_is_for_staff_or_debug(self):
+        self.client.force_authenticate(self.employee.user)
+        with self.assertLogs('api.metrics', 'INFO'):
+            response = self.client.get(reverse('job_listings_with_filters'))
+        self.assertNotIn('Server-Timing', response)
+        with override_settings(DEBUG=True), self.assertLogs('api.metrics', 'INFO'):
+            self.assertIn('Server-Timing', self.client.get(reverse('job_listings_with_filters')))
+
+    @override_settings(API_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        self.client.force_authenticate(self.employer.user)
+        response = self.client.get(reverse('job_listings'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(API_METRICS_ENABLED=False)
+    def test_disabled_middleware_leaves_the_chain(self):
+        self.client.force_authenticate(self.employer.user)
+        response = self.client.get(reverse('job_listings'))
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(API_DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(JobPortalTestCase):
+    """A second SQLite file stands in for a replica that has not caught up."""
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        replica = {**settings.DATABASES['default'], 'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3')}
+        connections.settings['replica'] = connections.configure_settings(
+            {'default': {}, 'replica': replica})['replica']
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+
+    def test_listing_reads_use_the_replica(self):
+        self.create_listings(3)
+        self.client.force_authenticate(self.employer.user)
+        response = self.client.get(reverse('job_listings'))
+        self.assertEqual(response.data['results'], [])
+
+        with override_settings(API_DATABASE_REPLICAS=[]):
+            response = self.client.get(reverse('job_listings'))
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_filtered_listings_are_read_from_the_primary(self):
+        self.create_listings(2)
+        self.client.force_authenticate(self.employee.user)
+        url = reverse('job_listings_with_filters')
+        self.assertEqual(len(self.client.get(url, {'location': 'Berlin'}).data['results']), 2)
+        self.assertEqual(len(self.client.get(url).data['results']), 2)
+
+        # The write bumps the version; the replica has not caught up with it
+        with self.captureOnCommitCallbacks(execute=True):
+            JobListing.objects.create(title='Dev', description='', location='Berlin', salary=Decimal(1),
+                                      company=self.employer)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_writers_read_their_own_writes_from_the_primary(self):
+        listing = self.create_listings(1)[0]
+        self.client.force_authenticate(self.employee.user)
+        self.assertEqual(self.client.get(reverse('employee_applications')).data['results'], [])
+
+        response = self.client.post(reverse('add_job_application', args=[listing.pk]))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_pinned(self.employee.user))
+        self.assertEqual(len(self.client.get(reverse('employee_applications')).data['results']), 1)
+
+        # Once the pin expires reads go back to the (lagging) replica
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('employee_applications')).data['results'], [])
+
+
+class ApplicationCounterTests(JobPortalTestCase):
+
+    def counts(self, listing):
+        return JobListingCounters.objects.values('total', 'applied', 'in_progress', 'rejected', 'accepted') \
+            .get(job_listing=listing)
+
+    def test_counters_follow_apply_status_change_and_withdraw(self):
+        listing = self.create_listings(1)[0]
+        self.client.force_authenticate(self.employee.user)
+        self.client.post(reverse('add_job_application', args=[listing.pk]))
+        self.apply(listing, self.create_applicants(1))  # bulk: not counted until a recount
+        self.assertEqual(self.counts(listing)['total'], 1)
+
+        application = JobApplication.objects.get(job_listing=listing, applicant=self.employee)
+        self.client.force_authenticate(self.employer.user)
+        self.client.put(reverse('update_application_status', args=[application.pk]), {'status': 'AC'})
+        self.assertEqual(self.counts(listing),
+                         {'total': 1, 'applied': 0, 'in_progress': 0, 'rejected': 0, 'accepted': 1})
+
+        call_command('recount_applications', stdout=io.StringIO())
+        self.assertEqual(self.counts(listing),
+                         {'total': 2, 'applied': 1, 'in_progress': 0, 'rejected': 0, 'accepted': 1})
+
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.post(reverse('withdraw_application', args=[application.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counts(listing),
+                         {'total': 1, 'applied': 1, 'in_progress': 0, 'rejected': 0, 'accepted': 0})
+
+    def test_new_listings_get_their_row_before_the_first_application(self):
+        created = JobListing.objects.create(title='Dev', description='', location='Berlin', salary=Decimal(1),
+                                            company=self.employer)
+        import_listings(self.employer, [(1, {'title': 'Ops', 'description': 'Linux', 'location': 'Paris',
+                                             'salary': '1'})])
+        imported = JobListing.objects.get(title='Ops')
+        zero = {'total': 0, 'applied': 0, 'in_progress': 0, 'rejected': 0, 'accepted': 0}
+        self.assertEqual(self.counts(created), zero)
+        self.assertEqual(self.counts(imported), zero)
+
+        # The first application is a plain increment: nothing to recount or lock
+        self.client.force_authenticate(self.employee.user)
+        with mock.patch('api.counters.recount') as recount:
+            for listing in (created, imported):
+                response = self.client.post(reverse('add_job_application', args=[listing.pk]))
+                self.assertEqual(response.status_code, 201)
+        recount.assert_not_called()
+        self.assertEqual(self.counts(created), {**zero, 'total': 1, 'applied': 1})
+        self.assertEqual(self.counts(imported), {**zero, 'total': 1, 'applied': 1})
+
+    def test_dashboard_lists_counts_in_one_query(self):
+        listings = self.create_listings(3)
+        for listing in listings[:2]:
+            self.apply(listing, self.create_applicants(2))
+        call_command('recount_applications', batch_size=2, stdout=io.StringIO())
+        self.client.force_authenticate(self.employer.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('employer_dashboard'))
+        self.assertEqual(len(queries), 1)
+        totals = {row['id']: row['applications']['total'] for row in response.data['results']}
+        self.assertEqual(totals, {listings[0].pk: 2, listings[1].pk: 2, listings[2].pk: 0})
+
+
+class BatchStatusUpdateTests(JobPortalTestCase):
+
+    def test_updates_owned_applications_in_constant_queries(self):
+        listing = self.create_listings(1)[0]
+        other_employer = Employer.objects.create(
+            user=User.objects.create_user('other'), company_name='Other', company_description='', email='o@x.test')
+        other_listing = self.create_listings(1, employer=other_employer)[0]
+        applications = self.apply(listing, self.create_applicants(30))
+        foreign = self.apply(other_listing, self.create_applicants(1))[0]
+        call_command('recount_applications', stdout=io.StringIO())
+        ids = [a.pk for a in applications] + [foreign.pk, 999999]
+        self.client.force_authenticate(self.employer.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('batch_update_application_status'),
+                                        {'ids': ids, 'status': 'RE'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(queries), 15)
+        self.assertEqual(response.data['updated'], 30)
+        self.assertEqual(response.data['results'][foreign.pk], 'not_found')
+        self.assertEqual(response.data['results'][999999], 'not_found')
+
+        self.assertEqual(JobApplication.objects.filter(status__name='RE').count(), 30)
+        self.assertEqual(JobApplication.objects.get(pk=foreign.pk).status.name, 'AP')
+        self.assertEqual(EmailNotification.objects.count(), 30)
+        self.assertEqual(JobListingCounters.objects.get(job_listing=listing).rejected, 30)
+
+        # Repeating the request changes nothing
+        response = self.client.post(reverse('batch_update_application_status'),
+                                    {'ids': ids[:2], 'status': 'RE'}, format='json')
+        self.assertEqual(set(response.data['results'].values()), {'unchanged'})
+
+    def test_rejects_bad_input(self):
+        self.client.force_authenticate(self.employer.user)
+        url = reverse('batch_update_application_status')
+        self.assertEqual(self.client.post(url, {'ids': [], 'status': 'RE'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'ids': [1], 'status': 'XX'}, format='json').status_code, 400)
+        for ids in ([True], [1, False], ['1'], [1.0], 1):
+            self.assertEqual(self.client.post(url, {'ids': ids, 'status': 'RE'}, format='json').status_code, 400,
+                             ids)
+        with override_settings(API_MAX_BATCH_SIZE=2):
+            self.assertEqual(self.client.post(url, {'ids': [1, 2, 3], 'status': 'RE'}, format='json').status_code,
+                             400)
+
+
+class RecommendationTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        recommendations._index = None
+        ResumeText.objects.create(employee=self.employee, resume_name='resumes/resume1.pdf', text='',
+                                  terms={'django': 4, 'python': 3, 'postgres': 1})
+        self.django, self.accounting, self.python = [
+            JobListing.objects.create(title=title, description=description, location=location,
+                                      salary=salary, company=self.employer)
+            for title, description, location, salary in [
+                ('Django developer', 'Build Django and Python services on Postgres', 'Berlin', 70000),
+                ('Accountant', 'Bookkeeping and payroll', 'Berlin', 50000),
+                ('Python engineer', 'Data pipelines in Python', 'Paris', 65000),
+            ]]
+        self.client.force_authenticate(self.employee.user)
+
+    def ranked(self, **params):
+        response = self.client.get(reverse('recommended_job_listings'), params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_listings_are_ranked_by_resume_match(self):
+        self.assertEqual(self.ranked(), [self.django.pk, self.python.pk, self.accounting.pk])
+        self.assertEqual(self.ranked(min_salary=60000), [self.django.pk, self.python.pk])
+        self.apply(self.django, [self.employee])
+        self.assertEqual(self.ranked(limit=1), [self.python.pk])
+
+    def test_index_follows_listing_changes(self):
+        recommendations.get_index()
+        self.accounting.description = 'Django Django Python Postgres'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.accounting.save()
+        self.assertEqual(self.ranked(limit=1, location='Berlin'), [self.accounting.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.accounting.delete()
+        self.assertNotIn(self.accounting.pk, self.ranked())
+        self.assertNotIn(self.accounting.pk, recommendations.get_index().rows)
+
+    def test_rolled_back_delete_keeps_the_listing(self):
+        recommendations.get_index()
+        listing_id = self.accounting.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                self.accounting.delete()
+                raise IntegrityError
+        self.assertIn(listing_id, recommendations.get_index().rows)
+
+    def test_employers_get_no_recommendations(self):
+        self.client.force_authenticate(self.employer.user)
+        self.assertEqual(self.client.get(reverse('recommended_job_listings')).status_code, 403)
+
+
+class FacetTests(JobPortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = Employer.objects.create(
+            user=User.objects.create_user('other'), company_name='Other', company_description='', email='o@x.test')
+        for location, salary, company in [('Berlin', 40000, self.employer), ('Berlin', 80000, self.employer),
+                                          ('Paris', 45000, self.other), ('Berlin', 120000, self.other)]:
+            JobListing.objects.create(title='Job', description='Python', location=location, salary=salary,
+                                      company=company)
+        self.client.force_authenticate(self.employee.user)
+
+    def facets(self, **params):
+        response = self.client.get(reverse('job_listings_with_filters'), {'facets': 1, **params})
+        self.assertEqual(response.status_code, 200)
+        facets = response.data['facets']
+        return ({row['value']: row['count'] for row in facets['location']},
+                {row['name']: row['count'] for row in facets['company']},
+                {row['min']: row['count'] for row in facets['salary']})
+
+    def test_counts_come_from_the_facet_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            locations, companies, bands = self.facets(location='Berlin')
+        self.assertEqual(locations, {'Berlin': 3})
+        self.assertEqual(companies, {'Acme': 2, 'Other': 1})
+        self.assertEqual(bands, {30000: 1, 75000: 1, 100000: 1})
+        self.assertFalse([q for q in queries.captured_queries if 'GROUP BY "api_joblisting"' in q['sql']])
+
+        self.assertEqual(self.facets(salary_min=0), self.facets())
+        response = self.client.get(reverse('job_listings_with_filters'), {'facets': 1, 'salary_min': 50000,
+                                                                         'salary_max': 99999.99})
+        self.assertEqual(response.data['facets']['salary'], [{'min': 75000, 'max': 100000, 'count': 1}])
+        self.assertTrue(response.data['facets']['exact'])
+        response = self.client.get(reverse('job_listings_with_filters'), {'facets': 1, 'salary_min': 40001})
+        self.assertFalse(response.data['facets']['exact'])
+        response = self.client.get(reverse('job_listings_with_filters'),
+                                   {'facets': 1, 'created_after': '2024-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_counts_follow_listing_writes(self):
+        # Loaded without its cell: the old cell is read back, not the table rebuilt
+        listing = JobListing.objects.only('location').get(location='Paris')
+        listing.location = 'Berlin'
+        with mock.patch('api.facets.rebuild') as rebuild:
+            listing.save()
+        rebuild.assert_not_called()
+        JobListing.objects.filter(salary=40000).get().delete()
+        self.assertEqual(self.facets()[0], {'Berlin': 3})
+
+        self.create_listings(2)  # bulk: not counted until a rebuild
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_facets', stdout=io.StringIO())
+        self.assertEqual(self.facets()[0], {'Berlin': 5})
+        self.assertEqual(sum(JobListingFacet.objects.values_list('count', flat=True)), 5)
+
+    def test_counts_are_cached_per_result_set(self):
+        self.facets(location='Berlin')
+        # Another page size of the same result set reuses the counts
+        with CaptureQueriesContext(connection) as queries:
+            self.facets(location='Berlin', page_size=1)
+        self.assertFalse([q for q in queries.captured_queries if 'api_joblistingfacet' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobListing.objects.create(title='Job', description='', location='Berlin', salary=1, company=self.other)
+        self.assertEqual(self.facets(location='Berlin')[0], {'Berlin': 4})
+
+
+class JobListingFilterTests(JobPortalTestCase):
+
+    def test_unknown_and_unindexed_parameters_are_rejected(self):
+        self.client.force_authenticate(self.employee.user)
+        url = reverse('job_listings_with_filters')
+        for params in [{'description': 'Python'}, {'salary': 50000}, {'ordering': 'title'},
+                       {'salary_min': 1, 'created_after': '2024-01-01T00:00:00Z'},
+                       {'salary_min': 1, 'ordering': '-created_at'}, {'location_prefix': 'B', 'ordering': 'salary'},
+                       {'company': 1, 'ordering': 'salary'}, {'company': 1, 'location': 'Berlin'}]:
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+    def test_ranges_prefix_and_ordering(self):
+        self.create_listings(5)
+        JobListing.objects.filter(salary=50004).update(location='Bern')
+        self.client.force_authenticate(self.employee.user)
+        url = reverse('job_listings_with_filters')
+
+        response = self.client.get(url, {'salary_min': 50001, 'salary_max': 50003, 'ordering': '-salary'})
+        self.assertEqual([row['salary'] for row in response.data['results']], ['50003.00', '50002.00', '50001.00'])
+        # The prefix range brings its own ordering: location, then id
+        response = self.client.get(url, {'location_prefix': 'Ber', 'page_size': 2})
+        self.assertEqual([row['salary'] for row in response.data['results']], ['50000.00', '50001.00'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['salary'] for row in response.data['results']], ['50002.00', '50003.00'])
+        response = self.client.get(url, {'location_prefix': 'Bern'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_prefixes_ending_in_the_last_code_points(self):
+        self.create_listings(1)
+        JobListing.objects.update(location='Berlin\U0010ffff')
+        self.client.force_authenticate(self.employee.user)
+        url = reverse('job_listings_with_filters')
+        for prefix, found in [('Berlin\U0010ffff', 1), ('\U0010ffff', 0), ('\ud7ff', 0), ('Berlin\ud7ff', 0)]:
+            response = self.client.get(url, {'location_prefix': prefix})
+            self.assertEqual(response.status_code, 200, prefix)
+            self.assertEqual(len(response.data['results']), found, prefix)
+
+    def test_format_and_boolean_facets_parameters(self):
+        self.create_listings(1)
+        self.client.force_authenticate(self.employee.user)
+        url = reverse('job_listings_with_filters')
+        response = self.client.get(url, {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.client.get(url, {'format': 'api'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Job', response.content)
+
+        for value in ('0', 'false'):
+            response = self.client.get(url, {'facets': value})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('facets', response.data)
+            # Without facets the range and equality rules apply as usual
+            self.assertEqual(self.client.get(url, {'facets': value, 'created_after': '2024-01-01T00:00:00Z'})
+                             .status_code, 200)
+        for value in ('1', 'true'):
+            self.assertIn('facets', self.client.get(url, {'facets': value}).data)
+
+
+class JobListingFilterPlanTests(TestCase):
+    """Every filter the endpoint accepts is served by an index of JobListing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(employers=20, employees=10, listings=20_000, applications=0)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.listing = JobListing.objects.order_by('pk')[10_000]
+
+    def plan(self, params):
+        request = RequestFactory().get('/', params)
+        filterset = JobListingFilter(request.GET, queryset=JobListing.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        paginator = JobListingPagination()
+        paginator.ordering = paginator.orderings[filterset.page_ordering]
+        return paginator.page_queryset(filterset.qs, request).explain()
+
+    def test_every_filter_uses_an_index(self):
+        listing = self.listing
+        created = listing.created_at.isoformat()
+        cases = [
+            {'company': listing.company_id},
+            {'location': listing.location},
+            {'location_prefix': listing.location[:2]},
+            {'location_prefix': listing.location[:2], 'ordering': '-location'},
+            {'salary_min': listing.salary},
+            {'salary_min': listing.salary, 'salary_max': listing.salary + 1000, 'ordering': '-salary'},
+            {'created_after': created},
+            {'created_before': created, 'ordering': 'created_at'},
+            {'company': listing.company_id, 'created_after': created},
+            {'location': listing.location, 'ordering': 'location'},
+        ]
+        for params in cases:
+            plan = self.plan(params)
+            self.assertNotIn('TEMP B-TREE', plan, f'{params}: {plan}')
+            table_lines = [line for line in plan.splitlines() if 'api_joblisting' in line]
+            self.assertTrue(table_lines, plan)
+            for line in table_lines:
+                self.assertRegex(line, r'SEARCH .*USING (COVERING )?INDEX', f'{params}: {plan}')
+
+        # Without filters the page is the first rows of the ordering index
+        for ordering in JobListingPagination.orderings:
+            plan = self.plan({'ordering': ordering})
+            self.assertNotIn('TEMP B-TREE', plan, f'{ordering}: {plan}')
+            self.assertIn('USING INDEX', plan, f'{ordering}: {plan}')
+
+
+class ProjectionTests(JobPortalTestCase):
+    """The values() projections render to the same bytes as the serializers."""
+
+    def setUp(self):
+        super().setUp()
+        self.listings = [
+            JobListing.objects.create(title='Line\u2028separator \u00e9', description='', location='Z\u00fcrich',
+                                      salary=Decimal('1234.50'), company=self.employer),
+            JobListing.objects.create(title='Job', description='"quoted"\n', location='Berlin',
+                                      salary=Decimal('0.01'), company=self.employer),
+        ]
+        applicants = self.create_applicants(2)
+        Employee.objects.filter(pk=applicants[1].pk).update(resume='')
+        self.apply(self.listings[0], applicants)
+        self.apply(self.listings[1], [self.employee])
+        JobApplication.objects.filter(applicant=applicants[0]).update(status=None)
+
+    def assertSameJSON(self, projection, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        rows = projection.values(queryset)
+        self.assertEqual(JSONRenderer().render(projection.data(rows)), expected)
+        self.assertEqual(FastJSONRenderer().render(projection.data(rows)), expected)
+
+    def test_projection_matches_serializer(self):
+        self.assertSameJSON(JOB_LISTING_PROJECTION, JobListingSerializer, JobListing.objects.order_by('id'))
+        self.assertSameJSON(JOB_APPLICATION_PROJECTION, JobApplicationSerializer,
+                            JobApplication.objects.order_by('id'))
+
+    def test_list_endpoints_return_serializer_output(self):
+        self.client.force_authenticate(self.employer.user)
+        response = self.client.get(reverse('applications_for_job_listing', args=[self.listings[0].pk]))
+        applications = JobApplication.objects.filter(job_listing=self.listings[0]).order_by('-applied_at', '-id')
+        self.assertEqual(response.json()['results'],
+                         json.loads(JSONRenderer().render(JobApplicationSerializer(applications, many=True).data)))
+
+        response = self.client.get(reverse('job_listings'), {'ordering': 'salary'})
+        self.assertEqual([row['salary'] for row in response.json()['results']], ['0.01', '1234.50'])
+        self.assertIsNone(response.json()['next'])
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {'when': timezone.now(), 'day': timezone.now().date(), 'amount': Decimal('1.10'), 1: None,
+                'text': 'a\u2029b \u00e9 "q"', 'nested': [(1, 2.5), {'big': 2 ** 70}], 'flag': True}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=2'),
+                         JSONRenderer().render(data, 'application/json; indent=2'))
+        with mock.patch('api.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_fast_renderer_reads_container_subclasses_through_their_contents(self):
+        data = ErrorDict({'__all__': ErrorList(['boom'])})
+        self.assertEqual(FastJSONRenderer().render(data), b'{"__all__":["boom"]}')
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.get(reverse('job_listings_with_filters'), {'company': 1, 'location': 'Berlin'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most one of these filters', response.json()['__all__'][0])
+
+
+class LifecycleEventTests(JobPortalTestCase):
+
+    def feed(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse('lifecycle_events'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_feed_follows_listing_and_application_changes(self):
+        self.client.force_authenticate(self.employer.user)
+        response = self.client.post(reverse('job_listings'), {'title': 'Dev', 'description': 'Python',
+                                                              'location': 'Berlin', 'salary': '50000.00'},
+                                    format='json')
+        listing_id = response.data['id']
+        self.client.patch(reverse('update_job_listing', args=[listing_id]), {'salary': '55000.00'}, format='json')
+        self.client.force_authenticate(self.employee.user)
+        self.client.post(reverse('add_job_application', args=[listing_id]))
+        application = JobApplication.objects.get()
+        self.client.force_authenticate(self.employer.user)
+        self.client.put(reverse('update_application_status', args=[application.pk]), {'status': 'PR'},
+                        format='json')
+        self.client.post(reverse('batch_update_application_status'), {'ids': [application.pk], 'status': 'AC'},
+                         format='json')
+        self.client.force_authenticate(self.employee.user)
+        self.client.post(reverse('withdraw_application', args=[application.pk]))
+        import_listings(self.employer, [(1, {'title': 'Ops', 'description': 'Linux', 'location': 'Paris',
+                                             'salary': '40000'})])
+
+        data = self.feed(self.employer.user)
+        self.assertEqual([(e['kind'], e['data'].get('status'), e['data'].get('previous_status'))
+                          for e in data['events']], [
+            ('listing.created', None, None),
+            ('listing.updated', None, None),
+            ('application.created', 'AP', None),
+            ('application.status_changed', 'PR', 'AP'),
+            ('application.status_changed', 'AC', 'PR'),
+            ('application.deleted', None, None),
+            ('listing.created', None, None),
+        ])
+        self.assertEqual(data['events'][1]['data']['salary'], '55000.00')
+        self.assertFalse(data['has_more'])
+
+        # The employee sees their application's events only
+        employee_events = self.feed(self.employee.user)['events']
+        self.assertEqual([e['kind'] for e in employee_events],
+                         ['application.created', 'application.status_changed', 'application.status_changed',
+                          'application.deleted'])
+
+        # Paging with "after" returns every event once, and stays put at the end
+        seen, after = [], 0
+        while True:
+            page = self.feed(self.employer.user, after=after, limit=3)
+            seen += [e['seq'] for e in page['events']]
+            after = page['after']
+            if not page['has_more']:
+                break
+        self.assertEqual(seen, [e['seq'] for e in data['events']])
+        self.assertEqual(self.feed(self.employer.user, after=after)['events'], [])
+        self.assertEqual(self.feed(self.employer.user, after=after)['after'], after)
+
+    @override_settings(API_EVENT_FEED_LAG_SECONDS=60)
+    def test_recent_events_are_held_back_where_commits_can_reorder(self):
+        JobListing.objects.create(title='Dev', description='', location='Berlin', salary=Decimal(1),
+                                  company=self.employer)
+        # SQLite commits in id order, so nothing needs holding back
+        self.assertEqual(len(self.feed(self.employer.user)['events']), 1)
+
+        with mock.patch('api.events.commits_in_id_order', return_value=False):
+            self.assertEqual(self.feed(self.employer.user)['events'], [])
+            LifecycleEvent.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+            self.assertEqual(len(self.feed(self.employer.user)['events']), 1)
+        self.assertEqual(LifecycleEvent.objects.count(), 1)
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    """Connections opened through api.db_backends.sqlite3, on a file like production."""
+
+    alias = 'backend_test'
+
+    def connect(self, **options):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        settings_dict = connections.configure_settings({'default': {
+            'ENGINE': 'api.db_backends.sqlite3', 'NAME': self.path, 'OPTIONS': options}})['default']
+        wrapper = connections[self.alias] = sqlite_backend.DatabaseWrapper(settings_dict, self.alias)
+        self.addCleanup(delattr, connections._connections, self.alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def other_writer(self):
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        return other
+
+    def test_connections_apply_the_pragmas(self):
+        wrapper = self.connect(timeout=7)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 7000)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -20000)
+
+    def test_pragmas_option_overrides_the_defaults(self):
+        wrapper = self.connect(pragmas={'synchronous': 'FULL'})
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 2)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+
+    def test_transactions_take_the_write_lock_at_begin(self):
+        wrapper = self.connect()
+        other = self.other_writer()
+        with CaptureQueriesContext(wrapper) as queries, transaction.atomic(using=self.alias):
+            self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+            # Before any write of ours, another writer already has to wait
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+
+    def test_transaction_mode_option_restores_deferred_transactions(self):
+        wrapper = self.connect(transaction_mode='deferred')
+        other = self.other_writer()
+        with CaptureQueriesContext(wrapper) as queries, transaction.atomic(using=self.alias):
+            self.assertEqual(queries[0]['sql'], 'BEGIN DEFERRED')
+            other.execute('BEGIN IMMEDIATE')
+            other.execute('ROLLBACK')
+
+
+@skipUnless(pg_backend, 'psycopg2 is not installed')
+class PooledPostgreSQLBackendTests(SimpleTestCase):
+    """The pool of api.db_backends.postgresql, with stand-ins for psycopg2 connections."""
+
+    alias = 'pool_test'
+
+    def setUp(self):
+        self.addCleanup(pg_backend._pools.pop, self.alias, None)
+
+    def wrapper(self, max_idle=1, health_checks=False):
+        settings_dict = connections.configure_settings({'default': {
+            'ENGINE': 'api.db_backends.postgresql', 'NAME': 'jobportal', 'CONN_HEALTH_CHECKS': health_checks,
+            'OPTIONS': {'pool': {'max_idle': max_idle}}}})['default']
+        wrapper = pg_backend.DatabaseWrapper(settings_dict, self.alias)
+        return wrapper, wrapper.get_connection_params()
+
+    def raw_connection(self, status=None):
+        raw = mock.MagicMock(closed=0, isolation_level=None)
+        raw.get_transaction_status.return_value = (
+            pg_backend.TRANSACTION_STATUS_IDLE if status is None else status)
+        return raw
+
+    def connect(self, *raw_connections):
+        return mock.patch.object(pg_backend.base.DatabaseWrapper, 'get_new_connection',
+                                 side_effect=raw_connections)
+
+    def close(self, wrapper, raw):
+        wrapper.connection = raw
+        wrapper._close()
+
+    def test_closed_connections_are_reset_and_reused(self):
+        wrapper, params = self.wrapper()
+        first = self.raw_connection()
+        with self.connect(first) as connect:
+            self.assertIs(wrapper.get_new_connection(params), first)
+            self.close(wrapper, first)
+            first.reset.assert_called_once_with()
+            first.close.assert_not_called()
+
+            self.assertIs(wrapper.get_new_connection(params), first)
+            self.assertEqual(connect.call_count, 1)
+        self.assertIsNone(wrapper.pool.get())
+
+    def test_connections_beyond_max_idle_are_closed(self):
+        wrapper, params = self.wrapper(max_idle=1)
+        first, second = self.raw_connection(), self.raw_connection()
+        with self.connect(first, second):
+            wrapper.get_new_connection(params)
+            wrapper.get_new_connection(params)
+        self.close(wrapper, first)
+        self.close(wrapper, second)
+        first.close.assert_not_called()
+        second.close.assert_called_once_with()
+        self.assertEqual(list(wrapper.pool.idle), [first])
+
+        wrapper.pool.clear()
+        first.close.assert_called_once_with()
+
+    def test_connections_in_a_transaction_are_closed(self):
+        wrapper, params = self.wrapper()
+        raw = self.raw_connection(pg_backend.base.Database.extensions.TRANSACTION_STATUS_INTRANS)
+        self.close(wrapper, raw)
+        raw.reset.assert_not_called()
+        raw.close.assert_called_once_with()
+        self.assertIsNone(wrapper.pool.get())
+
+    def test_broken_pooled_connections_are_replaced(self):
+        wrapper, params = self.wrapper(health_checks=True)
+        broken, fresh = self.raw_connection(), self.raw_connection()
+        broken.cursor.return_value.__enter__.return_value.execute.side_effect = pg_backend.base.Database.Error
+        wrapper.pool.put(broken)
+        with self.connect(fresh):
+            self.assertIs(wrapper.get_new_connection(params), fresh)
+        broken.close.assert_called_once_with()
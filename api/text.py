@@ -0,0 +1,27 @@
+import re
+from collections import Counter
+
+STOPWORDS = frozenset('''
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each etc few for from further
+had has have having he her here hers him his how i if in into is it its itself just me more most
+my no nor not now of off on once only or other our ours out over own per same she should so some
+such than that the their theirs them then there these they this those through to too under until
+up us very via was we were what when where which while who whom why will with within without
+would you your yours
+'''.split())
+
+_WORD_RE = re.compile(r'[a-z][a-z0-9+#.]*[a-z0-9+#]|[a-z]', re.UNICODE)
+
+
+def tokenize(text):
+    """Lower-cased words minus stopwords and one-letter tokens."""
+    return [word for word in _WORD_RE.findall((text or '').lower())
+            if len(word) > 1 and word not in STOPWORDS]
+
+
+def term_counts(text, limit=None):
+    counts = Counter(tokenize(text))
+    if limit is not None and len(counts) > limit:
+        counts = Counter(dict(counts.most_common(limit)))
+    return counts
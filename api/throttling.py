@@ -0,0 +1,185 @@
+import abc
+import asyncio
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``, the same notation DRF throttles use."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class BucketStore(abc.ABC):
+    """
+    Keeps one token bucket per key as ``(tokens, updated_at)``. ``consume``
+    refills the bucket for the time elapsed, takes one token if there is one
+    and returns ``(allowed, tokens_left)``.
+    """
+
+    @abc.abstractmethod
+    def consume(self, key, capacity, refill_rate, now):
+        """Take a token from the bucket of ``key``; must be atomic per key."""
+
+    @staticmethod
+    def _take(state, capacity, refill_rate, now):
+        tokens, updated_at = state if state is not None else (capacity, now)
+        tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        return allowed, tokens
+
+
+class LocalBucketStore(BucketStore):
+    """Buckets in a dict; right for a single process (runserver, tests)."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now):
+        with self.lock:
+            allowed, tokens = self._take(self.buckets.get(key), capacity, refill_rate, now)
+            if len(self.buckets) >= self.max_keys and key not in self.buckets:
+                # Keep the most recently used half; long idle buckets are
+                # likely full again anyway
+                recent = sorted(self.buckets.items(), key=lambda item: item[1][1])
+                self.buckets = dict(recent[len(recent) // 2:])
+            self.buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore(BucketStore):
+    """
+    Buckets in the API_RATE_LIMIT_CACHE cache, shared by every worker that
+    uses the same cache. Each update holds a short lock taken with
+    ``cache.add``, so concurrent requests of one client cannot both spend the
+    same token; the cache needs an atomic add (Redis, memcached, database),
+    which the file based cache does not have. A request that cannot get the
+    lock within LOCK_WAIT seconds is throttled rather than let through.
+    """
+    LOCK_TIMEOUT = 1
+    LOCK_WAIT = 0.05
+    LOCK_POLL = 0.002
+
+    def __init__(self, alias=None):
+        self.alias = alias or getattr(settings, 'API_RATE_LIMIT_CACHE', 'default')
+
+    def consume(self, key, capacity, refill_rate, now):
+        cache = caches[self.alias]
+        key = f'api:ratelimit:{key}'
+        lock = f'{key}:lock'
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not cache.add(lock, 1, self.LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return False, 0.0
+            time.sleep(self.LOCK_POLL)
+        try:
+            allowed, tokens = self._take(cache.get(key), capacity, refill_rate, now)
+            # An idle bucket is full again after this long, so it can expire then
+            timeout = math.ceil((capacity - tokens) / refill_rate) + 1
+            cache.set(key, (tokens, now), timeout)
+        finally:
+            cache.delete(lock)
+        return allowed, tokens
+
+
+_stores = {}
+
+
+def get_store():
+    path = getattr(settings, 'API_RATE_LIMIT_STORE', 'api.throttling.LocalBucketStore')
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = import_string(path)()
+    return store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Allows ``burst`` requests at once, refilled at ``rate``. Buckets are kept
+    per ``scope`` and per user, or per client IP for ``key = 'ip'`` and for
+    anonymous requests. The outcome is left on the request for the
+    RateLimit-* headers added by rate_limit().
+    """
+    scope = None
+    rate = None
+    burst = None
+    key = 'user'
+
+    def get_ident(self, request):
+        # X-Forwarded-For is only trusted behind a known number of proxies
+        # (NUM_PROXIES); otherwise a client could rotate it to dodge the limit
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return super().get_ident(request)
+
+    def get_cache_key(self, request, view):
+        user = request.user
+        if self.key == 'user' and user and user.is_authenticated:
+            return f'{self.scope}:u{user.pk}'
+        return f'{self.scope}:ip{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        num, period = parse_rate(self.rate)
+        self.capacity = self.burst or num
+        self.refill_rate = num / period
+        self.now = time.time()
+        allowed, self.tokens = get_store().consume(
+            self.get_cache_key(request, view), self.capacity, self.refill_rate, self.now)
+        request._request.rate_limit = self
+        return allowed
+
+    def wait(self):
+        return max(0.0, (1 - self.tokens) / self.refill_rate)
+
+    def reset(self):
+        """Seconds until the bucket is full again."""
+        return (self.capacity - self.tokens) / self.refill_rate
+
+
+def rate_limit(view, rate, burst=None, key='user', scope=None):
+    """
+    Return ``view`` (an @api_view or @async_api_view function) with a token bucket limit of
+    ``rate`` requests ('30/min') and bursts of up to ``burst``, for use in
+    urls.py. Responses carry RateLimit-Limit/-Remaining/-Reset headers and
+    throttled ones answer 429 with Retry-After.
+    """
+    throttle = type('TokenBucketThrottle', (TokenBucketThrottle,), {
+        'rate': rate, 'burst': burst, 'key': key, 'scope': scope or view.__name__})
+    limited = view.cls.as_view(throttle_classes=[*view.cls.throttle_classes, throttle])
+
+    if asyncio.iscoroutinefunction(limited):
+        @wraps(limited)
+        async def wrapped(request, *args, **kwargs):
+            return _add_headers(request, await limited(request, *args, **kwargs))
+    else:
+        @wraps(limited)
+        def wrapped(request, *args, **kwargs):
+            return _add_headers(request, limited(request, *args, **kwargs))
+    return wrapped
+
+
+def _add_headers(request, response):
+    state = getattr(request, 'rate_limit', None)
+    if state is not None:
+        response['RateLimit-Limit'] = str(state.capacity)
+        response['RateLimit-Remaining'] = str(int(state.tokens))
+        response['RateLimit-Reset'] = str(math.ceil(state.reset()))
+    return response
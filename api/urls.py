@@ -1,25 +1,49 @@
 from django.urls import path
+from django.conf import settings
 from .views import *
-from rest_framework.authtoken.views import obtain_auth_token
+from .throttling import rate_limit
+
+if settings.API_ASYNC_READ_VIEWS:
+    # Async-native read paths for ASGI deployments
+    from .async_views import applications_for_job_listing, employee_applications, job_listings_with_filters
 
 urlpatterns = [
-    path('api/token/', obtain_auth_token, name='api_token_auth'),
+    path('api/token/', rate_limit(obtain_token, '10/m', key='ip'), name='api_token_auth'),
+
+    # Revoke all tokens of the authenticated user
+    path('api/token/revoke/', revoke_token, name='revoke_token'),
     
     # Add job application by employee
-    path('job-listings/<int:job_listing_id>/apply/', add_job_application, name='add_job_application'),
+    path('job-listings/<int:job_listing_id>/apply/', rate_limit(add_job_application, '30/h', burst=10), name='add_job_application'),
     
     # Review list of applications by employer for a job posting
     path('job-listings/<int:job_listing_id>/applications/', applications_for_job_listing, name='applications_for_job_listing'),
 
+    # Employer to review applications for a job posting ranked by resume keyword match
+    path('job-listings/<int:job_listing_id>/applications/ranked/', ranked_applications_for_job_listing,
+         name='ranked_applications_for_job_listing'),
+
     # Employer to make a job posting and see jobs of their company
     path('job-listings/', job_listings, name='job_listings'),
 
+    # Employer to bulk import job postings from CSV/JSON lines, or stream them all out
+    path('job-listings/bulk/', bulk_job_listings, name='bulk_job_listings'),
+
     # Employee to see all job postings with filtering options
-    path('job-listings/apply', job_listings_with_filters, name='job_listings_with_filters'),
+    path('job-listings/apply', rate_limit(job_listings_with_filters, '120/m', burst=60), name='job_listings_with_filters'),
+
+    # Employee to search job postings by keywords in the title and description
+    path('job-listings/search/', rate_limit(search_job_listings, '120/m', burst=60), name='search_job_listings'),
+
+    # Employee to get job postings recommended for their resume and profile
+    path('job-listings/recommended/', recommended_job_listings, name='recommended_job_listings'),
 
     # Employee to make an account (update/edit)
     path('employee/update-profile/', update_employee_profile, name='update_employee_profile'),
 
+    # Employee or employer to download a resume, with byte-range support
+    path('employee/<int:employee_id>/resume/', employee_resume, name='employee_resume'),
+
     # Employer to make an account (update/edit)
     path('employer/update-profile/', update_employer_profile, name='update_employer_profile'),
 
@@ -29,9 +53,21 @@ urlpatterns = [
     #employer to manage the application status
     path('applications/<int:application_id>/status/', update_application_status, name='update_application_status'),
     
+    # Employer to set the status of many applications in one request
+    path('applications/status/', batch_update_application_status, name='batch_update_application_status'),
+
     # Employer to withdraw the application
     path('application/<int:application_id>/withdraw/'  , withdraw_application , name = 'withdraw_application'),
 
     # Employer to update /edit the job listing
     path('job-listings/<int:job_listing_id>/update' , update_job_listing , name='update_job_listing'),
+
+    # Employer to see their job postings with application counts per status
+    path('employer/dashboard/', employer_dashboard, name='employer_dashboard'),
+
+    # Employer or employee to read listing and application changes after a sequence number
+    path('events/', lifecycle_events, name='lifecycle_events'),
+
+    # Staff to monitor hit/miss counters of the listing response cache
+    path('job-listings/cache-stats/', listing_cache_stats, name='listing_cache_stats'),
 ]
@@ -1,26 +1,61 @@
-from rest_framework.decorators import api_view , permission_classes
-from django.core.mail import send_mail
+from rest_framework.decorators import api_view , permission_classes, parser_classes, authentication_classes
+from rest_framework.parsers import MultiPartParser, FileUploadParser
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from .models import JobApplication, JobListing, Employee, Employer, JobApplicationStatus
-from .serializers import JobApplicationSerializer, JobListingSerializer, EmployeeSerializer, EmployerSerializer
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
+from django.utils.cache import patch_cache_control
+import hashlib
+import mimetypes
+import os
+from .models import JobApplication, JobListing, Employee, Employer, JobApplicationStatus, LifecycleEvent
+from .serializers import JobApplicationSerializer, JobListingSerializer, JobListingDashboardSerializer, EmployeeSerializer, EmployerSerializer, \
+    JOB_APPLICATION_PROJECTION, JOB_LISTING_PROJECTION, LIFECYCLE_EVENT_PROJECTION
 from .permissions import IsEmployer
-import django_filters
+from .pagination import JobListingPagination, JobApplicationPagination, SearchPagination
+from .search import search_listings
+from .caching import cache_listing_response, cache_stats
+from .bulk import EXPORT_FIELDS, export_rows, import_listings, read_rows
+from .streaming import APPLICATION_EXPORT_FIELDS, STREAM_FORMATS, application_rows, ranged_file_response, streaming_response
+from .storage import content_digest
+from .statuses import get_status
+from .notifications import queue_application_submitted, queue_status_changed, queue_status_changes
+from .counters import recount
+from . import events
+from .resumes import rank_applications
+from .recommendations import recommend
+from .facets import facet_counts
+from .filters import JobListingFilter
+from .authentication import issue_token, revoke_tokens
+from .routers import pins_primary, replica_reads
 
 
 # Applying for a lob listing by employee
 @api_view(['POST'])
+@pins_primary
 def add_job_application(request, job_listing_id):
     try:
-        job_listing = JobListing.objects.get(pk=job_listing_id)
-        user = request.user
-        employee = Employee.objects.get(user=user)
-        application_status = JobApplicationStatus.objects.get(name='AP')  
-        application, created = JobApplication.objects.get_or_create(
-            job_listing=job_listing,
-            applicant=employee,
-            defaults={'status': application_status}
-        )
+        job_listing = JobListing.objects.select_related('company').get(pk=job_listing_id)
+        # Resolved together with the user by the token authentication
+        employee = request.user.employee
+        application_status = get_status('AP')
+        try:
+            # The unique (job_listing, applicant) constraint settles concurrent
+            # POSTs; the losing request ends up here or in get_or_create's get()
+            with transaction.atomic():
+                application, created = JobApplication.objects.get_or_create(
+                    job_listing=job_listing,
+                    applicant=employee,
+                    defaults={'status': application_status}
+                )
+                if created:
+                    # Delivered later by the send_notifications worker
+                    queue_application_submitted(application)
+        except IntegrityError:
+            created = False
 
         if created:
             return Response({"message": "Job application submitted successfully."}, status=status.HTTP_201_CREATED)
@@ -43,30 +78,72 @@ def add_job_application(request, job_listing_id):
 def applications_for_job_listing(request, job_listing_id):
     try:
         job_listing = JobListing.objects.get(pk=job_listing_id)
-        application_status = JobApplicationStatus.objects.get(name='RE') 
+        if job_listing.company_id != request.user.employer.id:
+            return Response({"error": "You do not have permission to view applications for this job listing."},
+                            status=status.HTTP_403_FORBIDDEN)
+        application_status = get_status('RE')
         applications = JobApplication.objects.filter(job_listing=job_listing).exclude(status=  application_status)
-        serializer = JobApplicationSerializer(applications, many=True)
-        return Response(serializer.data)
+
+        # ?stream=ndjson|csv sends every application without building the list in memory
+        stream_format = request.GET.get('stream')
+        if stream_format:
+            if stream_format not in STREAM_FORMATS:
+                return Response({"error": f"Unsupported stream format '{stream_format}'."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return streaming_response(application_rows(applications), stream_format,
+                                      APPLICATION_EXPORT_FIELDS, f'job-listing-{job_listing.pk}-applications')
+
+        paginator = JobApplicationPagination()
+        page = paginator.paginate_queryset(JOB_APPLICATION_PROJECTION.values(applications), request)
+        return paginator.get_paginated_response(JOB_APPLICATION_PROJECTION.data(page))
     
     except JobListing.DoesNotExist:
         return Response({"error": "Job listing does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
 
 
+# Employer to review applications for a job posting, best resume match first
+@api_view(['GET'])
+@permission_classes([IsEmployer])
+def ranked_applications_for_job_listing(request, job_listing_id):
+    try:
+        job_listing = JobListing.objects.get(pk=job_listing_id)
+    except JobListing.DoesNotExist:
+        return Response({"error": "Job listing does not exist."}, status=status.HTTP_404_NOT_FOUND)
+    if job_listing.company_id != request.user.employer.id:
+        return Response({"error": "You do not have permission to view applications for this job listing."},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    applications = JobApplication.objects.filter(job_listing=job_listing).exclude(status=get_status('RE')) \
+        .select_related('applicant', 'status')
+    ranked = rank_applications(job_listing, applications)
+    paginator = SearchPagination()
+    page = paginator.paginate_search(lambda limit, offset: ranked[offset:offset + limit], request)
+    results = []
+    for application, score, matched_terms in page:
+        data = JobApplicationSerializer(application).data
+        data['score'] = round(score, 4)
+        data['matched_terms'] = matched_terms
+        results.append(data)
+    return paginator.get_paginated_response(results)
+
+
 # Employer to make a job posting and see jobs of their company
 @api_view(['GET', 'POST'])
+@pins_primary
+@replica_reads
 @permission_classes([IsEmployer])  
 def job_listings(request):
     if request.method == 'GET':
         employer = request.user.employer  # Fetch the employer associated with the authenticated user
         job_listings = JobListing.objects.filter(company=employer)
-        serializer = JobListingSerializer(job_listings, many=True)
-        return Response(serializer.data)
+        paginator = JobListingPagination()
+        page = paginator.paginate_queryset(JOB_LISTING_PROJECTION.values(job_listings, 'created_at'), request)
+        return paginator.get_paginated_response(JOB_LISTING_PROJECTION.data(page))
     
     elif request.method == 'POST':
         serializer = JobListingSerializer(data=request.data)
         serializer.initial_data['company'] = request.user.employer.id
-        print(serializer.initial_data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -75,28 +152,96 @@ def job_listings(request):
 
 
 
-# Employee to see all job postings with filtering options
+# Employer to import many job postings in one upload, or export all of theirs
+@api_view(['GET', 'POST'])
+@pins_primary
+@permission_classes([IsEmployer])
+@parser_classes([MultiPartParser, FileUploadParser])
+def bulk_job_listings(request):
+    employer = request.user.employer
+
+    if request.method == 'GET':
+        stream_format = request.GET.get('stream', 'ndjson')
+        if stream_format not in STREAM_FORMATS:
+            return Response({"error": f"Unsupported stream format '{stream_format}'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return streaming_response(export_rows(employer), stream_format, EXPORT_FIELDS, 'job-listings')
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({"error": "Upload a CSV or JSON-lines file in the 'file' field."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    summary = import_listings(employer, read_rows(upload))
+    if not summary['created'] and summary['error_count']:
+        return Response(summary, status=status.HTTP_400_BAD_REQUEST)
+    return Response(summary, status=status.HTTP_201_CREATED)
+
+
+# Employee to see all job postings with filtering options. Cached responses
+# are filled from the primary (see api.caching), so no replica_reads
 @api_view(['GET'])
+@cache_listing_response
 def job_listings_with_filters(request):
     queryset = JobListing.objects.all()
-    filterset = ApplicationFilter(request.GET, queryset=queryset)
+    filterset = JobListingFilter(request.GET, queryset=queryset)
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
     queryset = filterset.qs  # Apply the filter
-    serializer = JobListingSerializer(queryset, many=True)
-    return Response(serializer.data)
+    paginator = JobListingPagination()
+    paginator.ordering = paginator.orderings[filterset.page_ordering]
+    page = paginator.paginate_queryset(JOB_LISTING_PROJECTION.values(queryset, 'created_at'), request)
+    data = paginator.get_paginated_data(JOB_LISTING_PROJECTION.data(page))
+    if filterset.with_facets:
+        data['facets'] = facet_counts(filterset)
+    return Response(data)
+
+
+# Employee to search job postings by keywords, best matches first
+@api_view(['GET'])
+def search_job_listings(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({"error": "Query parameter 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = SearchPagination()
+    matches = paginator.paginate_search(lambda limit, offset: search_listings(query, limit, offset), request)
+    listings = JobListing.objects.in_bulk([pk for pk, _, _ in matches])
+    results = []
+    for pk, rank, highlights in matches:
+        if pk not in listings:
+            continue
+        data = JobListingSerializer(listings[pk]).data
+        data['rank'] = rank
+        data['highlights'] = highlights
+        results.append(data)
+    return paginator.get_paginated_response(results)
+
+
+# Employee to get the job postings that best match their resume and degree
+@api_view(['GET'])
+def recommended_job_listings(request):
+    employee = getattr(request.user, 'employee', None)
+    if employee is None:
+        return Response({"error": "Only employees get recommendations."}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        limit = min(int(request.GET.get('limit', settings.API_PAGE_SIZE)), settings.API_MAX_PAGE_SIZE)
+        min_salary = float(request.GET['min_salary']) if request.GET.get('min_salary') else None
+    except ValueError:
+        return Response({"error": "'limit' and 'min_salary' must be numbers."}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = []
+    for listing, score in recommend(employee, limit, request.GET.get('location'), min_salary):
+        data = JobListingSerializer(listing).data
+        data['score'] = round(score, 4)
+        results.append(data)
+    return Response({"results": results})
 
-class ApplicationFilter(django_filters.FilterSet):
-    class Meta:
-        model = JobListing  # Use the correct model for filtering
-        fields = '__all__'  # Specify the fields for filtering
 
 # Employee to make an account (create/update)
 @api_view(['PUT', 'POST'])
+@pins_primary
 def update_employee_profile(request):
-    user = request.user
-    try:
-        employee = Employee.objects.get(user=user)
-    except Employee.DoesNotExist:
-        employee = None
+    employee = getattr(request.user, 'employee', None)
     request.data['user'] = request.user.id
 
     # put for update and post for new user
@@ -111,14 +256,42 @@ def update_employee_profile(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Employee, or an employer they applied to, to download the resume (supports Range requests)
+@api_view(['GET'])
+def employee_resume(request, employee_id):
+    try:
+        employee = Employee.objects.get(pk=employee_id)
+    except Employee.DoesNotExist:
+        return Response({"error": "Employee does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    user = request.user
+    allowed = user.is_staff or employee.user_id == user.id or (
+        hasattr(user, 'employer') and JobApplication.objects.filter(
+            applicant=employee, job_listing__company=user.employer).exists())
+    if not allowed:
+        return Response({"error": "You do not have permission to view this resume."},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    resume = employee.resume
+    if not resume or not resume.storage.exists(resume.name):
+        return Response({"error": "Resume does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    size = resume.storage.size(resume.name)
+    etag = content_digest(resume.name) or hashlib.sha256(f'{resume.name}:{size}'.encode()).hexdigest()
+    content_type = mimetypes.guess_type(resume.name)[0] or 'application/octet-stream'
+    response = ranged_file_response(request, resume.storage.open(resume.name, 'rb'), size, content_type,
+                                    etag, os.path.basename(resume.name))
+    # The URL is per employee but the content can be replaced, so clients
+    # revalidate with the content hash ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 # Employer to make an account (create/update)
 @api_view(['PUT', 'POST'])
+@pins_primary
 def update_employer_profile(request):
-    user = request.user
-    try:
-        employer = Employer.objects.get(user=user)
-    except Employer.DoesNotExist:
-        employer = None
+    employer = getattr(request.user, 'employer', None)
 
     # put for update and post for new user
     request.data['user'] = request.user.id
@@ -135,13 +308,15 @@ def update_employer_profile(request):
 
 # Employer to manage the application status 
 @api_view(['PUT'])
+@pins_primary
 @permission_classes([IsEmployer])
 def update_application_status(request, application_id):
     try:
-        application = JobApplication.objects.get(pk=application_id)
+        application = JobApplication.objects.select_related('job_listing', 'applicant', 'status') \
+            .get(pk=application_id)
         
         # Check if the application belongs to the employer's job listing
-        if application.job_listing.company != request.user.employer:
+        if application.job_listing.company_id != request.user.employer.id:
             return Response({"error": "You do not have permission to update this application."},
                             status=status.HTTP_403_FORBIDDEN)
         
@@ -149,9 +324,11 @@ def update_application_status(request, application_id):
         new_status = request.data.get('status')
         if new_status:
             try:
-                status_instance = JobApplicationStatus.objects.get(name=new_status)
+                status_instance = get_status(new_status)
                 application.status = status_instance
-                application.save()
+                with transaction.atomic():
+                    application.save()
+                    queue_status_changed(application)
                 serializer = JobApplicationSerializer(application)
                 return Response(serializer.data)
             except JobApplicationStatus.DoesNotExist:
@@ -164,28 +341,87 @@ def update_application_status(request, application_id):
         return Response({"error": "Job application does not exist."}, status=status.HTTP_404_NOT_FOUND)
     
 
+# Employer to set the status of many applications at once
+@api_view(['POST'])
+@pins_primary
+@permission_classes([IsEmployer])
+def batch_update_application_status(request):
+    ids = request.data.get('ids')
+    limit = getattr(settings, 'API_MAX_BATCH_SIZE', 5000)
+    # bool is a subclass of int, but JSON true/false are not ids
+    if not isinstance(ids, list) or not ids or not all(type(pk) is int for pk in ids):
+        return Response({"error": "'ids' must be a non-empty list of application ids."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > limit:
+        return Response({"error": f"At most {limit} applications can be updated at once."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    new_status = request.data.get('status')
+    if not new_status:
+        return Response({"error": "Status field is required in the request data."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        status_instance = get_status(new_status)
+    except JobApplicationStatus.DoesNotExist:
+        return Response({"error": f"Invalid status value '{new_status}'."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    employer_id = request.user.employer.id
+    with transaction.atomic():
+        # One query checks ownership of every id and loads what the emails
+        # need; other employers' applications are neither locked nor revealed
+        applications = JobApplication.objects.select_for_update(of=('self',)) \
+            .select_related('job_listing', 'applicant').filter(pk__in=ids, job_listing__company_id=employer_id)
+        found = {application.pk: application for application in applications}
+        changed = [application for application in found.values() if application.status_id != status_instance.pk]
+        if changed:
+            # A single UPDATE; it skips the save signals, so the counters, the
+            # emails and the event log are brought along explicitly
+            JobApplication.objects.filter(pk__in=[application.pk for application in changed]) \
+                .update(status=status_instance)
+            recount({application.job_listing_id for application in changed})
+            for application in changed:
+                application.status = status_instance
+            queue_status_changes(changed)
+            events.status_changes(changed)
+
+    changed_ids = {application.pk for application in changed}
+    results = {}
+    for pk in ids:
+        application = found.get(pk)
+        if application is None:
+            results[pk] = 'not_found'
+        elif pk in changed_ids:
+            results[pk] = 'updated'
+        else:
+            results[pk] = 'unchanged'
+    return Response({"status": new_status, "updated": len(changed), "results": results})
+
+
 @api_view(['GET'])
+@replica_reads
 def employee_applications(request):
     try:
         user = request.user
         employee = user.employee  
-        
-        # Retrieve all job applications submitted by the authenticated employee
-        applications = JobApplication.objects.filter(applicant=employee)
-        serializer = JobApplicationSerializer(applications, many=True)
-        return Response(serializer.data)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # Retrieve all job applications submitted by the authenticated employee
+    applications = JobApplication.objects.filter(applicant=employee)
+    paginator = JobApplicationPagination()
+    page = paginator.paginate_queryset(JOB_APPLICATION_PROJECTION.values(applications), request)
+    return paginator.get_paginated_response(JOB_APPLICATION_PROJECTION.data(page))
+
 @api_view(['POST'])
-def withdraw_application(request, job_application_id):
+@pins_primary
+def withdraw_application(request, application_id):
     try:
-        job_application = JobApplication.objects.get(id=job_application_id)
+        job_application = JobApplication.objects.select_related('applicant', 'job_listing').get(id=application_id)
     except JobApplication.DoesNotExist:
         return Response({"error": "Job application does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
     # Check if the current user is the owner of the job application
-    if job_application.applicant.user != request.user:
+    if job_application.applicant.user_id != request.user.id:
         return Response({"error": "You do not have permission to withdraw this application."}, status=status.HTTP_403_FORBIDDEN)
 
     # Delete the job application
@@ -196,12 +432,13 @@ def withdraw_application(request, job_application_id):
 
 # Employer to update /edit the job listing
 @api_view(['PUT', 'PATCH'])
+@pins_primary
 @permission_classes([IsEmployer])
-def update_job_listing(request, pk):
+def update_job_listing(request, job_listing_id):
     try:
-        job_listing = JobListing.objects.get(pk=pk)
+        job_listing = JobListing.objects.get(pk=job_listing_id)
         # Check if the logged-in user is the owner of the job listing
-        if request.user != job_listing.company.user:
+        if job_listing.company_id != request.user.employer.id:
             return Response({"error": "You do not have permission to update this job listing."},
                             status=status.HTTP_403_FORBIDDEN)
         
@@ -211,4 +448,72 @@ def update_job_listing(request, pk):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     except JobListing.DoesNotExist:
-        return Response({"error": "Job listing does not exist."}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({"error": "Job listing does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+
+# Employer to see their job postings with application counts per status
+@api_view(['GET'])
+@replica_reads
+@permission_classes([IsEmployer])
+def employer_dashboard(request):
+    listings = JobListing.objects.filter(company=request.user.employer).select_related('counters')
+    paginator = JobListingPagination()
+    page = paginator.paginate_queryset(listings, request)
+    serializer = JobListingDashboardSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+# Employer or employee integrations to sync listing and application changes
+# incrementally: the events after sequence number ?after=, oldest first
+@api_view(['GET'])
+def lifecycle_events(request):
+    user = request.user
+    if hasattr(user, 'employer'):
+        queryset = LifecycleEvent.objects.filter(company_id=user.employer.id)
+    elif hasattr(user, 'employee'):
+        queryset = LifecycleEvent.objects.filter(applicant_id=user.employee.id)
+    else:
+        return Response({"error": "Only employers and employees have an event feed."},
+                        status=status.HTTP_403_FORBIDDEN)
+    try:
+        after = max(int(request.GET.get('after', 0)), 0)
+        limit = int(request.GET.get('limit', getattr(settings, 'API_EVENT_FEED_PAGE_SIZE', 100)))
+    except ValueError:
+        return Response({"error": "'after' and 'limit' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), getattr(settings, 'API_EVENT_FEED_MAX_PAGE_SIZE', 1000))
+
+    rows, has_more = events.feed(LIFECYCLE_EVENT_PROJECTION.values(queryset), after, limit)
+    # Consumers store "after" and pass it back; it does not move without new events
+    last = rows[-1]['id'] if rows else after
+    return Response({
+        "after": last,
+        "has_more": has_more,
+        "next": replace_query_param(request.build_absolute_uri(), 'after', last),
+        "events": LIFECYCLE_EVENT_PROJECTION.data(rows),
+    })
+
+
+# Staff to monitor the listing response cache
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def listing_cache_stats(request):
+    return Response(cache_stats())
+
+
+# Exchange a username and password for an expiring bearer token
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def obtain_token(request):
+    user = authenticate(request, username=request.data.get('username'), password=request.data.get('password'))
+    if user is None:
+        return Response({"error": "Unable to log in with provided credentials."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response({"token": issue_token(user), "expires_in": settings.API_TOKEN_TTL})
+
+
+# Revoke every token issued to the authenticated user
+@api_view(['POST'])
+def revoke_token(request):
+    revoke_tokens(request.user)
+    return Response(status=status.HTTP_204_NO_CONTENT)
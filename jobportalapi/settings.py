@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -76,14 +78,77 @@ WSGI_APPLICATION = "jobportalapi.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Configured from the environment. DB_ENGINE defaults to the tuned SQLite
+# backend (WAL, busy timeout, BEGIN IMMEDIATE); use
+# "api.db_backends.postgresql" for PostgreSQL with pooled connections, or any
+# stock Django backend. Connections persist for DB_CONN_MAX_AGE seconds and
+# are checked before reuse when DB_CONN_HEALTH_CHECKS is on. The pooled
+# backend defaults DB_CONN_MAX_AGE to 0: each request closes its connection,
+# which hands it back to the pool (at most DB_POOL_MAX_IDLE idle connections
+# per process) instead of keeping it for one thread.
+
+DB_ENGINE = os.environ.get("DB_ENGINE", "api.db_backends.sqlite3")
+DB_POOLED = DB_ENGINE == "api.db_backends.postgresql"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "ENGINE": DB_ENGINE,
+        "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
+        "USER": os.environ.get("DB_USER", ""),
+        "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+        "HOST": os.environ.get("DB_HOST", ""),
+        "PORT": os.environ.get("DB_PORT", ""),
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "0" if DB_POOLED else "60")),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        "OPTIONS": {},
+    }
+}
+
+if "sqlite3" in DB_ENGINE:
+    # Seconds a writer waits for the lock before "database is locked"
+    DATABASES["default"]["OPTIONS"]["timeout"] = float(os.environ.get("DB_SQLITE_TIMEOUT", "20"))
+elif DB_POOLED:
+    DATABASES["default"]["OPTIONS"]["pool"] = {"max_idle": int(os.environ.get("DB_POOL_MAX_IDLE", "10"))}
+
+# Read replicas: copies of the default database with another HOST (server
+# databases) or NAME (SQLite files), as comma-separated lists. Views marked
+# @replica_reads read from them, except for users who wrote something in the
+# last API_REPLICA_PIN_SECONDS, who keep reading from the primary.
+_replica_hosts = [host for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host]
+_replica_names = [name for name in os.environ.get("DB_REPLICA_NAMES", "").split(",") if name]
+for _i, _replica in enumerate(
+    [{"HOST": host} for host in _replica_hosts] + [{"NAME": name} for name in _replica_names], 1
+):
+    DATABASES[f"replica{_i}"] = {**DATABASES["default"], **_replica, "TEST": {"MIRROR": "default"}}
+
+API_DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica")]
+API_REPLICA_PIN_SECONDS = 5
+DATABASE_ROUTERS = ["api.routers.ReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Defaults to per-process memory; point CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache or
+# django.core.cache.backends.redis.RedisCache to share it between workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
     }
 }
 
 
+# Email
+# https://docs.djangoproject.com/en/4.1/topics/email/
+# Notifications are queued in the api outbox and sent by
+# `manage.py send_notifications`, never inside a request.
+
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "no-reply@jobportal.local")
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -120,6 +185,16 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded files (resumes). Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE
+# are spooled to a temporary file instead of being held in memory, and
+# hashed on the way so the content-addressed storage can move them in place.
+MEDIA_ROOT = BASE_DIR
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "api.storage.HashingTemporaryFileUploadHandler",
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -127,15 +202,114 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'api.authentication.SignedTokenAuthentication',  # Expiring bearer tokens for API clients
         'rest_framework.authentication.SessionAuthentication',  # Use SessionAuthentication for session-based authentication
-        # Add any additional authentication classes you want to use globally
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
         # Add any additional permission classes you want to use globally
     ),
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',  # orjson when installed, otherwise the same as JSONRenderer
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
-REST_FRAMEWORK = {
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
-}
\ No newline at end of file
+# Lifetime of a bearer token in seconds. Resolved users are cached for
+# API_AUTH_LOCAL_CACHE_SECONDS in each process and API_AUTH_CACHE_SECONDS in
+# the shared API_AUTH_CACHE; revocation clears both for the current process,
+# other processes notice within the local lifetime.
+API_TOKEN_TTL = 12 * 60 * 60
+API_AUTH_CACHE = "default"
+API_AUTH_CACHE_SECONDS = 300
+API_AUTH_LOCAL_CACHE_SECONDS = 5
+
+# Where the token buckets of api.throttling.rate_limit live. The default
+# keeps them per process; with several workers use
+# "api.throttling.CacheBucketStore" and point API_RATE_LIMIT_CACHE at a
+# shared cache with an atomic add (Redis, memcached or database). Per-IP
+# limits use REMOTE_ADDR unless REST_FRAMEWORK["NUM_PROXIES"] is set.
+API_RATE_LIMIT_STORE = os.environ.get("API_RATE_LIMIT_STORE", "api.throttling.LocalBucketStore")
+API_RATE_LIMIT_CACHE = "default"
+
+# Route the listing and application reads to the async views in
+# api.async_views; only worth it when served by an ASGI server.
+API_ASYNC_READ_VIEWS = os.environ.get("API_ASYNC_READ_VIEWS", "") == "1"
+
+# Per-request metrics (api.middleware.RequestMetricsMiddleware): query count,
+# SQL, view, serialization and response time as an "api.metrics" log record,
+# for a sampled fraction of requests, and as a Server-Timing header for staff
+# users (for everyone under DEBUG). Requests that run more queries than the budget of
+# their URL name (or "default") log a warning.
+API_METRICS_ENABLED = os.environ.get("API_METRICS_ENABLED", "") == "1"
+API_METRICS_SAMPLE_RATE = float(os.environ.get("API_METRICS_SAMPLE_RATE", "1.0"))
+API_METRICS_SERVER_TIMING = True
+API_QUERY_BUDGETS = {
+    "default": 10,
+    "job_listings_with_filters": 2,
+    "job_listings": 3,
+    "employee_applications": 3,
+    "applications_for_job_listing": 4,
+    "search_job_listings": 4,
+    "employer_dashboard": 3,
+    "lifecycle_events": 2,
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "api.log.JSONFormatter"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "json": {"class": "logging.StreamHandler", "formatter": "json"},
+    },
+    "loggers": {
+        "api": {"handlers": ["console"], "level": "WARNING"},
+        "api.metrics": {
+            "handlers": ["json"],
+            "level": os.environ.get("API_METRICS_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# Default and maximum ?page_size= for the cursor-paginated list endpoints
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# Lower bounds of the salary bands counted by ?facets=1 listing requests
+API_SALARY_BANDS = [0, 30000, 50000, 75000, 100000, 150000, 200000]
+
+# Most application ids one batch status update may change
+API_MAX_BATCH_SIZE = 5000
+
+# Cache alias and lifetime for public listing responses (see api.caching)
+API_RESPONSE_CACHE = "default"
+API_RESPONSE_CACHE_TIMEOUT = 300
+
+# Outbox delivery: give up after this many attempts; the retry delay doubles
+# from API_NOTIFICATION_RETRY_DELAY seconds on every failure
+API_NOTIFICATION_MAX_ATTEMPTS = 5
+API_NOTIFICATION_RETRY_DELAY = 60
+
+# Recommendation index (see api.recommendations): terms kept per listing, and
+# how often each process catches up with listing writes of other processes,
+# re-reading rows updated up to API_RECOMMENDATION_SYNC_MARGIN seconds early
+API_RECOMMENDATION_TERMS = 24
+API_RECOMMENDATION_SYNC_SECONDS = 30
+API_RECOMMENDATION_SYNC_MARGIN = 60
+
+# Background threads extracting resume text after profile saves; 0 runs the
+# extraction inline on commit (used by the tests)
+API_RESUME_EXTRACTION_WORKERS = 2
+
+# Change feed of api.events: events per page, and, on databases where
+# transactions can commit out of id order (not SQLite), how long new events
+# are held back so that a late commit is not skipped. Best effort: a
+# transaction open for longer than the lag can still be skipped.
+API_EVENT_FEED_PAGE_SIZE = 100
+API_EVENT_FEED_MAX_PAGE_SIZE = 1000
+API_EVENT_FEED_LAG_SECONDS = 2